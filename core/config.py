@@ -5,10 +5,134 @@ DEFAULT_LLM_PROVIDER = "mistral"
 DEFAULT_DB_SCHEMA = "star_dwh"
 DEFAULT_MISTRAL_MODEL = "mistral-small-latest" # Or your currently used model
 
+# LLM call defaults (timeouts, retries and the shared rate limiter; 0 disables a limit)
+DEFAULT_LLM_TIMEOUT_SECONDS = 30.0
+DEFAULT_LLM_MAX_RETRIES = 3
+DEFAULT_LLM_RETRY_BASE_DELAY_SECONDS = 0.5
+DEFAULT_LLM_RETRY_MAX_DELAY_SECONDS = 8.0
+DEFAULT_LLM_REQUESTS_PER_SECOND = 1.0
+DEFAULT_LLM_REQUEST_BURST = 1
+DEFAULT_LLM_TOKENS_PER_MINUTE = 500000
+DEFAULT_LLM_STREAMING = True
+
+# Multi-provider hedging defaults (used when LLM_PROVIDERS lists more than one provider)
+DEFAULT_LLM_HEDGE_PERCENTILE = 95.0
+DEFAULT_LLM_HEDGE_DELAY_SECONDS = 3.0
+DEFAULT_LLM_HEDGE_MIN_SAMPLES = 20
+DEFAULT_LLM_BREAKER_FAILURE_THRESHOLD = 5
+DEFAULT_LLM_BREAKER_COOLDOWN_SECONDS = 60.0
+
+# Schema catalog defaults
+DEFAULT_SCHEMA_REFRESH_SECONDS = 3600
+DEFAULT_SCHEMA_PRUNING_ENABLED = True
+DEFAULT_SCHEMA_PROMPT_TOKEN_BUDGET = 3000
+DEFAULT_SCHEMA_PRUNING_MIN_TOKENS = 2000
+DEFAULT_SCHEMA_PRUNING_MAX_TABLES = 8
+
+# NL->SQL generation cache defaults
+DEFAULT_LLM_CACHE_ENABLED = True
+DEFAULT_LLM_CACHE_TTL_SECONDS = 86400
+DEFAULT_LLM_CACHE_MAX_ENTRIES = 5000
+DEFAULT_LLM_SIMILAR_QUESTIONS_ENABLED = True
+DEFAULT_LLM_SIMILARITY_THRESHOLD = 0.8
+
+# Template fast path for common question shapes
+DEFAULT_SQL_TEMPLATES_ENABLED = True
+
+# SQL validation verdict cache size
+DEFAULT_SQL_VALIDATION_CACHE_ENTRIES = 4096
+DEFAULT_SQL_REPAIR_ENABLED = True
+
+# Database connection pool defaults (per database key)
+DEFAULT_DB_POOL_SIZE = 5
+DEFAULT_DB_MAX_OVERFLOW = 10
+DEFAULT_DB_POOL_RECYCLE_SECONDS = 1800
+DEFAULT_DB_POOL_TIMEOUT_SECONDS = 30
+DEFAULT_DB_POOL_PRE_PING = True
+
+# Query execution defaults (worker threads and per-database-family concurrency caps)
+DEFAULT_QUERY_MAX_WORKERS = 16
+DEFAULT_QUERY_CONCURRENCY_ORACLE = 4
+DEFAULT_QUERY_CONCURRENCY_VERTICA = 4
+DEFAULT_QUERY_CONCURRENCY_POSTGRES = 8
+
+# Result export defaults
+DEFAULT_RESULT_EXPORT_MODE = "auto"
+DEFAULT_RESULT_BATCH_SIZE = 10000
+DEFAULT_RESULT_DELIVERY_MODE = "spooled"
+DEFAULT_RESULT_SPOOL_MAX_MEMORY_BYTES = 32 * 1024 * 1024
+
+# Result format defaults ('auto' picks inline text, CSV, compressed CSV or Parquet by size)
+DEFAULT_RESULT_FORMAT = "auto"
+DEFAULT_RESULT_INLINE_MAX_ROWS = 20
+DEFAULT_RESULT_INLINE_MAX_CHARS = 3000
+DEFAULT_RESULT_CSV_MAX_BYTES = 20 * 1024 * 1024
+DEFAULT_RESULT_COMPRESSED_CSV_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_RESULT_GZIP_LEVEL = 6
+DEFAULT_RESULT_ZSTD_LEVEL = 3
+DEFAULT_RESULT_PARQUET_COMPRESSION = "zstd"
+
+# Excel export defaults (workbooks are written by worker processes)
+DEFAULT_XLSX_WORKERS = 2
+DEFAULT_XLSX_MAX_ROWS_PER_SHEET = 1_048_576
+
+# Result cache defaults
+DEFAULT_RESULT_CACHE_ENABLED = True
+DEFAULT_RESULT_CACHE_TTL_SECONDS = 900
+DEFAULT_RESULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_RESULT_CACHE_MAX_ENTRY_BYTES = 256 * 1024 * 1024
+
+# Cost guard defaults (0 disables a threshold)
+DEFAULT_COST_GUARD_ENABLED = True
+DEFAULT_COST_GUARD_WARN_ROWS = 10_000_000
+DEFAULT_COST_GUARD_REFUSE_ROWS = 1_000_000_000
+DEFAULT_COST_GUARD_WARN_COST = 0
+DEFAULT_COST_GUARD_REFUSE_COST = 0
+DEFAULT_COST_GUARD_REFUSE_CARTESIAN = False
+DEFAULT_COST_GUARD_PLAN_CACHE_TTL_SECONDS = 600
+DEFAULT_COST_GUARD_PLAN_CACHE_MAX_ENTRIES = 2048
+
+# Local artifact retention defaults
+DEFAULT_ARTIFACT_RETENTION_ENABLED = True
+DEFAULT_ARTIFACT_MAX_AGE_SECONDS = 86400
+DEFAULT_ARTIFACT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+DEFAULT_ARTIFACT_SWEEP_SECONDS = 300
+DEFAULT_SLACK_FILE_RETENTION_SECONDS = 0
+
+# Slack upload defaults
+DEFAULT_SLACK_UPLOAD_CHUNK_BYTES = 256 * 1024
+DEFAULT_SLACK_HTTP_TIMEOUT_SECONDS = 300
+DEFAULT_SLACK_HTTP_KEEPALIVE_SECONDS = 60
+DEFAULT_SLACK_HTTP_MAX_CONNECTIONS = 20
+
+# Slack event queue defaults
+DEFAULT_EVENT_WORKERS = 4
+DEFAULT_EVENT_QUEUE_SIZE = 100
+
+# Slack event deduplication defaults
+DEFAULT_EVENT_DEDUP_BACKEND = "memory"
+DEFAULT_EVENT_DEDUP_TTL_SECONDS = 3600
+DEFAULT_EVENT_DEDUP_MAX_ENTRIES = 10000
+DEFAULT_SLACK_SKIP_RETRY_REASONS = "http_timeout"
+
 # Environment variable names for API keys
 # The actual keys should be set in your environment (e.g., Render secrets)
 MISTRAL_API_KEY_ENV_VAR = "MISTRAL_API_KEY"
 
+def _get_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+def _get_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+def _get_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
 class AppConfig:
     """
     Application configuration class.
@@ -27,6 +151,227 @@ class AppConfig:
             # For now, QueryGenerator already has a similar check.
             pass # Or raise an error: raise ValueError(f"{MISTRAL_API_KEY_ENV_VAR} not set for Mistral provider")
 
+        # LLM call settings. The rate limits are shared by all requests to a provider in this process.
+        self.llm_timeout_seconds: float = _get_float("LLM_TIMEOUT_SECONDS", DEFAULT_LLM_TIMEOUT_SECONDS)
+        self.llm_max_retries: int = _get_int("LLM_MAX_RETRIES", DEFAULT_LLM_MAX_RETRIES)
+        self.llm_retry_base_delay_seconds: float = _get_float(
+            "LLM_RETRY_BASE_DELAY_SECONDS", DEFAULT_LLM_RETRY_BASE_DELAY_SECONDS)
+        self.llm_retry_max_delay_seconds: float = _get_float(
+            "LLM_RETRY_MAX_DELAY_SECONDS", DEFAULT_LLM_RETRY_MAX_DELAY_SECONDS)
+        self.llm_requests_per_second: float = _get_float("LLM_REQUESTS_PER_SECOND", DEFAULT_LLM_REQUESTS_PER_SECOND)
+        self.llm_request_burst: int = _get_int("LLM_REQUEST_BURST", DEFAULT_LLM_REQUEST_BURST)
+        self.llm_tokens_per_minute: int = _get_int("LLM_TOKENS_PER_MINUTE", DEFAULT_LLM_TOKENS_PER_MINUTE)
+        # Stream completions and start on the SQL before the explanation has been generated
+        self.llm_streaming: bool = _get_bool("LLM_STREAMING", DEFAULT_LLM_STREAMING)
+
+        # Ordered provider list for hedged requests and failover, e.g.
+        # "mistral:mistral-small-latest,mistral:open-mistral-nemo,mistral:local@http://llm.internal:8080"
+        self.llm_providers: list = [
+            spec.strip() for spec in os.getenv("LLM_PROVIDERS", "").split(",") if spec.strip()
+        ]
+        self.llm_hedge_percentile: float = _get_float("LLM_HEDGE_PERCENTILE", DEFAULT_LLM_HEDGE_PERCENTILE)
+        self.llm_hedge_delay_seconds: float = _get_float("LLM_HEDGE_DELAY_SECONDS", DEFAULT_LLM_HEDGE_DELAY_SECONDS)
+        self.llm_hedge_min_samples: int = _get_int("LLM_HEDGE_MIN_SAMPLES", DEFAULT_LLM_HEDGE_MIN_SAMPLES)
+        self.llm_breaker_failure_threshold: int = _get_int(
+            "LLM_BREAKER_FAILURE_THRESHOLD", DEFAULT_LLM_BREAKER_FAILURE_THRESHOLD)
+        self.llm_breaker_cooldown_seconds: float = _get_float(
+            "LLM_BREAKER_COOLDOWN_SECONDS", DEFAULT_LLM_BREAKER_COOLDOWN_SECONDS)
+
+        # Schema catalogs introspected in the background for the LLM prompt.
+        # SCHEMA_SOURCES is a comma-separated list of DB_KEY:schema pairs, e.g. "POSTGRES:star_dwh,VIRGA:virga"
+        self.schema_sources: list = [
+            (source.split(":", 1)[0].strip().upper(), source.split(":", 1)[1].strip())
+            for source in os.getenv("SCHEMA_SOURCES", f"POSTGRES:{self.db_schema_name}").split(",")
+            if ":" in source
+        ]
+        self.schema_cache_dir: str = os.getenv(
+            "SCHEMA_CACHE_DIR", os.path.join(os.getenv("DATA_DIR", "data"), "schema_cache"))
+        self.schema_refresh_seconds: int = _get_int("SCHEMA_REFRESH_SECONDS", DEFAULT_SCHEMA_REFRESH_SECONDS)
+        # Relevance pruning of the schema sent with each question (only for schemas above the minimum size)
+        self.schema_pruning_enabled: bool = _get_bool("SCHEMA_PRUNING_ENABLED", DEFAULT_SCHEMA_PRUNING_ENABLED)
+        self.schema_prompt_token_budget: int = _get_int("SCHEMA_PROMPT_TOKEN_BUDGET", DEFAULT_SCHEMA_PROMPT_TOKEN_BUDGET)
+        self.schema_pruning_min_tokens: int = _get_int("SCHEMA_PRUNING_MIN_TOKENS", DEFAULT_SCHEMA_PRUNING_MIN_TOKENS)
+        self.schema_pruning_max_tables: int = _get_int("SCHEMA_PRUNING_MAX_TABLES", DEFAULT_SCHEMA_PRUNING_MAX_TABLES)
+        self.schema_synonyms_file: str | None = os.getenv("SCHEMA_SYNONYMS_FILE")
+
+        # NL->SQL generation cache (keyed on the normalized question, provider, model and schema hash)
+        self.llm_cache_enabled: bool = _get_bool("LLM_CACHE_ENABLED", DEFAULT_LLM_CACHE_ENABLED)
+        self.llm_cache_ttl_seconds: int = _get_int("LLM_CACHE_TTL_SECONDS", DEFAULT_LLM_CACHE_TTL_SECONDS)
+        self.llm_cache_max_entries: int = _get_int("LLM_CACHE_MAX_ENTRIES", DEFAULT_LLM_CACHE_MAX_ENTRIES)
+        # Reuse SQL of a near-duplicate earlier question (token-set Jaccard similarity via MinHash/LSH)
+        self.llm_similar_questions_enabled: bool = _get_bool(
+            "LLM_SIMILAR_QUESTIONS_ENABLED", DEFAULT_LLM_SIMILAR_QUESTIONS_ENABLED)
+        self.llm_similarity_threshold: float = _get_float("LLM_SIMILARITY_THRESHOLD", DEFAULT_LLM_SIMILARITY_THRESHOLD)
+
+        # Answer common question shapes ("sales by store in 2023") from SQL templates, without an LLM call
+        self.sql_templates_enabled: bool = _get_bool("SQL_TEMPLATES_ENABLED", DEFAULT_SQL_TEMPLATES_ENABLED)
+        # Extra city/country names templates may filter on (comma-separated), beyond the star_dwh ones
+        self.sql_template_places: set = {
+            place.strip().lower() for place in os.getenv("SQL_TEMPLATE_PLACES", "").split(",") if place.strip()
+        }
+
+        # Validation verdicts are cached by query fingerprint (0 disables the cache)
+        self.sql_validation_cache_entries: int = _get_int(
+            "SQL_VALIDATION_CACHE_ENTRIES", DEFAULT_SQL_VALIDATION_CACHE_ENTRIES)
+        # Generated SQL referencing unknown tables or columns gets one re-ask with the problems as feedback
+        self.sql_repair_enabled: bool = _get_bool("SQL_REPAIR_ENABLED", DEFAULT_SQL_REPAIR_ENABLED)
+
+        # Database connection pool settings.
+        # Each can be overridden per database key, e.g. DB_POOL_SIZE_VERTICA=2
+        self.db_pool_size: int = _get_int("DB_POOL_SIZE", DEFAULT_DB_POOL_SIZE)
+        self.db_max_overflow: int = _get_int("DB_MAX_OVERFLOW", DEFAULT_DB_MAX_OVERFLOW)
+        self.db_pool_recycle: int = _get_int("DB_POOL_RECYCLE_SECONDS", DEFAULT_DB_POOL_RECYCLE_SECONDS)
+        self.db_pool_timeout: int = _get_int("DB_POOL_TIMEOUT_SECONDS", DEFAULT_DB_POOL_TIMEOUT_SECONDS)
+        self.db_pool_pre_ping: bool = _get_bool("DB_POOL_PRE_PING", DEFAULT_DB_POOL_PRE_PING)
+
+        # Query execution settings (blocking database calls run off the event loop)
+        self.query_max_workers: int = _get_int("QUERY_MAX_WORKERS", DEFAULT_QUERY_MAX_WORKERS)
+        self.query_concurrency_oracle: int = _get_int("QUERY_CONCURRENCY_ORACLE", DEFAULT_QUERY_CONCURRENCY_ORACLE)
+        self.query_concurrency_vertica: int = _get_int("QUERY_CONCURRENCY_VERTICA", DEFAULT_QUERY_CONCURRENCY_VERTICA)
+        self.query_concurrency_postgres: int = _get_int("QUERY_CONCURRENCY_POSTGRES", DEFAULT_QUERY_CONCURRENCY_POSTGRES)
+
+        # Result export settings.
+        # 'auto' uses the database's native CSV export where available (Postgres COPY) and streaming otherwise;
+        # 'stream' writes server-side cursor batches straight to the file; 'arrow' does the same with Arrow
+        # record batches and Arrow's CSV writer; 'dataframe' loads the full result first.
+        self.result_export_mode: str = os.getenv("RESULT_EXPORT_MODE", DEFAULT_RESULT_EXPORT_MODE).lower()
+        self.result_batch_size: int = _get_int("RESULT_BATCH_SIZE", DEFAULT_RESULT_BATCH_SIZE)
+        # 'spooled' writes result files into memory buffers that spill to an anonymous temporary file
+        # (in RESULT_SPOOL_DIR, default: the system temp dir) beyond the threshold and are freed after upload;
+        # 'file' writes them to DATA_DIR
+        self.result_delivery_mode: str = os.getenv("RESULT_DELIVERY_MODE", DEFAULT_RESULT_DELIVERY_MODE).lower()
+        self.result_spool_max_memory_bytes: int = _get_int(
+            "RESULT_SPOOL_MAX_MEMORY_BYTES", DEFAULT_RESULT_SPOOL_MAX_MEMORY_BYTES)
+        self.result_spool_dir: str = os.getenv("RESULT_SPOOL_DIR") or None
+
+        # Result format settings (a message can ask for a format, e.g. "sqloslav, parquet ...").
+        # 'auto' posts results up to RESULT_INLINE_MAX_ROWS rows and RESULT_INLINE_MAX_CHARS as a text table,
+        # uploads CSV up to RESULT_CSV_MAX_BYTES, gzip-compressed CSV up to RESULT_COMPRESSED_CSV_MAX_BYTES
+        # of CSV and Parquet beyond that
+        self.result_format: str = os.getenv("RESULT_FORMAT", DEFAULT_RESULT_FORMAT).lower()
+        self.result_inline_max_rows: int = _get_int("RESULT_INLINE_MAX_ROWS", DEFAULT_RESULT_INLINE_MAX_ROWS)
+        self.result_inline_max_chars: int = _get_int("RESULT_INLINE_MAX_CHARS", DEFAULT_RESULT_INLINE_MAX_CHARS)
+        self.result_csv_max_bytes: int = _get_int("RESULT_CSV_MAX_BYTES", DEFAULT_RESULT_CSV_MAX_BYTES)
+        self.result_compressed_csv_max_bytes: int = _get_int(
+            "RESULT_COMPRESSED_CSV_MAX_BYTES", DEFAULT_RESULT_COMPRESSED_CSV_MAX_BYTES)
+        self.result_gzip_level: int = _get_int("RESULT_GZIP_LEVEL", DEFAULT_RESULT_GZIP_LEVEL)
+        self.result_zstd_level: int = _get_int("RESULT_ZSTD_LEVEL", DEFAULT_RESULT_ZSTD_LEVEL)
+        self.result_parquet_compression: str = os.getenv(
+            "RESULT_PARQUET_COMPRESSION", DEFAULT_RESULT_PARQUET_COMPRESSION).lower()
+
+        # Excel export settings ("sqloslav, excel ..."). Rows beyond XLSX_MAX_ROWS_PER_SHEET (at most Excel's
+        # 1,048,576, header included) continue on additional sheets
+        self.xlsx_workers: int = _get_int("XLSX_WORKERS", DEFAULT_XLSX_WORKERS)
+        self.xlsx_max_rows_per_sheet: int = _get_int("XLSX_MAX_ROWS_PER_SHEET", DEFAULT_XLSX_MAX_ROWS_PER_SHEET)
+
+        # Result cache settings (keyed on normalized SQL and database key).
+        # The TTL can be overridden per database key, e.g. RESULT_CACHE_TTL_SECONDS_VERTICA=3600
+        self.result_cache_enabled: bool = _get_bool("RESULT_CACHE_ENABLED", DEFAULT_RESULT_CACHE_ENABLED)
+        self.result_cache_dir: str = os.getenv(
+            "RESULT_CACHE_DIR", os.path.join(os.getenv("DATA_DIR", "data"), "result_cache"))
+        self.result_cache_ttl_seconds: int = _get_int("RESULT_CACHE_TTL_SECONDS", DEFAULT_RESULT_CACHE_TTL_SECONDS)
+        self.result_cache_max_bytes: int = _get_int("RESULT_CACHE_MAX_BYTES", DEFAULT_RESULT_CACHE_MAX_BYTES)
+        self.result_cache_max_entry_bytes: int = _get_int(
+            "RESULT_CACHE_MAX_ENTRY_BYTES", DEFAULT_RESULT_CACHE_MAX_ENTRY_BYTES)
+
+        # Cost guard settings (the query's EXPLAIN estimates decide whether it runs, runs with a warning or is refused).
+        # Thresholds can be overridden per database key and per Slack channel, e.g. COST_GUARD_REFUSE_ROWS_VERTICA
+        # or COST_GUARD_WARN_ROWS_C0123456789; cost units differ between databases, so cost thresholds are off by default
+        self.cost_guard_enabled: bool = _get_bool("COST_GUARD_ENABLED", DEFAULT_COST_GUARD_ENABLED)
+        self.cost_guard_warn_rows: float = _get_float("COST_GUARD_WARN_ROWS", DEFAULT_COST_GUARD_WARN_ROWS)
+        self.cost_guard_refuse_rows: float = _get_float("COST_GUARD_REFUSE_ROWS", DEFAULT_COST_GUARD_REFUSE_ROWS)
+        self.cost_guard_warn_cost: float = _get_float("COST_GUARD_WARN_COST", DEFAULT_COST_GUARD_WARN_COST)
+        self.cost_guard_refuse_cost: float = _get_float("COST_GUARD_REFUSE_COST", DEFAULT_COST_GUARD_REFUSE_COST)
+        self.cost_guard_refuse_cartesian: bool = _get_bool(
+            "COST_GUARD_REFUSE_CARTESIAN", DEFAULT_COST_GUARD_REFUSE_CARTESIAN)
+        self.cost_guard_plan_cache_ttl_seconds: int = _get_int(
+            "COST_GUARD_PLAN_CACHE_TTL_SECONDS", DEFAULT_COST_GUARD_PLAN_CACHE_TTL_SECONDS)
+        self.cost_guard_plan_cache_max_entries: int = _get_int(
+            "COST_GUARD_PLAN_CACHE_MAX_ENTRIES", DEFAULT_COST_GUARD_PLAN_CACHE_MAX_ENTRIES)
+
+        # Local artifact retention settings: result files in DATA_DIR, downloads in DOWNLOAD_DIR and files in
+        # OUTPUT_DIR are deleted after ARTIFACT_MAX_AGE_SECONDS, least recently used first beyond ARTIFACT_MAX_BYTES.
+        # Uploaded Slack files are deleted after SLACK_FILE_RETENTION_SECONDS (0 keeps them)
+        self.data_dir: str = os.getenv("DATA_DIR", "data")
+        self.download_dir: str = os.getenv("DOWNLOAD_DIR", "downloads")
+        self.output_dir: str = os.getenv("OUTPUT_DIR", "output")
+        self.artifact_retention_enabled: bool = _get_bool(
+            "ARTIFACT_RETENTION_ENABLED", DEFAULT_ARTIFACT_RETENTION_ENABLED)
+        self.artifact_max_age_seconds: int = _get_int("ARTIFACT_MAX_AGE_SECONDS", DEFAULT_ARTIFACT_MAX_AGE_SECONDS)
+        self.artifact_max_bytes: int = _get_int("ARTIFACT_MAX_BYTES", DEFAULT_ARTIFACT_MAX_BYTES)
+        self.artifact_sweep_seconds: int = _get_int("ARTIFACT_SWEEP_SECONDS", DEFAULT_ARTIFACT_SWEEP_SECONDS)
+        self.slack_file_retention_seconds: int = _get_int(
+            "SLACK_FILE_RETENTION_SECONDS", DEFAULT_SLACK_FILE_RETENTION_SECONDS)
+
+        # Slack upload settings (all Slack HTTP calls share one keep-alive session)
+        self.slack_upload_chunk_bytes: int = _get_int("SLACK_UPLOAD_CHUNK_BYTES", DEFAULT_SLACK_UPLOAD_CHUNK_BYTES)
+        self.slack_http_timeout_seconds: float = _get_float(
+            "SLACK_HTTP_TIMEOUT_SECONDS", DEFAULT_SLACK_HTTP_TIMEOUT_SECONDS)
+        self.slack_http_keepalive_seconds: float = _get_float(
+            "SLACK_HTTP_KEEPALIVE_SECONDS", DEFAULT_SLACK_HTTP_KEEPALIVE_SECONDS)
+        self.slack_http_max_connections: int = _get_int(
+            "SLACK_HTTP_MAX_CONNECTIONS", DEFAULT_SLACK_HTTP_MAX_CONNECTIONS)
+
+        # Slack event queue settings (events are acked first and processed by background workers)
+        self.event_workers: int = _get_int("EVENT_WORKERS", DEFAULT_EVENT_WORKERS)
+        self.event_queue_size: int = _get_int("EVENT_QUEUE_SIZE", DEFAULT_EVENT_QUEUE_SIZE)
+
+        # Slack event deduplication settings ('memory' is per process, 'sqlite' is shared by workers on a host)
+        self.event_dedup_backend: str = os.getenv("EVENT_DEDUP_BACKEND", DEFAULT_EVENT_DEDUP_BACKEND)
+        self.event_dedup_ttl_seconds: int = _get_int("EVENT_DEDUP_TTL_SECONDS", DEFAULT_EVENT_DEDUP_TTL_SECONDS)
+        self.event_dedup_max_entries: int = _get_int("EVENT_DEDUP_MAX_ENTRIES", DEFAULT_EVENT_DEDUP_MAX_ENTRIES)
+        self.event_dedup_sqlite_path: str = os.getenv(
+            "EVENT_DEDUP_SQLITE_PATH", os.path.join(os.getenv("DATA_DIR", "data"), "event_dedup.sqlite3"))
+        # Slack retries with these X-Slack-Retry-Reason values are acknowledged without processing
+        # when their event ID was already received
+        self.slack_skip_retry_reasons: list = [
+            reason.strip() for reason in os.getenv("SLACK_SKIP_RETRY_REASONS", DEFAULT_SLACK_SKIP_RETRY_REASONS).split(",")
+            if reason.strip()
+        ]
+
+    def result_cache_ttl(self, db_key: str) -> int:
+        """
+        Returns the result cache TTL in seconds for a database key, applying any per-key override.
+        """
+        return _get_int(f"RESULT_CACHE_TTL_SECONDS_{db_key.upper()}", self.result_cache_ttl_seconds)
+
+    def db_pool_settings(self, db_key: str) -> dict:
+        """
+        Returns the connection pool settings for a database key
+        (SINONIMI, SHOPSTER, VIRGA, VIRGA_TEST, VERTICA, POSTGRES, POSTGRES_ADBC),
+        applying any per-key environment overrides.
+        """
+        db_key = db_key.upper()
+        return {
+            "pool_size": _get_int(f"DB_POOL_SIZE_{db_key}", self.db_pool_size),
+            "max_overflow": _get_int(f"DB_MAX_OVERFLOW_{db_key}", self.db_max_overflow),
+            "pool_recycle": _get_int(f"DB_POOL_RECYCLE_SECONDS_{db_key}", self.db_pool_recycle),
+            "pool_timeout": _get_int(f"DB_POOL_TIMEOUT_SECONDS_{db_key}", self.db_pool_timeout),
+            "pool_pre_ping": _get_bool(f"DB_POOL_PRE_PING_{db_key}", self.db_pool_pre_ping),
+        }
+
+    def cost_guard_thresholds(self, db_key: str, channel_id: str = None) -> dict:
+        """
+        Returns the cost guard thresholds for a database key and Slack channel.
+        Channel overrides take precedence over database key overrides.
+        """
+        suffixes = [db_key.upper()] + ([channel_id.upper()] if channel_id else [])
+        thresholds = {}
+        for name, default in (("warn_rows", self.cost_guard_warn_rows),
+                              ("refuse_rows", self.cost_guard_refuse_rows),
+                              ("warn_cost", self.cost_guard_warn_cost),
+                              ("refuse_cost", self.cost_guard_refuse_cost)):
+            value = default
+            for suffix in suffixes:
+                value = _get_float(f"COST_GUARD_{name.upper()}_{suffix}", value)
+            thresholds[name] = value
+        refuse_cartesian = self.cost_guard_refuse_cartesian
+        for suffix in suffixes:
+            refuse_cartesian = _get_bool(f"COST_GUARD_REFUSE_CARTESIAN_{suffix}", refuse_cartesian)
+        thresholds["refuse_cartesian"] = refuse_cartesian
+        return thresholds
+
+
 # Global config instance
 # Other parts of the application can import this instance
 config = AppConfig()
@@ -1,4 +1,5 @@
 import os
+import pyarrow as pa
 from dotenv import load_dotenv
 from abc import ABC, abstractmethod
 
@@ -21,8 +22,111 @@ except Exception as e:
 
 
 class BaseDatabase:
+    # Whether export_csv() can have the server generate the CSV itself
+    supports_native_export = False
+
     def __init__(self, db_type):
         self.db_type = db_type
 
     def query(self, sql_query):
         raise NotImplementedError("Subclasses should implement this method.")
+
+    def iter_batches(self, sql_query, batch_size):
+        """
+        Streams the query result from a server-side cursor as (columns, rows) batches
+        of at most `batch_size` rows, so memory is bounded by the batch size.
+        At least one (possibly empty) batch is yielded so the columns are always known.
+        """
+        raise NotImplementedError("Subclasses should implement this method.")
+
+    def export_csv(self, sql_query, fileobj):
+        """
+        Writes the query result as server-generated CSV (with header) into a binary file object.
+        Only available where `supports_native_export` is True.
+
+        Raises:
+            NotImplementedError: The query can't be exported natively; stream it instead.
+            Database errors are raised as is and mean the query itself failed.
+
+        Returns:
+            The number of data rows written.
+        """
+        raise NotImplementedError(f"Native CSV export is not supported for {self.db_type}.")
+
+    def query_arrow(self, sql_query, batch_size):
+        """
+        Streams the query result as Arrow record batches.
+
+        The default implementation converts each cursor batch from iter_batches() into
+        Arrow columns; subclasses override it where the driver can produce Arrow natively.
+        """
+        for columns, rows in self.iter_batches(sql_query, batch_size):
+            yield self.rows_to_record_batch(columns, rows)
+
+    @staticmethod
+    def rows_to_record_batch(columns, rows):
+        """
+        Converts a list of row tuples into an Arrow record batch, column by column.
+        """
+        if rows:
+            arrays = [pa.array(values) for values in zip(*rows)]
+        else:
+            arrays = [pa.array([], type=pa.null()) for _ in columns]
+        return pa.RecordBatch.from_arrays(arrays, names=list(columns))
+
+    def explain(self, sql_query):
+        """
+        Asks the database for the execution plan of a query without running it.
+
+        Returns:
+            A dict with "estimated_rows" and "estimated_cost" of the whole query (None where
+            the plan doesn't say), "warnings" about risky plan steps such as cartesian joins,
+            and "plan", the plan as text.
+        """
+        raise NotImplementedError(f"EXPLAIN is not supported for {self.db_type}.")
+
+    def introspect_schema(self, schema_name, tables=None):
+        """
+        Reads the tables, columns, data types and primary/foreign keys of a schema
+        from the database's catalog views. Restricted to `tables` when given.
+
+        Returns:
+            A dict of table name -> {"columns": [{"name", "type", "primary_key"}],
+            "foreign_keys": [{"column", "ref_table", "ref_column"}]}.
+        """
+        raise NotImplementedError(f"Schema introspection is not supported for {self.db_type}.")
+
+    def table_versions(self, schema_name):
+        """
+        Cheap per-table change markers (e.g. the last DDL time), used to re-read only
+        the tables that changed. Returns None where the database doesn't provide them.
+        """
+        return None
+
+    @staticmethod
+    def build_table_catalog(column_rows, constraint_rows):
+        """
+        Assembles introspection rows into the structure returned by introspect_schema().
+
+        Args:
+            column_rows: (table, column, data_type) rows in column order.
+            constraint_rows: (table, column, constraint_type, ref_table, ref_column) rows, where
+                constraint_type is 'PRIMARY KEY' or 'FOREIGN KEY'.
+        """
+        tables = {}
+        for table, column, data_type in column_rows:
+            entry = tables.setdefault(table, {"columns": [], "foreign_keys": []})
+            entry["columns"].append({"name": column, "type": str(data_type).upper(), "primary_key": False})
+        for table, column, constraint_type, ref_table, ref_column in constraint_rows:
+            entry = tables.get(table)
+            if entry is None:
+                continue
+            if constraint_type == 'PRIMARY KEY':
+                for column_entry in entry["columns"]:
+                    if column_entry["name"] == column:
+                        column_entry["primary_key"] = True
+            elif constraint_type == 'FOREIGN KEY' and ref_table:
+                foreign_key = {"column": column, "ref_table": ref_table, "ref_column": ref_column}
+                if foreign_key not in entry["foreign_keys"]:
+                    entry["foreign_keys"].append(foreign_key)
+        return tables
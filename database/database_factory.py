@@ -1,11 +1,28 @@
+import threading
+from typing import Dict
+
+from database.base_database import BaseDatabase
 from database.vertica_database import VerticaDatabase
 from database.oracle_database import OracleDatabase
 from database.postgres_database import PostgresDatabase
 
 
 class DatabaseFactory:
+    # Database instances are long-lived; their engines/pools live in the engine registry
+    _instances: Dict[str, BaseDatabase] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_database(cls, db_type: str):
+        with cls._lock:
+            database = cls._instances.get(db_type)
+            if database is None:
+                database = cls._create_database(db_type)
+                cls._instances[db_type] = database
+            return database
+
     @staticmethod
-    def get_database(db_type: str):
+    def _create_database(db_type: str):
         if db_type == 'VERTICA':
             return VerticaDatabase()
         elif db_type in ['SINONIMI', 'SHOPSTER', 'VIRGA_TEST', 'VIRGA']:
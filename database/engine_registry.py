@@ -0,0 +1,161 @@
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool, QueuePool
+
+from core.config import config
+
+
+class EngineRegistry:
+    """
+    Process-wide registry of pooled database connections.
+
+    Holds one SQLAlchemy engine (Oracle, PostgreSQL) or one DB-API connection
+    pool (Vertica, which has no SQLAlchemy dialect here) per database key, so
+    repeated queries reuse established connections instead of paying
+    TCP+TLS+auth on every call.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._engines: Dict[str, Engine] = {}
+        self._pools: Dict[str, Pool] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def get_engine(self, db_key: str, connection_string: str) -> Engine:
+        """
+        Returns the pooled engine for a database key, creating it on first use.
+
+        Args:
+            db_key: The database key (e.g. 'SINONIMI', 'POSTGRES').
+            connection_string: The SQLAlchemy URL used if the engine does not exist yet.
+
+        Returns:
+            The shared SQLAlchemy engine.
+        """
+        db_key = db_key.upper()
+        with self._lock:
+            engine = self._engines.get(db_key)
+            if engine is None:
+                settings = config.db_pool_settings(db_key)
+                engine = create_engine(
+                    connection_string,
+                    poolclass=QueuePool,
+                    pool_size=settings["pool_size"],
+                    max_overflow=settings["max_overflow"],
+                    pool_recycle=settings["pool_recycle"],
+                    pool_timeout=settings["pool_timeout"],
+                    pool_pre_ping=settings["pool_pre_ping"],
+                )
+                self._track(db_key, engine.pool)
+                self._engines[db_key] = engine
+                self.logger.info(f"Created pooled engine for {db_key} with settings {settings}")
+            return engine
+
+    def get_pool(self, db_key: str, creator: Callable) -> Pool:
+        """
+        Returns the DB-API connection pool for a database key, creating it on first use.
+        Used for drivers without a SQLAlchemy dialect (Vertica).
+
+        Args:
+            db_key: The database key (e.g. 'VERTICA').
+            creator: A zero-argument callable returning a new DB-API connection.
+
+        Returns:
+            The shared connection pool. Call `connect()` to check out a connection
+            and `close()` on it to return it to the pool.
+        """
+        db_key = db_key.upper()
+        with self._lock:
+            pool = self._pools.get(db_key)
+            if pool is None:
+                settings = config.db_pool_settings(db_key)
+                pool = QueuePool(
+                    creator,
+                    pool_size=settings["pool_size"],
+                    max_overflow=settings["max_overflow"],
+                    recycle=settings["pool_recycle"],
+                    timeout=settings["pool_timeout"],
+                )
+                if settings["pool_pre_ping"]:
+                    event.listen(pool, "checkout", self._ping_on_checkout)
+                self._track(db_key, pool)
+                self._pools[db_key] = pool
+                self.logger.info(f"Created connection pool for {db_key} with settings {settings}")
+            return pool
+
+    @staticmethod
+    def _ping_on_checkout(dbapi_connection, connection_record, connection_proxy):
+        # Pessimistic disconnect handling: raising DisconnectionError makes the
+        # pool discard this connection and retry the checkout with a fresh one.
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        except Exception:
+            raise exc.DisconnectionError()
+        finally:
+            cursor.close()
+
+    def _track(self, db_key: str, pool: Pool):
+        counters = {"connects": 0, "checkouts": 0, "invalidations": 0}
+        self._counters[db_key] = counters
+
+        def on_connect(dbapi_connection, connection_record):
+            counters["connects"] += 1
+
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            counters["checkouts"] += 1
+
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            counters["invalidations"] += 1
+
+        event.listen(pool, "connect", on_connect)
+        event.listen(pool, "checkout", on_checkout)
+        event.listen(pool, "invalidate", on_invalidate)
+
+    def pool_stats(self) -> Dict[str, Dict]:
+        """
+        Returns a snapshot of pool statistics for every registered database key.
+        """
+        with self._lock:
+            pools = {key: engine.pool for key, engine in self._engines.items()}
+            pools.update(self._pools)
+
+        stats = {}
+        for db_key, pool in pools.items():
+            entry = {"status": pool.status()}
+            if isinstance(pool, QueuePool):
+                entry.update({
+                    "size": pool.size(),
+                    "checked_in": pool.checkedin(),
+                    "checked_out": pool.checkedout(),
+                    "overflow": pool.overflow(),
+                })
+            entry.update(self._counters.get(db_key, {}))
+            stats[db_key] = entry
+        return stats
+
+    def dispose(self, db_key: Optional[str] = None):
+        """
+        Closes pooled connections for one database key, or for all keys if none is given.
+        """
+        with self._lock:
+            keys = [db_key.upper()] if db_key else list(set(self._engines) | set(self._pools))
+            for key in keys:
+                engine = self._engines.pop(key, None)
+                if engine is not None:
+                    engine.dispose()
+                pool = self._pools.pop(key, None)
+                if pool is not None:
+                    pool.dispose()
+                self._counters.pop(key, None)
+                self.logger.info(f"Disposed connection pool for {key}")
+
+
+# Global registry instance shared by all database classes
+engine_registry = EngineRegistry()
@@ -1,8 +1,9 @@
 import pandas as pd
-from sqlalchemy import create_engine
 import os
 import logging
+import uuid
 from database.base_database import BaseDatabase
+from database.engine_registry import engine_registry
 
 
 class OracleDatabase(BaseDatabase):
@@ -40,7 +41,8 @@ class OracleDatabase(BaseDatabase):
         self.user = config['user']
         self.password = config['password']
         self.connection_string = f'oracle+cx_oracle://{self.user}:{self.password}@{self.host}:{self.port}/?service_name={self.service_name}'
-        self.engine = create_engine(self.connection_string)
+        self.db_key = db_name.upper()
+        self.engine = engine_registry.get_engine(self.db_key, self.connection_string)
         logging.info(f"Initialized OracleDatabase for {db_name}")
 
     def query(self, sql_query: str):
@@ -48,3 +50,108 @@ class OracleDatabase(BaseDatabase):
         with self.engine.connect() as connection:
             result = pd.read_sql_query(sql_query, connection)
         return result
+
+    def iter_batches(self, sql_query: str, batch_size: int):
+        logging.info(f"Streaming database query: {sql_query}")
+        with self.engine.connect() as connection:
+            # Raw driver SQL (no bind parameter parsing), as with query()
+            result = connection.execution_options(
+                stream_results=True, max_row_buffer=batch_size
+            ).exec_driver_sql(sql_query.rstrip().rstrip(';'))
+            columns = list(result.keys())
+            row_count = 0
+            for partition in result.partitions(batch_size):
+                row_count += len(partition)
+                yield columns, [tuple(row) for row in partition]
+            if row_count == 0:
+                yield columns, []
+            logging.info(f"Query streamed {row_count} rows.")
+
+    @staticmethod
+    def _table_filter(tables, column: str, params: dict) -> str:
+        # Named binds in chunks of 1000, Oracle's IN-list limit
+        if tables is None:
+            return ""
+        tables = list(tables)
+        if not tables:
+            return " AND 1 = 0"
+        clauses = []
+        for start in range(0, len(tables), 1000):
+            names = []
+            for offset, table in enumerate(tables[start:start + 1000]):
+                name = f"t{start + offset}"
+                params[name] = table
+                names.append(f":{name}")
+            clauses.append(f"{column} IN ({', '.join(names)})")
+        return f" AND ({' OR '.join(clauses)})"
+
+    def introspect_schema(self, schema_name: str, tables=None):
+        logging.info(f"Introspecting Oracle schema {schema_name}")
+        owner = schema_name.upper()
+        params = {"owner": owner}
+        columns_sql = (
+            "SELECT table_name, column_name, data_type FROM all_tab_columns WHERE owner = :owner"
+            + self._table_filter(tables, "table_name", params)
+            + " ORDER BY table_name, column_id"
+        )
+        constraints_sql = (
+            "SELECT c.table_name, cc.column_name,"
+            " CASE c.constraint_type WHEN 'P' THEN 'PRIMARY KEY' ELSE 'FOREIGN KEY' END,"
+            " r.table_name, rcc.column_name"
+            " FROM all_constraints c"
+            " JOIN all_cons_columns cc ON cc.owner = c.owner AND cc.constraint_name = c.constraint_name"
+            " LEFT JOIN all_constraints r ON r.owner = c.r_owner AND r.constraint_name = c.r_constraint_name"
+            " LEFT JOIN all_cons_columns rcc ON rcc.owner = r.owner AND rcc.constraint_name = r.constraint_name"
+            " AND rcc.position = cc.position"
+            " WHERE c.owner = :owner AND c.constraint_type IN ('P', 'R')"
+            + self._table_filter(tables, "c.table_name", params)
+        )
+        with self.engine.connect() as connection:
+            column_rows = connection.exec_driver_sql(columns_sql, params).fetchall()
+            constraint_rows = connection.exec_driver_sql(constraints_sql, params).fetchall()
+        return self.build_table_catalog(column_rows, constraint_rows)
+
+    def table_versions(self, schema_name: str):
+        sql = (
+            "SELECT object_name, TO_CHAR(last_ddl_time, 'YYYYMMDDHH24MISS') FROM all_objects"
+            " WHERE owner = :owner AND object_type IN ('TABLE', 'VIEW')"
+        )
+        with self.engine.connect() as connection:
+            rows = connection.exec_driver_sql(sql, {"owner": schema_name.upper()}).fetchall()
+        return {table: version for table, version in rows}
+
+    def explain(self, sql_query: str):
+        logging.info(f"Explaining database query: {sql_query}")
+        # Statement IDs keep concurrent explains apart in PLAN_TABLE (30 characters at most)
+        statement_id = f"SQLOSLAV_{uuid.uuid4().hex[:20]}"
+        params = {"statement_id": statement_id}
+        with self.engine.connect() as connection:
+            try:
+                connection.exec_driver_sql(
+                    f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR {sql_query.rstrip().rstrip(';')}")
+                steps = connection.exec_driver_sql(
+                    "SELECT id, operation, options, cardinality, cost FROM plan_table"
+                    " WHERE statement_id = :statement_id ORDER BY id", params).fetchall()
+                plan = connection.exec_driver_sql(
+                    "SELECT plan_table_output FROM TABLE(DBMS_XPLAN.DISPLAY('PLAN_TABLE', :statement_id, 'TYPICAL'))",
+                    params).fetchall()
+            finally:
+                connection.exec_driver_sql("DELETE FROM plan_table WHERE statement_id = :statement_id", params)
+                connection.commit()
+        return self.parse_plan(steps, "\n".join(str(row[0]) for row in plan))
+
+    @staticmethod
+    def parse_plan(steps, plan: str) -> dict:
+        """
+        Reads the estimates off step 0 of the PLAN_TABLE rows
+        (id, operation, options, cardinality, cost) and flags cartesian merge joins.
+        """
+        estimated_rows = estimated_cost = None
+        warnings = []
+        for step_id, operation, options, cardinality, cost in steps:
+            if step_id == 0:
+                estimated_rows = float(cardinality) if cardinality is not None else None
+                estimated_cost = float(cost) if cost is not None else None
+            if operation == "MERGE JOIN" and options == "CARTESIAN":
+                warnings.append(f"Cartesian join at plan step {step_id}")
+        return {"estimated_rows": estimated_rows, "estimated_cost": estimated_cost, "warnings": warnings, "plan": plan}
@@ -1,11 +1,26 @@
+import json
 import pandas as pd
-from sqlalchemy import create_engine, text
+import pyarrow as pa
+from sqlalchemy import bindparam, text
 import os
 import logging
 from database.base_database import BaseDatabase
+from database.engine_registry import engine_registry
+
+try:
+    # Optional: ADBC fetches PostgreSQL results directly as Arrow record batches
+    import adbc_driver_postgresql.dbapi as adbc_postgres
+except ImportError:
+    adbc_postgres = None
+
+
+# SQLSTATE of statements COPY can't wrap (e.g. SELECT ... INTO)
+FEATURE_NOT_SUPPORTED = "0A000"
 
 
 class PostgresDatabase(BaseDatabase):
+    supports_native_export = True
+
     def __init__(self):
         super().__init__('postgres')
         
@@ -18,7 +33,8 @@ class PostgresDatabase(BaseDatabase):
         
         # Create connection string
         self.connection_string = f'postgresql://{postgres_user}:{postgres_password}@{postgres_host}:{postgres_port}/{postgres_db}'
-        self.engine = create_engine(self.connection_string)
+        self.db_key = 'POSTGRES'
+        self.engine = engine_registry.get_engine(self.db_key, self.connection_string)
         
         # Log connection info with password masked
         safe_conn_string = self.connection_string.replace(postgres_password, '********')
@@ -38,4 +54,173 @@ class PostgresDatabase(BaseDatabase):
                 return result
         except Exception as e:
             logging.error(f"Error executing PostgreSQL query: {e}")
-            raise Exception(f"PostgreSQL database error: {e}") 
\ No newline at end of file
+            raise Exception(f"PostgreSQL database error: {e}")
+
+    def iter_batches(self, sql_query: str, batch_size: int):
+        logging.info(f"Streaming database query: {sql_query}")
+        try:
+            sql_query = sql_query.rstrip(';')
+
+            with self.engine.connect() as connection:
+                # stream_results uses a psycopg2 named (server-side) cursor
+                result = connection.execution_options(
+                    stream_results=True, max_row_buffer=batch_size
+                ).execute(text(sql_query))
+                columns = list(result.keys())
+                row_count = 0
+                for partition in result.partitions(batch_size):
+                    row_count += len(partition)
+                    yield columns, [tuple(row) for row in partition]
+                if row_count == 0:
+                    yield columns, []
+                logging.info(f"Query streamed {row_count} rows.")
+        except Exception as e:
+            logging.error(f"Error executing PostgreSQL query: {e}")
+            raise Exception(f"PostgreSQL database error: {e}")
+
+    def export_csv(self, sql_query: str, fileobj) -> int:
+        logging.info(f"Exporting database query with COPY: {sql_query}")
+        sql_query = sql_query.strip().rstrip(';')
+        # Newlines keep a trailing "-- comment" from swallowing the closing parenthesis
+        copy_sql = f"COPY (\n{sql_query}\n) TO STDOUT WITH (FORMAT CSV, HEADER)"
+
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            try:
+                if not hasattr(cursor, "copy_expert"):
+                    raise NotImplementedError("The PostgreSQL driver has no copy_expert().")
+                # The server formats the CSV; bytes go straight into the file
+                cursor.copy_expert(copy_sql, fileobj)
+                row_count = cursor.rowcount
+            finally:
+                cursor.close()
+            connection.commit()
+            logging.info(f"COPY exported {row_count} rows.")
+            return row_count
+        except NotImplementedError:
+            connection.rollback()
+            raise
+        except Exception as e:
+            connection.rollback()
+            if getattr(e, "pgcode", None) == FEATURE_NOT_SUPPORTED:
+                raise NotImplementedError(f"COPY can't export this query: {e}")
+            logging.error(f"Error exporting PostgreSQL query with COPY: {e}")
+            raise Exception(f"PostgreSQL database error: {e}")
+        finally:
+            connection.close()  # Returns the connection to the pool
+
+    def query_arrow(self, sql_query: str, batch_size: int):
+        if adbc_postgres is None:
+            # Without ADBC, convert each server-side cursor batch into Arrow columns
+            yield from super().query_arrow(sql_query, batch_size)
+            return
+
+        logging.info(f"Database query (ADBC/Arrow): {sql_query}")
+        try:
+            sql_query = sql_query.rstrip(';')
+            # ADBC connections get their own pool, limited like the engine's
+            connection = engine_registry.get_pool(f"{self.db_key}_ADBC", self._connect_adbc).connect()
+            try:
+                with connection.cursor() as cur:
+                    cur.execute(sql_query)
+                    reader = cur.fetch_record_batch()
+                    row_count = 0
+                    for batch in reader:
+                        row_count += batch.num_rows
+                        yield batch
+                    if row_count == 0:
+                        yield pa.RecordBatch.from_pylist([], schema=reader.schema)
+                    logging.info(f"Query returned {row_count} rows as Arrow batches.")
+            finally:
+                connection.close()  # Returns the connection to the pool
+        except Exception as e:
+            logging.error(f"Error executing PostgreSQL query: {e}")
+            raise Exception(f"PostgreSQL database error: {e}")
+
+    def _connect_adbc(self):
+        return adbc_postgres.connect(self.connection_string)
+
+    def explain(self, sql_query: str):
+        logging.info(f"Explaining database query: {sql_query}")
+        sql_query = sql_query.strip().rstrip(';')
+        try:
+            with self.engine.connect() as connection:
+                plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql_query}")).scalar()
+        except Exception as e:
+            logging.error(f"Error explaining PostgreSQL query: {e}")
+            raise Exception(f"PostgreSQL database error: {e}")
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return self.parse_plan(plan[0]["Plan"])
+
+    @staticmethod
+    def parse_plan(root: dict) -> dict:
+        """
+        Reads the estimates off the root node of an EXPLAIN (FORMAT JSON) plan and
+        flags nested loops that join without any condition.
+        """
+        warnings = []
+        lines = []
+
+        def has_condition(node):
+            if any(key in node for key in ("Index Cond", "Recheck Cond", "Hash Cond", "Merge Cond", "Join Filter")):
+                return True
+            return any(has_condition(child) for child in node.get("Plans", []))
+
+        def walk(node, depth):
+            lines.append(f"{'  ' * depth}-> {node['Node Type']} (rows={node.get('Plan Rows')}, "
+                         f"cost={node.get('Total Cost')})")
+            children = node.get("Plans", [])
+            if (node["Node Type"] == "Nested Loop" and len(children) == 2 and "Join Filter" not in node
+                    and not has_condition(children[1])
+                    and min(child.get("Plan Rows", 0) for child in children) > 1):
+                warnings.append(f"Cartesian join: a nested loop joins {children[0].get('Plan Rows')} rows "
+                                f"with {children[1].get('Plan Rows')} rows without a join condition")
+            for child in children:
+                walk(child, depth + 1)
+
+        walk(root, 0)
+        return {
+            "estimated_rows": root.get("Plan Rows"),
+            "estimated_cost": root.get("Total Cost"),
+            "warnings": warnings,
+            "plan": "\n".join(lines),
+        }
+
+    def introspect_schema(self, schema_name: str, tables=None):
+        logging.info(f"Introspecting PostgreSQL schema {schema_name}")
+        columns_sql = """
+            SELECT table_name, column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = :schema {table_filter}
+            ORDER BY table_name, ordinal_position
+        """
+        constraints_sql = """
+            SELECT tc.table_name, kcu.column_name, tc.constraint_type, ccu.table_name, ccu.column_name
+            FROM information_schema.table_constraints tc
+            JOIN information_schema.key_column_usage kcu
+              ON kcu.constraint_schema = tc.constraint_schema AND kcu.constraint_name = tc.constraint_name
+            LEFT JOIN information_schema.constraint_column_usage ccu
+              ON tc.constraint_type = 'FOREIGN KEY'
+             AND ccu.constraint_schema = tc.constraint_schema AND ccu.constraint_name = tc.constraint_name
+            WHERE tc.table_schema = :schema AND tc.constraint_type IN ('PRIMARY KEY', 'FOREIGN KEY') {table_filter}
+        """
+        params = {"schema": schema_name}
+        table_filter = ""
+        if tables is not None:
+            table_filter = "AND table_name IN :tables"
+            params["tables"] = list(tables)
+        try:
+            with self.engine.connect() as connection:
+                columns_stmt = text(columns_sql.format(table_filter=table_filter))
+                constraints_stmt = text(constraints_sql.format(table_filter=table_filter.replace("table_name", "tc.table_name")))
+                if tables is not None:
+                    columns_stmt = columns_stmt.bindparams(bindparam("tables", expanding=True))
+                    constraints_stmt = constraints_stmt.bindparams(bindparam("tables", expanding=True))
+                column_rows = connection.execute(columns_stmt, params).fetchall()
+                constraint_rows = connection.execute(constraints_stmt, params).fetchall()
+            return self.build_table_catalog(column_rows, constraint_rows)
+        except Exception as e:
+            logging.error(f"Error introspecting PostgreSQL schema: {e}")
+            raise Exception(f"PostgreSQL database error: {e}")
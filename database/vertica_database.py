@@ -1,8 +1,14 @@
+import re
 import pandas as pd
 import vertica_python
 import os
 import logging
 from database.base_database import BaseDatabase
+from database.engine_registry import engine_registry
+
+# "[Cost: 1K, Rows: 10M]" annotations of EXPLAIN plan steps
+_PLAN_ESTIMATE = re.compile(r"\[Cost: ([\d.]+)([KMBT]?), Rows: ([\d.]+)([KMBT]?)")
+_PLAN_UNITS = {"": 1, "K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
 
 
 class VerticaDatabase(BaseDatabase):
@@ -43,15 +49,23 @@ class VerticaDatabase(BaseDatabase):
         if 'password' in safe_conn_info:
             safe_conn_info['password'] = '********'
         logging.info(f"Connection info: {safe_conn_info}")
+        self.db_key = 'VERTICA'
+        self.pool = engine_registry.get_pool(self.db_key, self._connect)
+
+    def _connect(self):
+        return vertica_python.connect(**self.conn_info)
 
     def query(self, sql_query: str):
         logging.info(f"Database query: {sql_query}")
         try:
-            with vertica_python.connect(**self.conn_info) as connection:
+            connection = self.pool.connect()
+            try:
                 with connection.cursor() as cur:
                     cur.execute(sql_query)
                     df = pd.DataFrame(cur.fetchall(), columns=[desc[0] for desc in cur.description])
                     logging.info(f"Query returned {len(df)} rows.")
+            finally:
+                connection.close()  # Returns the connection to the pool
             return df
         except vertica_python.Error as e:
             logging.error(f"An error occurred: {e}")
@@ -59,3 +73,111 @@ class VerticaDatabase(BaseDatabase):
         except Exception as e:
             logging.error(f"Unexpected error connecting to Vertica: {e}")
             raise Exception(f"Failed to connect to Vertica database: {e}")
+
+    def iter_batches(self, sql_query: str, batch_size: int):
+        logging.info(f"Streaming database query: {sql_query}")
+        try:
+            connection = self.pool.connect()
+        except Exception as e:
+            logging.error(f"Unexpected error connecting to Vertica: {e}")
+            raise Exception(f"Failed to connect to Vertica database: {e}")
+
+        try:
+            with connection.cursor() as cur:
+                # vertica_python reads rows off the socket as they are fetched
+                cur.execute(sql_query)
+                columns = [desc[0] for desc in cur.description]
+                row_count = 0
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    row_count += len(rows)
+                    yield columns, [tuple(row) for row in rows]
+                if row_count == 0:
+                    yield columns, []
+                logging.info(f"Query streamed {row_count} rows.")
+        except vertica_python.Error as e:
+            logging.error(f"An error occurred: {e}")
+            raise Exception(f"Vertica database error: {e}")
+        finally:
+            connection.close()  # Returns the connection to the pool
+
+    def introspect_schema(self, schema_name: str, tables=None):
+        logging.info(f"Introspecting Vertica schema {schema_name}")
+        params = {"schema": schema_name}
+        table_filter = ""
+        if tables is not None:
+            names = []
+            for index, table in enumerate(tables):
+                params[f"t{index}"] = table
+                names.append(f":t{index}")
+            table_filter = f" AND table_name IN ({', '.join(names)})" if names else " AND 1 = 0"
+        columns_sql = (
+            "SELECT table_name, column_name, data_type FROM v_catalog.columns"
+            " WHERE table_schema = :schema" + table_filter + " ORDER BY table_name, ordinal_position"
+        )
+        constraints_sql = (
+            "SELECT table_name, column_name, 'PRIMARY KEY', NULL, NULL FROM v_catalog.primary_keys"
+            " WHERE table_schema = :schema" + table_filter +
+            " UNION ALL"
+            " SELECT table_name, column_name, 'FOREIGN KEY', reference_table_name, reference_column_name"
+            " FROM v_catalog.foreign_keys WHERE table_schema = :schema" + table_filter
+        )
+        try:
+            connection = self.pool.connect()
+        except Exception as e:
+            logging.error(f"Unexpected error connecting to Vertica: {e}")
+            raise Exception(f"Failed to connect to Vertica database: {e}")
+        try:
+            with connection.cursor() as cur:
+                cur.execute(columns_sql, params)
+                column_rows = cur.fetchall()
+                cur.execute(constraints_sql, params)
+                constraint_rows = cur.fetchall()
+            return self.build_table_catalog(column_rows, constraint_rows)
+        except vertica_python.Error as e:
+            logging.error(f"An error occurred: {e}")
+            raise Exception(f"Vertica database error: {e}")
+        finally:
+            connection.close()  # Returns the connection to the pool
+
+    def explain(self, sql_query: str):
+        logging.info(f"Explaining database query: {sql_query}")
+        try:
+            connection = self.pool.connect()
+        except Exception as e:
+            logging.error(f"Unexpected error connecting to Vertica: {e}")
+            raise Exception(f"Failed to connect to Vertica database: {e}")
+        try:
+            with connection.cursor() as cur:
+                cur.execute(f"EXPLAIN {sql_query.strip().rstrip(';')}")
+                plan = "\n".join(str(row[0]) for row in cur.fetchall())
+            return self.parse_plan(plan)
+        except vertica_python.Error as e:
+            logging.error(f"An error occurred: {e}")
+            raise Exception(f"Vertica database error: {e}")
+        finally:
+            connection.close()  # Returns the connection to the pool
+
+    @staticmethod
+    def parse_plan(plan: str) -> dict:
+        """
+        Reads the estimates off the first (root) step of a text EXPLAIN plan and
+        flags the steps Vertica marks as cartesian joins.
+        """
+        estimated_rows = estimated_cost = None
+        warnings = []
+        for line in plan.splitlines():
+            estimate = _PLAN_ESTIMATE.search(line)
+            if estimate is None:
+                continue
+            cost, cost_unit, rows, rows_unit = estimate.groups()
+            if estimated_rows is None:
+                estimated_cost = float(cost) * _PLAN_UNITS[cost_unit]
+                estimated_rows = float(rows) * _PLAN_UNITS[rows_unit]
+            if "[Cartesian]" in line:
+                warnings.append(f"Cartesian join: {line.strip(' |+->')[:200]}")
+        if "NO STATISTICS" in plan:
+            warnings.append("Some tables have no statistics; the estimates may be far off")
+        return {"estimated_rows": estimated_rows, "estimated_cost": estimated_cost, "warnings": warnings, "plan": plan}
@@ -1,47 +1,70 @@
+import re
+
+
 class MessageParser:
+    # Modifiers that may follow "sqloslav", e.g. "sqloslav, debug, fresh SELECT ..."
+    # Each maps to the option it sets.
+    MODIFIERS = {
+        "debug": ("debug", True),
+        "fresh": ("fresh", True),  # Bypass cached results
+        # Result formats (default: RESULT_FORMAT)
+        "auto": ("format", "auto"),
+        "inline": ("format", "inline"),
+        "csv": ("format", "csv"),
+        "gzip": ("format", "csv.gz"),
+        "zstd": ("format", "csv.zst"),
+        "parquet": ("format", "parquet"),
+        "arrow": ("format", "arrow"),
+        "excel": ("format", "xlsx"),
+        "xlsx": ("format", "xlsx"),
+    }
+
     def __init__(self):
-        pass
+        self.modifier_pattern = re.compile(
+            r"\s*,\s*(" + "|".join(re.escape(name) for name in self.MODIFIERS) + r")\b",
+            re.IGNORECASE
+        )
 
     def parse_message(self, message: str):
+        """
+        Parses a Slack message into its target database, query text and options.
+
+        Returns:
+            A tuple (db_type, query_text, is_debug_mode, options), where options holds
+            the remaining modifiers (e.g. {'fresh': True, 'format': 'parquet'}).
+        """
         message_lower = message.strip().lower()
         text_content = message.strip()
-        is_debug_mode = False
+        options = {}
         db_type = "POSTGRES"  # Default for SQLoslav
 
-        # Order of checks is important: check for "sqloslav, debug" first
-        if message_lower.startswith("sqloslav, debug"):
-            is_debug_mode = True
-            # Extract text after "sqloslav, debug " (note the space)
-            # Original casing of the query is preserved from text_content
-            prefix_len = len("sqloslav, debug ")
-            if len(text_content) > prefix_len:
-                query_text = text_content[prefix_len:].strip()
-            else: # Handles "sqloslav, debug" with nothing after
-                query_text = ""
-            
-        elif message_lower.startswith("sqloslav"):
-            # Handles "sqloslav" and "sqloslav " (note the space)
+        if message_lower.startswith("sqloslav"):
+            # Consume any ", <modifier>" groups after "sqloslav".
             # Original casing of the query is preserved from text_content
-            prefix_len = len("sqloslav ")
-            if message_lower == "sqloslav": # Just "sqloslav"
-                query_text = ""
-            elif len(text_content) > prefix_len: # "sqloslav query..."
-                query_text = text_content[prefix_len:].strip()
-            else: # Handles "sqloslav " with nothing after (edge case, strip would make it same as just "sqloslav")
-                query_text = "" # Should effectively be caught by message_lower == "sqloslav" after strip
+            rest = text_content[len("sqloslav"):]
+            while True:
+                match = self.modifier_pattern.match(rest)
+                if not match:
+                    break
+                option, value = self.MODIFIERS[match.group(1).lower()]
+                options[option] = value
+                rest = rest[match.end():]
+            # Handles "sqloslav", "sqloslav query..." and "sqloslav, query..."
+            query_text = rest.lstrip(',').strip()
         else:
             # If it doesn't start with "sqloslav" at all,
             # consider it as direct natural language text or an invalid command.
             # For NLMessageProcessor, this means the whole message is the 'text'.
             # We should not raise an error here if we want NLProcessor to handle non-prefixed messages.
             # Let's assume for now that if it's not prefixed, it's all query_text and not debug mode.
-            query_text = text_content 
+            query_text = text_content
             # db_type remains POSTGRES, or could be made None if not SQLoslav-triggered
             # For simplicity with current NL flow, let's keep db_type POSTGRES.
             # And it's not debug mode if not explicitly triggered.
 
+        is_debug_mode = options.pop("debug", False)
         clean_query = self.clean_query(query_text)
-        return db_type, clean_query, is_debug_mode
+        return db_type, clean_query, is_debug_mode, options
 
     @staticmethod
     def clean_query(query: str) -> str:
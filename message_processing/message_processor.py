@@ -1,8 +1,18 @@
+import asyncio
 import logging
 import os
+from typing import Callable, Optional, Tuple
+
 import pandas as pd
+from core.config import config
 from message_processing.message_parser import MessageParser
+from processing.artifact_retention import artifact_retention
+from processing.cost_guard import QueryRefusedError
+from processing.data_frame_handler import DataFrameHandler, Result
+from processing.result_buffer import ResultBuffer, discard_result
+from processing.result_formats import choose_file_format, choose_format, render_inline
 from processing.sql_executor import SQLExecutor
+from processing.query_dispatcher import query_dispatcher
 from slack_uploader.slack_uploader import SlackUploader
 from error_handling.error_handler import ErrorHandler
 
@@ -10,6 +20,7 @@ from error_handling.error_handler import ErrorHandler
 class MessageProcessor:
     def __init__(self):
         self.sql_executor = SQLExecutor()
+        self.query_dispatcher = query_dispatcher
         self.slack_uploader = SlackUploader(token=os.getenv('SLACK_BOT_TOKEN'))
         self.error_handler = ErrorHandler()
         self.parser = MessageParser()
@@ -20,38 +31,144 @@ class MessageProcessor:
         logging.debug(f"Received message: {message}")
 
         try:
-            db_type, sql_query, is_debug_mode = self.parser.parse_message(message)
-            logging.info(f"Parsed message. DB Type: {db_type}, SQL Query: {sql_query}, Debug Mode: {is_debug_mode}")
+            db_type, sql_query, is_debug_mode, options = self.parser.parse_message(message)
+            logging.info(f"Parsed message. DB Type: {db_type}, SQL Query: {sql_query}, Debug Mode: {is_debug_mode}, "
+                         f"Options: {options}")
 
             if not sql_query:
                 return "Please provide a SQL query to execute after 'SQLoslav' or 'SQLoslav, debug'."
 
-            result_df = self.sql_executor.execute_sql(sql_query, db_type)
-            self.log_dataframe_info(result_df)
+            result, row_count = await self.execute_and_export(sql_query, db_type,
+                                                              use_cache=not options.get("fresh"),
+                                                              channel_id=channel_id)
 
-            if result_df.empty:
+            if row_count == 0:
                 logging.info("Query executed successfully but returned no results.")
                 if is_debug_mode:
                     return self.format_no_results_message(sql_query)
                 else:
                     return "Query executed successfully but returned no results."
 
-            _, file_path = self.sql_executor.summarize_and_save(result_df)
-
             try:
-                await self.slack_uploader.upload_file_to_slack(file_path, channel_id)
+                inline_table, file_name = await self.deliver_result(result, row_count, channel_id,
+                                                                    options.get("format"))
+                if inline_table:
+                    return inline_table
                 if is_debug_mode:
-                    return f"Query successful. Results are in the attached file: {os.path.basename(file_path)}"
+                    return f"Query successful. Results are in the attached file: {file_name}"
                 else:
                     return ""
             except Exception as e:
                 error_message = self.error_handler.handle_error(e, "uploading file to Slack", channel_id)
                 return error_message
 
+        except QueryRefusedError as e:
+            return str(e)
         except Exception as e:
             error_message = self.error_handler.handle_error(e, "processing message", channel_id)
             return error_message
 
+    def cost_warning_poster(self, channel_id: str) -> Callable[[str], None]:
+        """
+        Returns a callback that posts cost guard warnings to the channel. The cost guard runs
+        on a worker thread, so the message is handed to the event loop.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def post(message: str):
+            try:
+                await self.slack_uploader.send_message_to_channel(message, channel_id)
+            except Exception as e:
+                logging.warning(f"Could not post the cost warning to Slack: {e}")
+
+        return lambda message: asyncio.run_coroutine_threadsafe(post(message), loop)
+
+    async def execute_and_export(self, sql_query: str, db_type: str, use_cache: bool = True,
+                                 channel_id: str = None) -> Tuple[Optional[Result], int]:
+        """
+        Executes the query off the event loop and writes the full result to a file,
+        or to a spooled buffer when RESULT_DELIVERY_MODE is 'spooled'. Queries that miss
+        the result cache are checked by the cost guard first; its warnings go to the channel.
+
+        Args:
+            sql_query: The SQL query to run.
+            db_type: The database key.
+            use_cache: Set to False ("sqloslav, fresh ...") to bypass cached results.
+            channel_id: The Slack channel asking.
+
+        Raises:
+            QueryRefusedError: The cost guard refused the query.
+
+        Returns:
+            The result (file path or buffer) and row count, or (None, 0) if the query returned no rows.
+        """
+        on_cost_warning = self.cost_warning_poster(channel_id) if channel_id else None
+        if config.result_export_mode != "dataframe":
+            # Rows go from the database to the file without a DataFrame
+            return await self.query_dispatcher.run(db_type, self.sql_executor.export_sql_to_file,
+                                                   sql_query, db_type, use_cache, channel_id, on_cost_warning)
+
+        result_df = await self.query_dispatcher.run(db_type, self.sql_executor.execute_sql,
+                                                    sql_query, db_type, channel_id, on_cost_warning)
+        self.log_dataframe_info(result_df)
+        if result_df.empty:
+            return None, 0
+        _, result = await self.query_dispatcher.run_blocking(self.sql_executor.summarize_and_save, result_df)
+        return result, len(result_df)
+
+    async def deliver_result(self, result: Result, row_count: int, channel_id: str,
+                             requested_format: str = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Delivers a CSV result in the requested format ("sqloslav, parquet ..."), or in the
+        format chosen from its row count and size: small results become a text table for
+        the reply, larger ones are converted if needed and uploaded.
+
+        Returns:
+            The text table to reply with, or None and the name of the uploaded file.
+        """
+        try:
+            fmt = choose_format(requested_format, row_count, DataFrameHandler.result_size(result))
+            if fmt == "inline":
+                inline_table = await self.query_dispatcher.run_blocking(self.render_result_inline, result)
+                if inline_table is not None:
+                    discard_result(result)
+                    return inline_table, None
+                # Too wide to post as a message
+                fmt = choose_file_format(DataFrameHandler.result_size(result))
+            if fmt != "csv":
+                result = await self.query_dispatcher.run_blocking(self.sql_executor.df_handler.convert_result,
+                                                                  result, fmt)
+        except BaseException:
+            # Nothing will upload (and unpin) the result, so it would stay pinned forever
+            discard_result(result)
+            raise
+        await self.upload_result(result, channel_id)
+        return None, DataFrameHandler.result_name(result)
+
+    @staticmethod
+    def render_result_inline(result: Result) -> Optional[str]:
+        with DataFrameHandler.open_result(result) as source:
+            return render_inline(source)
+
+    async def upload_result(self, result: Result, channel_id: str) -> str:
+        """
+        Uploads a query result to the channel. Buffers are read directly and released as
+        soon as the upload is confirmed (or has failed); result files stay on disk until
+        the artifact retention manager deletes them.
+
+        Returns:
+            The permalink of the uploaded file.
+        """
+        if isinstance(result, ResultBuffer):
+            try:
+                return await self.slack_uploader.upload_fileobj_to_slack(result.rewind(), result.name, channel_id)
+            finally:
+                result.release()
+        try:
+            return await self.slack_uploader.upload_file_to_slack(result, channel_id)
+        finally:
+            artifact_retention.unpin(result)
+
     @staticmethod
     def log_dataframe_info(df: pd.DataFrame):
         logging.info(f"DataFrame info:")
@@ -93,5 +210,5 @@ class MessageProcessor:
             logging.error(f"Error verifying uploaded file: {str(e)}", exc_info=True)
             return False
         finally:
-            if 'downloaded_file_path' in locals() and os.path.exists(downloaded_file_path):
-                os.remove(downloaded_file_path)  # Clean up the downloaded file
+            if 'downloaded_file_path' in locals():
+                artifact_retention.remove(downloaded_file_path)  # Clean up the downloaded file
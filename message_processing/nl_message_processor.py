@@ -1,7 +1,9 @@
+import asyncio
 import logging
-from typing import Dict, Tuple
 
+from core.config import config
 from message_processing.message_processor import MessageProcessor
+from processing.cost_guard import QueryRefusedError
 from query_generation.query_generator import QueryGenerator
 from query_generation.sql_validator import SQLValidator
 
@@ -37,8 +39,9 @@ class NLMessageProcessor(MessageProcessor):
         
         try:
             # Parse the message to extract db_type, query text, and debug mode
-            db_type, text, is_debug_mode = self.parser.parse_message(message)
-            logging.info(f"Parsed message. DB Type: {db_type}, Text: {text}, Debug Mode: {is_debug_mode}")
+            db_type, text, is_debug_mode, options = self.parser.parse_message(message)
+            logging.info(f"Parsed message. DB Type: {db_type}, Text: {text}, Debug Mode: {is_debug_mode}, "
+                         f"Options: {options}")
             
             if is_debug_mode:
                 logging.info("Debug mode is active based on parser.")
@@ -55,18 +58,45 @@ class NLMessageProcessor(MessageProcessor):
             if is_natural_language:
                 logging.info("Detected natural language query, generating SQL")
                 
+                explanation_task = None
                 try:
                     # Convert natural language to SQL
-                    sql_query, metadata = self.query_generator.generate_sql_from_natural_language(text)
+                    use_cache = not options.get("fresh")
+                    if config.llm_streaming:
+                        # The explanation is only shown in debug mode; otherwise generation
+                        # stops as soon as the SQL is complete
+                        sql_query, metadata, rest = await self.query_generator.stream_sql_async(
+                            text, use_cache=use_cache, need_explanation=is_debug_mode)
+                    else:
+                        sql_query, metadata = await self.query_generator.generate_sql_async(text, use_cache=use_cache)
+                        rest = None
                     
                     # Log the generated SQL and metadata
                     logging.info(f"Generated SQL from natural language: {sql_query}")
                     logging.debug(f"Query generation metadata: {metadata}")
+                    if "llm_latency_ms" in metadata:
+                        logging.info(f"LLM call took {metadata['llm_latency_ms']} ms after "
+                                     f"{metadata['queue_wait_ms']} ms rate limiter wait")
                     
                     # Validate the generated SQL query
                     is_valid, validation_results = self.sql_validator.validate_query(sql_query)
                     
+                    if (not is_valid and config.sql_repair_enabled
+                            and validation_results["issues"] == validation_results["semantic_issues"]):
+                        # Only unresolved tables or columns: ask the LLM once more with the problems
+                        if rest is not None:
+                            rest.cancel()
+                            rest = None
+                        self.query_generator.discard_generation(text, metadata)
+                        sql_query, metadata = await self.query_generator.repair_sql_async(
+                            text, sql_query, validation_results["issues"])
+                        logging.info(f"Repaired SQL: {sql_query}")
+                        is_valid, validation_results = self.sql_validator.validate_query(sql_query)
+                    
                     if not is_valid:
+                        if rest is not None:
+                            rest.cancel()
+                        self.query_generator.discard_generation(text, metadata)
                         # If validation fails, return an error message
                         error_message = f"Generated SQL query failed validation: {', '.join(validation_results['issues'])}"
                         logging.warning(error_message)
@@ -87,26 +117,32 @@ class NLMessageProcessor(MessageProcessor):
                     # Send an initial message with the generated SQL only if in debug mode
                     if is_debug_mode:
                         await self.send_message_to_slack(generated_message, channel_id)
+                        if rest is not None:
+                            # The explanation is still streaming; post it when it arrives while the query runs
+                            explanation_task = asyncio.ensure_future(self._send_explanation(rest, channel_id))
+                    elif rest is not None:
+                        rest.cancel()
                     
                     # Use the existing SQL execution flow with the generated query
-                    result_df = self.sql_executor.execute_sql(sql_query, db_type)
-                    self.log_dataframe_info(result_df)
+                    result, row_count = await self.execute_and_export(sql_query, db_type,
+                                                                      use_cache=not options.get("fresh"),
+                                                                      channel_id=channel_id)
                     
-                    if result_df.empty:
+                    if row_count == 0:
                         logging.info("Query executed successfully but returned no results.")
                         return self.format_no_results_message(sql_query)
                     
-                    # Summarize and save the results
-                    _, file_path = self.sql_executor.summarize_and_save(result_df)
-                    
                     try:
-                        # Upload the results file to Slack
-                        await self.slack_uploader.upload_file_to_slack(file_path, channel_id)
-                        return ""  # Return empty string to avoid sending another message
+                        # Post small results as a table, upload the rest as a file in the chosen format
+                        inline_table, _ = await self.deliver_result(result, row_count, channel_id,
+                                                                    options.get("format"))
+                        return inline_table or ""  # Empty string avoids sending another message
                     except Exception as e:
                         error_message = self.error_handler.handle_error(e, "uploading file to Slack", channel_id)
                         return error_message
                 
+                except QueryRefusedError as e:
+                    return str(e)
                 except RuntimeError as e:
                     if "model_dump" in str(e):
                         error_message = "There's an API compatibility issue with the Mistral AI library. Please contact the administrator."
@@ -118,6 +154,9 @@ class NLMessageProcessor(MessageProcessor):
                 except Exception as e:
                     error_message = self.error_handler.handle_error(e, "processing natural language query", channel_id)
                     return error_message
+                finally:
+                    if explanation_task is not None:
+                        await explanation_task
                 
             else:
                 # It's a regular SQL query, use the standard processing from base class
@@ -133,6 +172,22 @@ class NLMessageProcessor(MessageProcessor):
             error_message = self.error_handler.handle_error(e, "processing message with NL capability", channel_id)
             return error_message
             
+    async def _send_explanation(self, rest, channel_id: str) -> None:
+        """
+        Waits for the streamed remainder of the completion and posts its explanation.
+        """
+        try:
+            metadata = await rest
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            logging.warning(f"Could not read the query explanation: {str(e)}")
+            return
+        explanation = metadata.get('explanation', '')
+        logging.info(f"Streamed completion finished after {metadata.get('total_latency_ms')} ms")
+        if explanation:
+            await self.send_message_to_slack(f"Explanation: {explanation}", channel_id)
+
     async def send_message_to_slack(self, message: str, channel_id: str) -> None:
         """
         Helper method to send a message to a Slack channel.
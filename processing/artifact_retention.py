@@ -0,0 +1,221 @@
+import fnmatch
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from core.config import config
+
+# Artifact kind -> (directory, file name pattern). DATA_DIR also holds the caches and
+# the dedup store, so only result files are managed there.
+ARTIFACT_KINDS = {
+    "result": (config.data_dir, "query_result_*"),
+    "download": (config.download_dir, "*"),
+    "output": (config.output_dir, "*"),
+}
+
+
+class ArtifactRetentionManager:
+    """
+    Tracks the files the bot writes locally (result files, downloaded Slack files and
+    FileCreator output) and deletes them once they are older than the age quota, or
+    least recently used first while the total size is above the byte quota. Pinned
+    files, e.g. results waiting for their upload, are never deleted.
+
+    Sweeps run as a job on the FileDeletionScheduler's APScheduler, which also deletes
+    uploaded files from Slack after SLACK_FILE_RETENTION_SECONDS.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = config.artifact_retention_enabled
+        self.max_age_seconds = config.artifact_max_age_seconds
+        self.max_bytes = config.artifact_max_bytes
+        self.deletion_scheduler = None
+        self._lock = threading.Lock()
+        # Path -> {"kind", "size", "created_at", "last_used", "pins"}, least recently used first
+        self._artifacts: "OrderedDict[str, Dict]" = OrderedDict()
+        self._total_bytes = 0
+        self._stats = {"tracked": 0, "expired": 0, "evicted": 0, "bytes_deleted": 0, "delete_errors": 0,
+                       "remote_deletions_scheduled": 0, "sweeps": 0}
+        if self.enabled:
+            self._scan()
+
+    def _scan(self):
+        # Adopt the files left by earlier runs, in their last-modified order
+        found: List[Tuple[float, str, str, int]] = []
+        for kind, (directory, pattern) in ARTIFACT_KINDS.items():
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if entry.is_file() and fnmatch.fnmatch(entry.name, pattern):
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, os.path.abspath(entry.path), kind, stat.st_size))
+        with self._lock:
+            for mtime, path, kind, size in sorted(found):
+                self._artifacts[path] = {"kind": kind, "size": size, "created_at": mtime, "last_used": mtime, "pins": 0}
+                self._total_bytes += size
+        if found:
+            self.logger.info(f"Tracking {len(found)} existing artifacts ({self._total_bytes} bytes)")
+
+    def track(self, path: str, kind: str, pin: bool = False):
+        """
+        Registers a file the bot has written. Pinned files stay until unpin() is called.
+        """
+        if not self.enabled:
+            return
+        path = os.path.abspath(path)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        now = time.time()
+        with self._lock:
+            previous = self._artifacts.pop(path, None)
+            if previous is not None:
+                self._total_bytes -= previous["size"]
+            self._artifacts[path] = {"kind": kind, "size": size, "created_at": now, "last_used": now,
+                                     "pins": (previous["pins"] if previous else 0) + (1 if pin else 0)}
+            self._total_bytes += size
+            self._stats["tracked"] += 1
+            over_quota = self._total_bytes > self.max_bytes
+        if over_quota:
+            self.enforce()
+
+    def touch(self, path: str):
+        """
+        Marks a tracked file as recently used.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            artifact = self._artifacts.get(path)
+            if artifact is None:
+                return
+            artifact["last_used"] = time.time()
+            self._artifacts.move_to_end(path)
+        try:
+            os.utime(path)  # Keeps the LRU order across restarts
+        except OSError:
+            pass
+
+    def unpin(self, path: str):
+        path = os.path.abspath(path)
+        with self._lock:
+            artifact = self._artifacts.get(path)
+            if artifact is not None and artifact["pins"] > 0:
+                artifact["pins"] -= 1
+                artifact["last_used"] = time.time()
+                self._artifacts.move_to_end(path)
+
+    def remove(self, path: str):
+        """
+        Deletes a tracked (or untracked) file right away, e.g. an empty result.
+        """
+        with self._lock:
+            if os.path.abspath(path) in self._artifacts:
+                self._forget(os.path.abspath(path))
+        if os.path.exists(path):
+            os.remove(path)
+
+    def enforce(self):
+        """
+        Deletes expired artifacts, then the least recently used ones while the total
+        size is above the byte quota.
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        doomed = []
+        with self._lock:
+            self._stats["sweeps"] += 1
+            for path, artifact in list(self._artifacts.items()):
+                if artifact["pins"]:
+                    continue
+                if now - artifact["last_used"] > self.max_age_seconds:
+                    doomed.append((path, self._forget(path), "expired"))
+            for path, artifact in list(self._artifacts.items()):
+                if self._total_bytes <= self.max_bytes:
+                    break
+                if not artifact["pins"]:
+                    doomed.append((path, self._forget(path), "evicted"))
+
+        for path, artifact, reason in doomed:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.logger.warning(f"Could not delete artifact {path}: {e}")
+                with self._lock:
+                    self._stats["delete_errors"] += 1
+                continue
+            with self._lock:
+                self._stats[reason] += 1
+                self._stats["bytes_deleted"] += artifact["size"]
+            self.logger.info(f"Deleted {reason} {artifact['kind']} artifact {path} ({artifact['size']} bytes)")
+
+    def _forget(self, path: str) -> Dict:
+        artifact = self._artifacts.pop(path)
+        self._total_bytes -= artifact["size"]
+        return artifact
+
+    def start(self, deletion_scheduler):
+        """
+        Runs the sweep on the FileDeletionScheduler's scheduler, which is also used
+        for remote Slack file deletion.
+        """
+        self.deletion_scheduler = deletion_scheduler
+        if self.enabled:
+            deletion_scheduler.scheduler.add_job(self.enforce, 'interval', seconds=config.artifact_sweep_seconds,
+                                                 max_instances=1, coalesce=True)
+            self.logger.info(f"Artifact sweep scheduled every {config.artifact_sweep_seconds}s "
+                             f"(max age {self.max_age_seconds}s, max {self.max_bytes} bytes)")
+
+    def stop(self):
+        if self.deletion_scheduler is not None:
+            self.deletion_scheduler.shutdown()
+            self.deletion_scheduler = None
+
+    def schedule_remote_deletion(self, file_id: str):
+        """
+        Deletes an uploaded file from Slack after SLACK_FILE_RETENTION_SECONDS, if set.
+        The deletion is scheduled in memory only: files whose deletion is still pending
+        when the process stops are kept in Slack.
+        """
+        if self.deletion_scheduler is None or config.slack_file_retention_seconds <= 0:
+            return
+        self.deletion_scheduler.schedule_file_deletion(file_id, config.slack_file_retention_seconds)
+        with self._lock:
+            self._stats["remote_deletions_scheduled"] += 1
+
+    @staticmethod
+    def _disk_usage(directory: str) -> Optional[Dict]:
+        try:
+            usage = shutil.disk_usage(directory)
+        except OSError:
+            return None
+        return {"total_bytes": usage.total, "used_bytes": usage.used, "free_bytes": usage.free,
+                "used_fraction": round(usage.used / usage.total, 4) if usage.total else None}
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            kinds = {kind: {"files": 0, "bytes": 0, "pinned": 0} for kind in ARTIFACT_KINDS}
+            for artifact in self._artifacts.values():
+                gauge = kinds[artifact["kind"]]
+                gauge["files"] += 1
+                gauge["bytes"] += artifact["size"]
+                gauge["pinned"] += 1 if artifact["pins"] else 0
+            stats = dict(self._stats, enabled=self.enabled, files=len(self._artifacts), bytes=self._total_bytes,
+                         max_bytes=self.max_bytes, max_age_seconds=self.max_age_seconds)
+        for kind, (directory, _) in ARTIFACT_KINDS.items():
+            kinds[kind]["directory"] = directory
+            kinds[kind]["disk"] = self._disk_usage(directory)
+        stats["kinds"] = kinds
+        return stats
+
+
+# Global retention manager shared by everything that writes local files
+artifact_retention = ArtifactRetentionManager()
@@ -0,0 +1,49 @@
+import csv
+import logging
+
+import pyarrow.csv as pa_csv
+
+
+class CSVBatchWriter:
+    """
+    Appends (columns, rows) batches to an open text file as CSV,
+    writing the header with the first batch.
+    """
+
+    def __init__(self, fileobj):
+        # '\n' line endings, matching DataFrame.to_csv output
+        self._writer = csv.writer(fileobj, lineterminator='\n')
+        self._header_written = False
+        self.columns = None
+        self.row_count = 0
+
+    def write_batch(self, columns, rows):
+        if not self._header_written:
+            self.columns = list(columns)
+            self._writer.writerow(self.columns)
+            self._header_written = True
+        self._writer.writerows(rows)
+        self.row_count += len(rows)
+        logging.debug(f"Wrote batch of {len(rows)} rows ({self.row_count} total)")
+
+
+class ArrowCSVBatchWriter:
+    """
+    Appends Arrow record batches to an open binary file as CSV. Values are
+    formatted by Arrow's native CSV writer, without per-cell Python objects.
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self._header_written = False
+        self.columns = None
+        self.row_count = 0
+
+    def write_record_batch(self, batch):
+        if not self._header_written:
+            self.columns = list(batch.schema.names)
+        pa_csv.write_csv(batch, self.fileobj,
+                         write_options=pa_csv.WriteOptions(include_header=not self._header_written))
+        self._header_written = True
+        self.row_count += batch.num_rows
+        logging.debug(f"Wrote Arrow batch of {batch.num_rows} rows ({self.row_count} total)")
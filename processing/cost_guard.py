@@ -0,0 +1,155 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from core.config import config
+from database.database_factory import DatabaseFactory
+from processing.sql_fingerprint import sql_fingerprint
+
+
+def format_estimate(value: float) -> str:
+    """
+    Formats a plan estimate for a chat message, e.g. 1234567 -> "1.2M".
+    """
+    for threshold, unit in ((1e12, "T"), (1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if value >= threshold:
+            return f"{value / threshold:.1f}{unit}"
+    return f"{value:.0f}"
+
+
+class QueryRefusedError(Exception):
+    """
+    Raised instead of running a query the cost guard refused; the message is meant for the user.
+    """
+
+
+class CostGuard:
+    """
+    Pre-flight check of a query's EXPLAIN plan. The estimated rows and cost, and any
+    cartesian joins in the plan, are compared with the thresholds of the database and
+    channel to decide whether the query runs, runs with a warning, or is refused.
+
+    Plans are cached by query fingerprint and database key, so repeated queries don't
+    ask the database again. When EXPLAIN fails the query is allowed to run; the database
+    reports the actual error.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = config.cost_guard_enabled
+        self.ttl_seconds = config.cost_guard_plan_cache_ttl_seconds
+        self.max_entries = config.cost_guard_plan_cache_max_entries
+        self._lock = threading.Lock()
+        self._plans: "OrderedDict[str, Dict]" = OrderedDict()
+        self._stats = {"checks": 0, "plan_cache_hits": 0, "plan_cache_misses": 0, "explain_errors": 0,
+                       "run": 0, "warn": 0, "refuse": 0}
+
+    def get_plan(self, sql_query: str, db_type: str) -> Optional[Dict]:
+        """
+        Returns the plan estimates of a query from the cache or the database's EXPLAIN,
+        or None if the database can't explain it.
+        """
+        key = sql_fingerprint(sql_query, db_type.upper())
+        with self._lock:
+            entry = self._plans.get(key)
+            if entry is not None and time.time() - entry["created_at"] <= self.ttl_seconds:
+                self._plans.move_to_end(key)
+                self._stats["plan_cache_hits"] += 1
+                return entry["plan"]
+            self._stats["plan_cache_misses"] += 1
+
+        try:
+            started = time.perf_counter()
+            plan = DatabaseFactory.get_database(db_type).explain(sql_query)
+            self.logger.info(f"EXPLAIN on {db_type} took {(time.perf_counter() - started) * 1000:.0f} ms: "
+                             f"{plan['estimated_rows']} rows, cost {plan['estimated_cost']}")
+            self.logger.debug(f"Plan:\n{plan['plan']}")
+        except NotImplementedError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"EXPLAIN failed on {db_type}, skipping the cost check: {e}")
+            with self._lock:
+                self._stats["explain_errors"] += 1
+            return None
+
+        with self._lock:
+            self._plans.pop(key, None)
+            self._plans[key] = {"plan": plan, "created_at": time.time()}
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+        return plan
+
+    def check(self, sql_query: str, db_type: str, channel_id: str = None) -> Dict:
+        """
+        Decides whether a query may run. Blocking; run it through the query dispatcher.
+
+        Returns:
+            A dict with "action" ('run', 'warn' or 'refuse'), "reasons" (human readable,
+            empty for 'run') and the plan estimates under "plan" (None when unavailable).
+        """
+        if not self.enabled:
+            return {"action": "run", "reasons": [], "plan": None}
+        with self._lock:
+            self._stats["checks"] += 1
+
+        plan = self.get_plan(sql_query, db_type)
+        action = "run"
+        reasons = []
+        if plan is not None:
+            thresholds = config.cost_guard_thresholds(db_type, channel_id)
+            for estimate in ("rows", "cost"):
+                value = plan[f"estimated_{estimate}"]
+                if value is None:
+                    continue
+                for level in ("refuse", "warn"):
+                    limit = thresholds[f"{level}_{estimate}"]
+                    if limit and value > limit:
+                        reasons.append(f"estimated {estimate} {format_estimate(value)}, above the {level} "
+                                       f"limit of {format_estimate(limit)} for {db_type}")
+                        if level == "refuse" or action == "run":
+                            action = level
+                        break
+            if plan["warnings"]:
+                reasons.extend(plan["warnings"])
+                if thresholds["refuse_cartesian"] and any(
+                        warning.startswith("Cartesian join") for warning in plan["warnings"]):
+                    action = "refuse"
+                elif action == "run":
+                    action = "warn"
+
+        with self._lock:
+            self._stats[action] += 1
+        if action != "run":
+            self.logger.warning(f"Cost guard: {action} {db_type} query for channel {channel_id}: {'; '.join(reasons)}")
+        return {"action": action, "reasons": reasons, "plan": plan}
+
+    def enforce(self, sql_query: str, db_type: str, channel_id: str = None,
+                on_warning: Callable[[str], None] = None):
+        """
+        Checks a query right before it is sent to the database (i.e. on a result cache
+        miss). Expensive queries are reported through on_warning and still run.
+
+        Raises:
+            QueryRefusedError: The query is too expensive to run.
+        """
+        verdict = self.check(sql_query, db_type, channel_id)
+        reasons = "\n".join(f"- {reason}" for reason in verdict["reasons"])
+        if verdict["action"] == "refuse":
+            raise QueryRefusedError(f"Query refused: it looks too expensive to run on {db_type}.\n{reasons}\n"
+                                    f"Please add filters, join conditions or a LIMIT and try again.")
+        if verdict["action"] == "warn" and on_warning is not None:
+            on_warning(f"Heads up, this query may take a while on {db_type}:\n{reasons}")
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, enabled=self.enabled, cached_plans=len(self._plans))
+
+
+# Global cost guard shared by all message processors
+cost_guard = CostGuard()
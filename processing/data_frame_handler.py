@@ -1,18 +1,112 @@
 import pandas as pd
+import pyarrow as pa
+import io
 import logging
 import os
+import shutil
+import uuid
+from contextlib import contextmanager
 from datetime import datetime
+from typing import Iterable, Tuple, Union
+
+from core.config import config
+from processing.artifact_retention import artifact_retention
+from processing.batch_writers import ArrowCSVBatchWriter, CSVBatchWriter
+from processing.result_buffer import ResultBuffer, discard_result
+from processing.result_cache import TeeWriter
+from processing.result_formats import RESULT_FORMATS, write_columnar, write_compressed_csv
+from processing.xlsx_writer import xlsx_exporter
+
+# A result file path (RESULT_DELIVERY_MODE=file) or an in-memory result buffer (spooled)
+Result = Union[str, ResultBuffer]
 
 
 class DataFrameHandler:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         # Use the DATA_DIR environment variable or default to 'data'
-        self.data_dir = os.getenv('DATA_DIR', 'data')
+        self.data_dir = config.data_dir
         # Ensure the data directory exists
         os.makedirs(self.data_dir, exist_ok=True)
         self.logger.info(f"Using data directory: {self.data_dir}")
 
+    @staticmethod
+    def new_file_name(prefix: str = "query_result", extension: str = "csv") -> str:
+        # The random suffix keeps results produced in the same second apart
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"{prefix}_{timestamp}_{uuid.uuid4().hex[:8]}.{extension}"
+
+    def new_file_path(self, prefix: str = "query_result", extension: str = "csv") -> str:
+        return os.path.join(self.data_dir, self.new_file_name(prefix, extension))
+
+    def new_result(self, prefix: str = "query_result", extension: str = "csv") -> Result:
+        """
+        Creates the target for a new result file according to RESULT_DELIVERY_MODE:
+        a spooled in-memory buffer, or a path in the data directory.
+        """
+        if config.result_delivery_mode == "spooled":
+            return ResultBuffer(self.new_file_name(prefix, extension))
+        return self.new_file_path(prefix, extension)
+
+    @contextmanager
+    def _open_result_file(self, result: Result, cache_writer=None):
+        # Binary sink for the result; also feeds the result cache entry when one is given
+        if isinstance(result, ResultBuffer):
+            yield TeeWriter(result, cache_writer) if cache_writer is not None else result
+            return
+        with open(result, 'wb') as file:
+            yield TeeWriter(file, cache_writer) if cache_writer is not None else file
+        # Kept until the upload is done
+        artifact_retention.track(result, "result", pin=True)
+
+    @staticmethod
+    @contextmanager
+    def open_result(result: Result):
+        """
+        Opens a finished result for reading, positioned at the start.
+        """
+        if isinstance(result, ResultBuffer):
+            yield result.rewind()
+            return
+        with open(result, 'rb') as file:
+            yield file
+
+    @staticmethod
+    def result_size(result: Result) -> int:
+        return result.size if isinstance(result, ResultBuffer) else os.path.getsize(result)
+
+    def convert_result(self, result: Result, fmt: str, prefix: str = "query_result") -> Result:
+        """
+        Converts a CSV result into another format (see result_formats.RESULT_FORMATS),
+        replacing it: the CSV result is discarded once the conversion succeeds.
+        """
+        result_name = self.result_name(result)
+        converted = self.new_result(prefix, RESULT_FORMATS[fmt])
+        try:
+            try:
+                with self.open_result(result) as source, self._open_result_file(converted) as sink:
+                    if fmt == "xlsx":
+                        xlsx_exporter.convert_stream(source, sink)
+                    elif fmt in ("parquet", "arrow"):
+                        write_columnar(source, sink, fmt)
+                    else:
+                        write_compressed_csv(source, sink, fmt)
+            except pa.ArrowInvalid as e:
+                # Types inferred from the first block didn't hold for the whole result
+                self.logger.warning(f"Column types of {result_name} are not uniform ({e}); writing them as text")
+                discard_result(converted)
+                converted = self.new_result(prefix, RESULT_FORMATS[fmt])
+                with self.open_result(result) as source, self._open_result_file(converted) as sink:
+                    write_columnar(source, sink, fmt, as_text=True)
+        except Exception as e:
+            self.logger.error(f"Error converting {result_name} to {fmt}: {str(e)}")
+            discard_result(converted)
+            raise e
+        self.logger.info(f"Converted {result_name} ({self.result_size(result)} bytes) to "
+                         f"{self.result_name(converted)} ({self.result_size(converted)} bytes)")
+        discard_result(result)
+        return converted
+
     def summarize_dataframe(self, df: pd.DataFrame, max_rows: int = 5, max_columns: int = 5) -> pd.DataFrame:
         self.logger.info(f"Summarizing DataFrame with max_rows={max_rows}, max_columns={max_columns}")
         if df.shape[0] <= max_rows:
@@ -24,19 +118,107 @@ class DataFrameHandler:
         self.logger.info(f"DataFrame summary created with shape {summary.shape}")
         return summary
 
-    def save_dataframe_to_file(self, df: pd.DataFrame, prefix: str = "query_result") -> str:
+    def save_dataframe_to_file(self, df: pd.DataFrame, prefix: str = "query_result") -> Result:
         self.logger.info("Saving DataFrame to file")
+        result = self.new_result(prefix, "csv")
         try:
-            # Generate a unique filename using the current timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            file_name = f"{prefix}_{timestamp}.csv"
-            file_path = os.path.join(self.data_dir, file_name)
-
-            # Save the DataFrame to a CSV file
-            df.to_csv(file_path, index=False, encoding='utf-8')
+            with self._open_result_file(result) as sink:
+                df.to_csv(sink, index=False, encoding='utf-8', mode='wb')
 
-            self.logger.info(f"DataFrame saved successfully to {file_path}")
-            return file_path
+            self.logger.info(f"DataFrame saved successfully to {self.result_name(result)}")
+            return result
         except Exception as e:
             self.logger.error(f"Error saving DataFrame to file: {str(e)}")
+            discard_result(result)
             raise e
+
+    def save_batches_to_file(self, batches: Iterable[Tuple[list, list]], prefix: str = "query_result",
+                             cache_writer=None) -> Tuple[Result, int]:
+        """
+        Writes streamed (columns, rows) batches to a CSV file one batch at a time,
+        so memory use is bounded by the batch size rather than the result size.
+
+        Returns:
+            The result (file path or buffer) and the number of data rows written.
+        """
+        self.logger.info("Streaming result batches to file")
+        result = self.new_result(prefix, "csv")
+        try:
+            with self._open_result_file(result, cache_writer) as sink:
+                text_sink = io.TextIOWrapper(sink, encoding='utf-8', newline='')
+                writer = CSVBatchWriter(text_sink)
+                for columns, rows in batches:
+                    writer.write_batch(columns, rows)
+                text_sink.flush()
+                text_sink.detach()  # The underlying file is closed by the context manager
+            self.logger.info(f"Streamed {writer.row_count} rows to {self.result_name(result)}")
+            return result, writer.row_count
+        except Exception as e:
+            self.logger.error(f"Error streaming batches to file: {str(e)}")
+            discard_result(result)
+            raise e
+
+    def save_native_export_to_file(self, db, sql_query: str, prefix: str = "query_result",
+                                   cache_writer=None) -> Tuple[Result, int]:
+        """
+        Has the database generate the CSV itself (e.g. Postgres COPY TO STDOUT) and writes
+        the bytes straight to a file, without creating Python objects per value.
+
+        Returns:
+            The result (file path or buffer) and the number of data rows written.
+        """
+        self.logger.info(f"Exporting result with native {db.db_type} CSV export")
+        result = self.new_result(prefix, "csv")
+        try:
+            with self._open_result_file(result, cache_writer) as sink:
+                row_count = db.export_csv(sql_query, sink)
+            self.logger.info(f"Exported {row_count} rows to {self.result_name(result)}")
+            return result, row_count
+        except Exception as e:
+            self.logger.error(f"Error during native export to file: {str(e)}")
+            discard_result(result)
+            raise e
+
+    def save_record_batches_to_file(self, batches: Iterable, prefix: str = "query_result",
+                                    cache_writer=None) -> Tuple[Result, int]:
+        """
+        Writes streamed Arrow record batches to a CSV file one batch at a time.
+
+        Returns:
+            The result (file path or buffer) and the number of data rows written.
+        """
+        self.logger.info("Streaming Arrow record batches to file")
+        result = self.new_result(prefix, "csv")
+        try:
+            with self._open_result_file(result, cache_writer) as sink:
+                writer = ArrowCSVBatchWriter(sink)
+                for batch in batches:
+                    writer.write_record_batch(batch)
+            self.logger.info(f"Streamed {writer.row_count} rows to {self.result_name(result)}")
+            return result, writer.row_count
+        except Exception as e:
+            self.logger.error(f"Error streaming record batches to file: {str(e)}")
+            discard_result(result)
+            raise e
+
+    def save_stream_to_file(self, stream, prefix: str = "query_result") -> Result:
+        """
+        Copies an already formatted binary CSV stream (e.g. a cached result) into a new result file.
+        """
+        result = self.new_result(prefix, "csv")
+        try:
+            with self._open_result_file(result) as file:
+                shutil.copyfileobj(stream, file, 1024 * 1024)
+            self.logger.info(f"Result stream saved to {self.result_name(result)}")
+            return result
+        except Exception as e:
+            self.logger.error(f"Error saving result stream to file: {str(e)}")
+            discard_result(result)
+            raise e
+
+    @staticmethod
+    def result_name(result: Result) -> str:
+        """
+        The file name a result is uploaded as.
+        """
+        return result.name if isinstance(result, ResultBuffer) else os.path.basename(result)
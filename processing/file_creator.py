@@ -1,30 +1,139 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as pa_ipc
+import pyarrow.parquet as pq
 import logging
 import os
+from typing import Iterable
+
+from core.config import config
+from processing.artifact_retention import artifact_retention
+from processing.batch_writers import ArrowCSVBatchWriter
+from processing.data_frame_handler import DataFrameHandler
+from processing.xlsx_writer import xlsx_exporter
 
 
 class FileCreator:
     def __init__(self):
-        self.output_directory = 'output'
+        self.output_directory = config.output_dir
         if not os.path.exists(self.output_directory):
             os.makedirs(self.output_directory)
 
     def create_file(self, df: pd.DataFrame, file_format: str = 'csv') -> str:
-        file_name = f"query_result.{file_format}"
+        if file_format in ('excel', 'xlsx'):
+            return self._create_xlsx(lambda csv_path: df.to_csv(csv_path, index=False))
+        file_name = DataFrameHandler.new_file_name("query_result", file_format)
         file_path = os.path.join(self.output_directory, file_name)
 
         try:
             logging.info(f"Saving DataFrame to file: {file_path} in format: {file_format}")
             if file_format == 'csv':
                 df.to_csv(file_path, index=False)
+            elif file_format == 'csv.gz':
+                df.to_csv(file_path, index=False, compression='gzip')
+            elif file_format == 'parquet':
+                df.to_parquet(file_path, index=False, compression=config.result_parquet_compression)
+            elif file_format == 'arrow':
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                with pa_ipc.new_file(file_path, table.schema) as writer:
+                    writer.write_table(table)
             elif file_format == 'json':
                 df.to_json(file_path, orient='records', lines=True)
-            elif file_format == 'excel':
-                df.to_excel(file_path, index=False)
             else:
                 raise ValueError(f"Unsupported file format: {file_format}")
+            artifact_retention.track(file_path, "output")
             logging.info(f"DataFrame saved to file: {file_path}")
             return file_path
         except Exception as e:
             logging.error(f"Error saving DataFrame to file: {e}")
             raise
+
+    def create_file_from_arrow(self, batches: Iterable[pa.RecordBatch], file_format: str = 'csv') -> str:
+        """
+        Creates a result file from Arrow record batches. CSV, Parquet and Arrow IPC files are
+        written batch by batch by Arrow itself; other formats are converted to pandas only at this point.
+        """
+        if file_format in ('parquet', 'arrow'):
+            return self._write_columnar_batches(batches, file_format)
+        if file_format in ('excel', 'xlsx'):
+            return self._create_xlsx(lambda csv_path: self._write_csv_batches(batches, csv_path))
+        if file_format != 'csv':
+            tables = [pa.Table.from_batches([batch]) for batch in batches]
+            # No batches means no schema either; write an empty file
+            table = pa.concat_tables(tables, promote=True) if tables else pa.table({})
+            return self.create_file(table.to_pandas(), file_format)
+
+        file_name = DataFrameHandler.new_file_name("query_result", file_format)
+        file_path = os.path.join(self.output_directory, file_name)
+        try:
+            logging.info(f"Saving Arrow batches to file: {file_path} in format: {file_format}")
+            with open(file_path, 'wb') as file:
+                writer = ArrowCSVBatchWriter(file)
+                for batch in batches:
+                    writer.write_record_batch(batch)
+            artifact_retention.track(file_path, "output")
+            logging.info(f"Arrow batches saved to file: {file_path} ({writer.row_count} rows)")
+            return file_path
+        except Exception as e:
+            logging.error(f"Error saving Arrow batches to file: {e}")
+            raise
+
+    def _write_columnar_batches(self, batches: Iterable[pa.RecordBatch], file_format: str) -> str:
+        file_name = DataFrameHandler.new_file_name("query_result", file_format)
+        file_path = os.path.join(self.output_directory, file_name)
+        writer = None
+        try:
+            logging.info(f"Saving Arrow batches to file: {file_path} in format: {file_format}")
+            for batch in batches:
+                if writer is None:
+                    writer = (pq.ParquetWriter(file_path, batch.schema, compression=config.result_parquet_compression)
+                              if file_format == 'parquet' else pa_ipc.new_file(file_path, batch.schema))
+                if file_format == 'parquet':
+                    writer.write_table(pa.Table.from_batches([batch]))
+                else:
+                    writer.write_batch(batch)
+            if writer is None:
+                # No batches means no schema either; write an empty file
+                writer = (pq.ParquetWriter(file_path, pa.schema([]), compression=config.result_parquet_compression)
+                          if file_format == 'parquet' else pa_ipc.new_file(file_path, pa.schema([])))
+            writer.close()
+            writer = None
+            artifact_retention.track(file_path, "output")
+            logging.info(f"Arrow batches saved to file: {file_path}")
+            return file_path
+        except Exception as e:
+            logging.error(f"Error saving Arrow batches to file: {e}")
+            if writer is not None:
+                writer.close()
+            raise
+
+    @staticmethod
+    def _write_csv_batches(batches: Iterable[pa.RecordBatch], csv_path: str):
+        with open(csv_path, 'wb') as file:
+            writer = ArrowCSVBatchWriter(file)
+            for batch in batches:
+                writer.write_record_batch(batch)
+
+    def _create_xlsx(self, write_csv) -> str:
+        """
+        Writes the rows as CSV with `write_csv(path)`, then has an xlsx worker process stream
+        them into a workbook in constant memory, rolling over to new sheets at Excel's row limit.
+        """
+        file_name = DataFrameHandler.new_file_name("query_result", "xlsx")
+        file_path = os.path.join(self.output_directory, file_name)
+        csv_path = os.path.join(self.output_directory, DataFrameHandler.new_file_name("xlsx_source", "csv"))
+        try:
+            logging.info(f"Saving result to file: {file_path} in format: xlsx")
+            write_csv(csv_path)
+            xlsx_exporter.convert_file(csv_path, file_path)
+            artifact_retention.track(file_path, "output")
+            logging.info(f"Result saved to file: {file_path}")
+            return file_path
+        except Exception as e:
+            logging.error(f"Error saving result to xlsx file: {e}")
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+        finally:
+            if os.path.exists(csv_path):
+                os.remove(csv_path)
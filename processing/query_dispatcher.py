@@ -0,0 +1,162 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from core.config import config
+
+
+ORACLE_DATABASES = ['SINONIMI', 'SHOPSTER', 'VIRGA_TEST', 'VIRGA']
+
+
+class QueryDispatcher:
+    """
+    Runs blocking database work on a bounded thread pool so the asyncio event loop
+    (Slack acks, health checks) stays responsive while queries run.
+
+    Each database family (oracle, vertica, postgres) has its own concurrency cap,
+    so a burst of slow Oracle reports cannot starve Postgres or Vertica queries.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.max_workers = config.query_max_workers
+        self.limits = {
+            'oracle': config.query_concurrency_oracle,
+            'vertica': config.query_concurrency_vertica,
+            'postgres': config.query_concurrency_postgres,
+        }
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sql-worker")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict] = {family: self._new_stats() for family in self.limits}
+
+    @staticmethod
+    def _new_stats() -> Dict:
+        return {
+            "queued": 0,
+            "running": 0,
+            "completed": 0,
+            "failed": 0,
+            "max_queue_depth": 0,
+            "total_wait_seconds": 0.0,
+            "total_run_seconds": 0.0,
+        }
+
+    @staticmethod
+    def database_family(db_type: str) -> str:
+        """
+        Maps a database key (e.g. 'SINONIMI', 'VERTICA') to the family that shares a concurrency cap.
+        """
+        db_type = (db_type or '').upper()
+        if db_type in ORACLE_DATABASES:
+            return 'oracle'
+        elif db_type == 'VERTICA':
+            return 'vertica'
+        elif db_type == 'POSTGRES':
+            return 'postgres'
+        else:
+            raise ValueError(f"Unsupported database type: {db_type}")
+
+    def _get_semaphore(self, family: str) -> asyncio.Semaphore:
+        # Created lazily so the semaphore belongs to the running event loop
+        semaphore = self._semaphores.get(family)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limits[family])
+            self._semaphores[family] = semaphore
+        return semaphore
+
+    async def run(self, db_type: str, func: Callable, *args, **kwargs):
+        """
+        Runs a blocking database call on the worker pool, respecting the
+        concurrency cap of the database family.
+
+        Args:
+            db_type: The database key the call targets.
+            func: The blocking callable to run.
+            *args, **kwargs: Arguments passed to the callable.
+
+        Returns:
+            Whatever the callable returns. Exceptions raised by it are propagated.
+        """
+        family = self.database_family(db_type)
+        stats = self._stats[family]
+        semaphore = self._get_semaphore(family)
+        enqueued_at = time.monotonic()
+
+        with self._lock:
+            stats["queued"] += 1
+            stats["max_queue_depth"] = max(stats["max_queue_depth"], stats["queued"])
+
+        def timed_call():
+            started_at = time.monotonic()
+            with self._lock:
+                stats["queued"] -= 1
+                stats["running"] += 1
+                stats["total_wait_seconds"] += started_at - enqueued_at
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    stats["running"] -= 1
+                    stats["total_run_seconds"] += time.monotonic() - started_at
+
+        submitted = False
+        try:
+            async with semaphore:
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(self._executor, timed_call)
+                submitted = True
+                result = await future
+        except BaseException:
+            with self._lock:
+                stats["failed"] += 1
+                if not submitted:
+                    # Cancelled while waiting for a slot; timed_call never ran
+                    stats["queued"] -= 1
+            raise
+
+        with self._lock:
+            stats["completed"] += 1
+        self.logger.debug(f"{family} query finished in {time.monotonic() - enqueued_at:.3f}s (including queue wait)")
+        return result
+
+    async def run_blocking(self, func: Callable, *args, **kwargs):
+        """
+        Runs blocking non-database work (file writing, serialization) on the worker pool
+        without taking a database concurrency slot.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def queue_depth(self, db_type: str = None) -> int:
+        """
+        Returns the number of calls waiting for a worker, for one database family or in total.
+        """
+        with self._lock:
+            if db_type:
+                return self._stats[self.database_family(db_type)]["queued"]
+            return sum(stats["queued"] for stats in self._stats.values())
+
+    def get_stats(self) -> Dict:
+        """
+        Returns a snapshot of concurrency limits, queue depths and timings per database family.
+        """
+        with self._lock:
+            families = {}
+            for family, stats in self._stats.items():
+                entry = dict(stats, limit=self.limits[family])
+                finished = stats["completed"] + stats["failed"]
+                entry["avg_run_seconds"] = stats["total_run_seconds"] / finished if finished else 0.0
+                families[family] = entry
+        return {"max_workers": self.max_workers, "families": families}
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait)
+
+
+# Global dispatcher instance shared by all message processors
+query_dispatcher = QueryDispatcher()
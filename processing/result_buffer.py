@@ -0,0 +1,116 @@
+import io
+import logging
+import tempfile
+import threading
+from typing import Dict
+
+from core.config import config
+from processing.artifact_retention import artifact_retention
+
+
+class ResultBuffer(io.RawIOBase):
+    """
+    Binary sink for one result file that stays in memory up to a size threshold and
+    spills to an anonymous temporary file above it, so results are uploaded without
+    ever being written to (or left on) the shared data volume.
+
+    `name` is the unique file name the result is uploaded as. Call release() once the
+    upload is confirmed to free the memory or the spill file.
+    """
+
+    def __init__(self, name: str, max_memory_bytes: int = None, spool_dir: str = None):
+        super().__init__()
+        self.name = name
+        self.file = tempfile.SpooledTemporaryFile(
+            max_size=max_memory_bytes if max_memory_bytes is not None else config.result_spool_max_memory_bytes,
+            mode='w+b', dir=spool_dir or config.result_spool_dir)
+        self.size = 0
+        self._released = False
+        result_buffer_stats.opened()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        was_spilled = self.spilled
+        written = self.file.write(data)
+        self.size += len(data)
+        if not was_spilled and self.spilled:
+            logging.getLogger(__name__).info(f"Result {self.name} spilled to a temporary file at {self.size} bytes")
+            result_buffer_stats.spilled()
+        return written if written is not None else len(data)
+
+    def flush(self):
+        self.file.flush()
+
+    @property
+    def spilled(self) -> bool:
+        return not in_memory(self.file)
+
+    def rewind(self):
+        """
+        Returns the underlying file positioned at the start, for reading the result.
+        """
+        self.file.seek(0)
+        return self.file
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.file.close()
+            result_buffer_stats.released(self.size)
+
+    def close(self):
+        self.release()
+        super().close()
+
+
+def in_memory(fileobj) -> bool:
+    """
+    Whether reading a file object stays in memory: a BytesIO, or a spooled temporary
+    file that hasn't spilled to disk yet.
+    """
+    if isinstance(fileobj, io.BytesIO):
+        return True
+    # SpooledTemporaryFile has no public flag for this; keep the private access here only
+    return isinstance(fileobj, tempfile.SpooledTemporaryFile) and not getattr(fileobj, "_rolled", True)
+
+
+class ResultBufferStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"open": 0, "created": 0, "spilled": 0, "released": 0, "bytes_released": 0}
+
+    def opened(self):
+        with self._lock:
+            self._stats["open"] += 1
+            self._stats["created"] += 1
+
+    def spilled(self):
+        with self._lock:
+            self._stats["spilled"] += 1
+
+    def released(self, size: int):
+        with self._lock:
+            self._stats["open"] -= 1
+            self._stats["released"] += 1
+            self._stats["bytes_released"] += size
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, delivery_mode=config.result_delivery_mode,
+                        max_memory_bytes=config.result_spool_max_memory_bytes)
+
+
+def discard_result(result):
+    """
+    Frees a result that won't be uploaded: releases a buffer or deletes a result file.
+    """
+    if isinstance(result, ResultBuffer):
+        result.release()
+    elif result is not None:
+        artifact_retention.remove(result)
+
+
+# Buffer counters shared by all result buffers
+result_buffer_stats = ResultBufferStats()
@@ -0,0 +1,291 @@
+import gzip
+import io
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from core.config import config
+from processing.sql_fingerprint import normalize_sql, sql_fingerprint
+
+# Temporary entry files untouched for this long are left over from a crash, whatever their pid
+STALE_TMP_SECONDS = 3600
+
+
+class TeeWriter(io.RawIOBase):
+    """
+    Binary file wrapper that copies everything written to it into a cache entry.
+    """
+
+    def __init__(self, fileobj, cache_writer: "CacheEntryWriter"):
+        self.fileobj = fileobj
+        self.cache_writer = cache_writer
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        written = self.fileobj.write(data)
+        self.cache_writer.write(data)
+        return written if written is not None else len(data)
+
+    def flush(self):
+        self.fileobj.flush()
+
+
+class CacheEntryWriter:
+    """
+    Writes one gzip-compressed CSV result into the cache. Gives up quietly once
+    the result grows beyond the per-entry size limit, or when writing the entry
+    fails: the cache never fails the export it copies.
+    """
+
+    def __init__(self, cache: "ResultCache", key: str, db_type: str, sql_query: str):
+        self.cache = cache
+        self.key = key
+        self.db_type = db_type
+        self.sql_query = sql_query
+        self.tmp_path = os.path.join(cache.cache_dir, f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        self._file = gzip.open(self.tmp_path, 'wb', compresslevel=1)
+        self.raw_bytes = 0
+        self.active = True
+
+    def write(self, data):
+        if not self.active:
+            return
+        self.raw_bytes += len(data)
+        if self.raw_bytes > self.cache.max_entry_bytes:
+            logging.info(f"Result exceeds the cache entry limit ({self.cache.max_entry_bytes} bytes); not caching it")
+            self.abort()
+            return
+        try:
+            self._file.write(data)
+        except Exception as e:
+            self.cache.record_store_error(e)
+            self.abort()
+
+    def commit(self, row_count: int):
+        if not self.active:
+            return
+        self.active = False
+        try:
+            self._file.close()
+            self.cache.add_entry(self, row_count)
+        except Exception as e:
+            self.cache.record_store_error(e)
+            self.abort()
+
+    def abort(self):
+        try:
+            if self.active:
+                self.active = False
+                self._file.close()
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+        except OSError as e:
+            logging.warning(f"Could not remove unfinished result cache entry {self.tmp_path}: {e}")
+
+
+class ResultCache:
+    """
+    On-disk cache of query results keyed on the normalized SQL fingerprint and the
+    database key. Entries are gzip-compressed CSV files with a JSON sidecar, expire
+    after a per-database TTL and are evicted least-recently-used beyond a byte budget.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = config.result_cache_enabled
+        self.cache_dir = config.result_cache_dir
+        self.max_bytes = config.result_cache_max_bytes
+        self.max_entry_bytes = config.result_cache_max_entry_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "bypasses": 0, "stores": 0, "store_errors": 0, "evictions": 0,
+                       "expirations": 0}
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._load_index()
+
+    def _data_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.csv.gz")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_index(self):
+        # Rebuild the LRU order from disk, least recently used first
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith(".tmp"):
+                self._remove_stale_tmp(file_name)
+                continue
+            if not file_name.endswith(".json"):
+                continue
+            key = file_name[:-len(".json")]
+            try:
+                with open(self._meta_path(key), 'r', encoding='utf-8') as meta_file:
+                    entry = json.load(meta_file)
+                entry["last_used"] = os.path.getmtime(self._data_path(key))
+                entries.append(entry)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Dropping unreadable result cache entry {key}: {e}")
+                self._remove_files(key)
+        for entry in sorted(entries, key=lambda item: item["last_used"]):
+            self._entries[entry["key"]] = entry
+        self.logger.info(f"Loaded {len(self._entries)} result cache entries from {self.cache_dir}")
+
+    def _remove_stale_tmp(self, file_name: str):
+        # Other processes (workers, a rolling restart) may still be writing into the shared
+        # directory; only files of dead processes or long untouched ones are left over
+        path = os.path.join(self.cache_dir, file_name)
+        try:
+            pid = int(file_name.split(".")[-3])
+        except (IndexError, ValueError):
+            pid = None
+        try:
+            if pid is None or not self._process_alive(pid) or time.time() - os.path.getmtime(path) > STALE_TMP_SECONDS:
+                os.remove(path)
+        except OSError:
+            pass  # Finished or removed by its writer in the meantime
+
+    @staticmethod
+    def _process_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True  # Exists, owned by another user
+        return True
+
+    @staticmethod
+    def make_key(sql_query: str, db_type: str) -> str:
+        return sql_fingerprint(sql_query, db_type.upper())
+
+    @staticmethod
+    def ttl_for(db_type: str) -> int:
+        return config.result_cache_ttl(db_type)
+
+    def lookup(self, sql_query: str, db_type: str) -> Optional[Dict]:
+        """
+        Returns the cache entry for the query if it exists and has not expired.
+        """
+        if not self.enabled:
+            return None
+        key = self.make_key(sql_query, db_type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["created_at"] > self.ttl_for(db_type):
+                self._entries.pop(key)
+                self._remove_files(key)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            entry["last_used"] = time.time()
+            self._stats["hits"] += 1
+        self.logger.info(f"Result cache hit for {db_type} query ({entry['row_count']} rows)")
+        return entry
+
+    def record_bypass(self):
+        with self._lock:
+            self._stats["bypasses"] += 1
+
+    def open_entry(self, entry: Dict):
+        """
+        Opens a cached result as a decompressed binary CSV stream.
+        """
+        data_path = self._data_path(entry["key"])
+        os.utime(data_path)  # Keeps the LRU order across restarts
+        return gzip.open(data_path, 'rb')
+
+    def writer(self, sql_query: str, db_type: str) -> Optional[CacheEntryWriter]:
+        """
+        Starts a new cache entry for a query. Returns None if caching is disabled.
+        """
+        if not self.enabled:
+            return None
+        try:
+            return CacheEntryWriter(self, self.make_key(sql_query, db_type), db_type.upper(), sql_query)
+        except OSError as e:
+            self.record_store_error(e)
+            return None
+
+    def record_store_error(self, error: Exception):
+        """
+        Counts a cache entry that couldn't be written; the export itself carries on.
+        """
+        with self._lock:
+            self._stats["store_errors"] += 1
+        self.logger.warning(f"Could not write result cache entry: {error}")
+
+    def add_entry(self, entry_writer: CacheEntryWriter, row_count: int):
+        key = entry_writer.key
+        size = os.path.getsize(entry_writer.tmp_path)
+        entry = {
+            "key": key,
+            "db_type": entry_writer.db_type,
+            "sql": normalize_sql(entry_writer.sql_query)[:500],
+            "row_count": row_count,
+            "size": size,
+            "created_at": time.time(),
+            "last_used": time.time(),
+        }
+        with self._lock:
+            try:
+                os.replace(entry_writer.tmp_path, self._data_path(key))
+                with open(self._meta_path(key), 'w', encoding='utf-8') as meta_file:
+                    json.dump(entry, meta_file)
+            except Exception:
+                # The data file may no longer match the old metadata; drop the entry
+                self._entries.pop(key, None)
+                try:
+                    self._remove_files(key)
+                except OSError:
+                    pass
+                raise
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            self._stats["stores"] += 1
+            self._evict()
+        self.logger.info(f"Cached {row_count} rows for {entry_writer.db_type} query ({size} bytes compressed)")
+
+    def _evict(self):
+        total = sum(entry["size"] for entry in self._entries.values())
+        while total > self.max_bytes and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self._remove_files(key)
+            total -= entry["size"]
+            self._stats["evictions"] += 1
+            self.logger.info(f"Evicted result cache entry {key} ({entry['size']} bytes)")
+
+    def _remove_files(self, key: str):
+        for path in (self._data_path(key), self._meta_path(key)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove_files(key)
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(
+                self._stats,
+                enabled=self.enabled,
+                entries=len(self._entries),
+                bytes=sum(entry["size"] for entry in self._entries.values()),
+                max_bytes=self.max_bytes,
+            )
+
+
+# Global result cache shared by all SQL executors
+result_cache = ResultCache()
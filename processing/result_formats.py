@@ -0,0 +1,162 @@
+import csv
+import gzip
+import io
+import logging
+import shutil
+from typing import Optional
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.ipc as pa_ipc
+import pyarrow.parquet as pq
+
+from core.config import config
+
+try:
+    # Optional: zstd-compressed CSV
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Format name -> file extension of the uploaded result
+RESULT_FORMATS = {
+    "csv": "csv",
+    "csv.gz": "csv.gz",
+    "csv.zst": "csv.zst",
+    "parquet": "parquet",
+    "arrow": "arrow",
+    "xlsx": "xlsx",
+}
+# Formats chosen per message; 'inline' posts small results as a text table
+REQUESTABLE_FORMATS = set(RESULT_FORMATS) | {"auto", "inline"}
+
+COPY_CHUNK_BYTES = 1024 * 1024
+# Larger CSV blocks give Arrow more rows to infer column types from
+CSV_BLOCK_BYTES = 16 * 1024 * 1024
+
+
+def choose_format(requested: Optional[str], row_count: int, csv_bytes: int) -> str:
+    """
+    Picks the delivery format of a result from the requested format (None uses
+    RESULT_FORMAT) and the row count and size of its CSV. 'auto' sends small results
+    inline and files as chosen by choose_file_format().
+    """
+    requested = (requested or config.result_format).lower()
+    if requested not in REQUESTABLE_FORMATS:
+        logging.warning(f"Unknown result format '{requested}'; choosing automatically")
+        requested = "auto"
+    if requested == "csv.zst" and zstandard is None:
+        logging.warning("zstd compression requested but the zstandard package is not installed; using gzip")
+        requested = "csv.gz"
+    if requested in ("auto", "inline"):
+        # An inline request for a result too large to post as a message gets a file instead
+        return "inline" if fits_inline(row_count, csv_bytes) else choose_file_format(csv_bytes)
+    return requested
+
+
+def choose_file_format(csv_bytes: int) -> str:
+    """
+    Plain CSV up to RESULT_CSV_MAX_BYTES, gzip-compressed CSV up to
+    RESULT_COMPRESSED_CSV_MAX_BYTES and Parquet beyond that.
+    """
+    if csv_bytes <= config.result_csv_max_bytes:
+        return "csv"
+    if csv_bytes <= config.result_compressed_csv_max_bytes:
+        return "csv.gz"
+    return "parquet"
+
+
+def fits_inline(row_count: int, csv_bytes: int) -> bool:
+    return row_count <= config.result_inline_max_rows and csv_bytes <= config.result_inline_max_chars
+
+
+class _SinkWriter(io.RawIOBase):
+    """
+    Write-only view of a result sink; closing it leaves the sink open.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        written = self.sink.write(data)
+        return written if written is not None else len(data)
+
+    def flush(self):
+        self.sink.flush()
+
+
+def write_compressed_csv(source, sink, fmt: str):
+    """
+    Compresses a binary CSV stream into the sink as gzip ('csv.gz') or zstd ('csv.zst').
+    """
+    if fmt == "csv.zst":
+        compressor = zstandard.ZstdCompressor(level=config.result_zstd_level)
+        with compressor.stream_writer(_SinkWriter(sink), closefd=False) as writer:
+            shutil.copyfileobj(source, writer, COPY_CHUNK_BYTES)
+        return
+    with gzip.GzipFile(fileobj=_SinkWriter(sink), mode='wb', compresslevel=config.result_gzip_level) as writer:
+        shutil.copyfileobj(source, writer, COPY_CHUNK_BYTES)
+
+
+def write_columnar(source, sink, fmt: str, as_text: bool = False) -> int:
+    """
+    Converts a binary CSV stream into Parquet ('parquet') or an Arrow IPC file ('arrow')
+    block by block, so memory use is bounded by the block size. Column types are inferred
+    from the first block; with as_text every column is written as a string instead.
+
+    Raises:
+        pyarrow.ArrowInvalid: A later block doesn't fit the inferred column types.
+
+    Returns:
+        The number of rows written.
+    """
+    column_types = None
+    if as_text:
+        start = source.tell()
+        text = io.TextIOWrapper(source, encoding='utf-8', newline='')
+        header = next(csv.reader(text), [])
+        text.detach()  # Leaves the source open
+        source.seek(start)
+        column_types = {name: pa.string() for name in header}
+    reader = pa_csv.open_csv(
+        pa.PythonFile(source, mode='r'),
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_BYTES),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types),
+    )
+    target = pa.PythonFile(_SinkWriter(sink), mode='w')
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(target, reader.schema, compression=config.result_parquet_compression)
+    else:
+        writer = pa_ipc.new_file(target, reader.schema)
+    row_count = 0
+    try:
+        for batch in reader:
+            if fmt == "parquet":
+                writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+            row_count += batch.num_rows
+    finally:
+        writer.close()
+    return row_count
+
+
+def render_inline(source) -> Optional[str]:
+    """
+    Formats a small binary CSV stream as an aligned text table in a code block, or
+    returns None if the table would be longer than RESULT_INLINE_MAX_CHARS.
+    """
+    text = io.TextIOWrapper(source, encoding='utf-8', newline='')
+    rows = list(csv.reader(text))
+    text.detach()
+    if not rows:
+        return None
+    widths = [max(len(row[index]) if index < len(row) else 0 for row in rows) for index in range(len(rows[0]))]
+    lines = [" | ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in rows]
+    lines.insert(1, "-+-".join("-" * width for width in widths))
+    table = "```\n" + "\n".join(lines) + "\n```"
+    return table if len(table) <= config.result_inline_max_chars else None
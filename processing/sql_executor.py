@@ -1,6 +1,14 @@
 import logging
+from typing import Callable, Optional, Tuple
+
+import pyarrow as pa
+
+from core.config import config
 from database.database_factory import DatabaseFactory
-from processing.data_frame_handler import DataFrameHandler
+from processing.cost_guard import cost_guard
+from processing.data_frame_handler import DataFrameHandler, Result
+from processing.result_buffer import discard_result
+from processing.result_cache import result_cache
 
 
 class SQLExecutor:
@@ -8,15 +16,113 @@ class SQLExecutor:
         self.df_handler = DataFrameHandler()
 
     @staticmethod
-    def execute_sql(sql_query: str, db_type: str):
+    def execute_sql(sql_query: str, db_type: str, channel_id: str = None,
+                    on_cost_warning: Callable[[str], None] = None):
+        """
+        Runs the query into a DataFrame after the cost guard has checked it. The result
+        cache is not used: a DataFrame read back from cached CSV wouldn't have the column
+        types (dates, decimals, codes with leading zeros) of one read from the database.
+        """
         logging.info(f"Executing SQL query: {sql_query}")
 
-        db = DatabaseFactory.get_database(db_type)
-        result_df = db.query(sql_query)
+        cost_guard.enforce(sql_query, db_type, channel_id, on_cost_warning)
+        if config.result_export_mode == "arrow":
+            # Columnar fetch; converted to pandas only here, where a DataFrame is required
+            result_df = SQLExecutor.execute_sql_arrow(sql_query, db_type).to_pandas()
+        else:
+            db = DatabaseFactory.get_database(db_type)
+            result_df = db.query(sql_query)
         logging.info(f"Query result DataFrame: {result_df}")
         return result_df
 
+    @staticmethod
+    def execute_sql_arrow(sql_query: str, db_type: str) -> pa.Table:
+        """
+        Executes the query and returns the result as an Arrow table.
+        """
+        logging.info(f"Executing SQL query (Arrow): {sql_query}")
+
+        db = DatabaseFactory.get_database(db_type)
+        # Batches may infer different types for all-NULL columns; promote them to a common schema
+        tables = [pa.Table.from_batches([batch]) for batch in db.query_arrow(sql_query, config.result_batch_size)]
+        return pa.concat_tables(tables, promote=True)
+
     def summarize_and_save(self, result_df):
         summary_df = self.df_handler.summarize_dataframe(result_df)
-        file_path = self.df_handler.save_dataframe_to_file(result_df)
-        return summary_df, file_path
+        result = self.df_handler.save_dataframe_to_file(result_df)
+        return summary_df, result
+
+    def export_sql_to_file(self, sql_query: str, db_type: str, use_cache: bool = True, channel_id: str = None,
+                           on_cost_warning: Callable[[str], None] = None) -> Tuple[Optional[Result], int]:
+        """
+        Writes the query result straight into a CSV file (or result buffer) without building a DataFrame.
+        Cached results are copied from the result cache; otherwise databases with a native
+        bulk export (Postgres COPY) use it in 'auto' mode and everything else streams
+        batches from a server-side cursor. Fresh results are written to the cache as they stream.
+        Only queries that reach the database go through the cost guard; cached results are served as is.
+
+        Args:
+            sql_query: The SQL query to run.
+            db_type: The database key.
+            use_cache: Set to False to bypass cached results (the fresh result is still cached).
+            channel_id: The Slack channel asking, for per-channel cost guard thresholds.
+            on_cost_warning: Called with a warning message when the cost guard finds the query expensive.
+
+        Raises:
+            QueryRefusedError: The cost guard refused the query.
+
+        Returns:
+            The result (file path or buffer) and row count, or (None, 0) if the query returned no rows.
+        """
+        logging.info(f"Exporting SQL query to file: {sql_query}")
+
+        if use_cache:
+            entry = result_cache.lookup(sql_query, db_type)
+            if entry is not None:
+                if entry["row_count"] == 0:
+                    return None, 0
+                with result_cache.open_entry(entry) as stream:
+                    return self.df_handler.save_stream_to_file(stream), entry["row_count"]
+        else:
+            result_cache.record_bypass()
+
+        cost_guard.enforce(sql_query, db_type, channel_id, on_cost_warning)
+        db = DatabaseFactory.get_database(db_type)
+        result = None
+        if config.result_export_mode == "auto" and db.supports_native_export:
+            cache_writer = result_cache.writer(sql_query, db_type)
+            try:
+                result, row_count = self.df_handler.save_native_export_to_file(
+                    db, sql_query, cache_writer=cache_writer)
+            except NotImplementedError as e:
+                # Only a query COPY can't wrap is retried; a failing query would just run twice
+                if cache_writer is not None:
+                    cache_writer.abort()
+                logging.warning(f"Native export not possible, falling back to cursor streaming: {e}")
+            except Exception:
+                if cache_writer is not None:
+                    cache_writer.abort()
+                raise
+
+        if result is None:
+            cache_writer = result_cache.writer(sql_query, db_type)
+            try:
+                if config.result_export_mode == "arrow":
+                    batches = db.query_arrow(sql_query, config.result_batch_size)
+                    result, row_count = self.df_handler.save_record_batches_to_file(
+                        batches, cache_writer=cache_writer)
+                else:
+                    batches = db.iter_batches(sql_query, config.result_batch_size)
+                    result, row_count = self.df_handler.save_batches_to_file(
+                        batches, cache_writer=cache_writer)
+            except Exception:
+                if cache_writer is not None:
+                    cache_writer.abort()
+                raise
+
+        if cache_writer is not None:
+            cache_writer.commit(row_count)
+        if row_count == 0:
+            discard_result(result)
+            return None, 0
+        return result, row_count
@@ -0,0 +1,67 @@
+import hashlib
+
+
+def normalize_sql(sql_query: str) -> str:
+    """
+    Normalizes a SQL query for use as a cache key: comments are removed, whitespace
+    is collapsed, keywords and identifiers are lowercased and trailing semicolons are
+    dropped. String literals and double-quoted identifiers are kept verbatim.
+
+    Done in a single pass over the query text.
+    """
+    out = []
+    i = 0
+    length = len(sql_query)
+    pending_space = False
+    while i < length:
+        char = sql_query[i]
+        if char in ("'", '"'):
+            # Quoted literal or identifier; a doubled quote is an escaped quote
+            end = i + 1
+            while end < length:
+                if sql_query[end] == char:
+                    if end + 1 < length and sql_query[end + 1] == char:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            if pending_space and out:
+                out.append(' ')
+            pending_space = False
+            out.append(sql_query[i:end + 1])
+            i = end + 1
+        elif char == '-' and sql_query.startswith('--', i):
+            newline = sql_query.find('\n', i)
+            i = length if newline == -1 else newline
+            pending_space = True
+        elif char == '/' and sql_query.startswith('/*', i):
+            close = sql_query.find('*/', i + 2)
+            i = length if close == -1 else close + 2
+            pending_space = True
+        elif char.isspace():
+            pending_space = True
+            i += 1
+        else:
+            if pending_space and out:
+                out.append(' ')
+            pending_space = False
+            out.append(char.lower())
+            i += 1
+
+    normalized = ''.join(out).strip()
+    while normalized.endswith(';'):
+        normalized = normalized[:-1].rstrip()
+    return normalized
+
+
+def sql_fingerprint(sql_query: str, *scope: str) -> str:
+    """
+    Returns a stable hex digest of the normalized query, optionally scoped by
+    extra values such as the database key.
+    """
+    digest = hashlib.sha256()
+    for part in scope:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    digest.update(normalize_sql(sql_query).encode('utf-8'))
+    return digest.hexdigest()
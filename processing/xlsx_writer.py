@@ -0,0 +1,190 @@
+import csv
+import logging
+import math
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+import xlsxwriter
+
+from core.config import config
+
+# Rows per worksheet in Excel, including the header row
+EXCEL_MAX_ROWS = 1_048_576
+# Excel keeps 15 significant digits of a number
+EXCEL_MAX_DIGITS = 15
+# Numerals without leading zeros ("007" stays text)
+_NUMBER = re.compile(r"-?(?P<int>0|[1-9]\d*)(?:\.(?P<frac>\d+))?(?P<exp>[eE][-+]?\d{1,3})?")
+
+
+def _cell_value(text: str):
+    """
+    Numbers that survive a round trip through an Excel number become numbers; everything
+    else, including numbers with more than 15 significant digits or out of range, stays text.
+    """
+    match = _NUMBER.fullmatch(text)
+    if match is None:
+        return text
+    digits = (match.group("int") + (match.group("frac") or "")).strip("0")
+    if len(digits) > EXCEL_MAX_DIGITS:
+        return text
+    number = float(text)
+    if not math.isfinite(number):
+        return text
+    return int(text) if match.group("frac") is None and match.group("exp") is None else number
+
+
+def write_xlsx(rows: Iterable[List[str]], xlsx_path: str, max_rows_per_sheet: int = EXCEL_MAX_ROWS,
+               sheet_name: str = "Result") -> Tuple[int, int]:
+    """
+    Writes rows (the header first) to an xlsx file in constant memory: each row is
+    flushed to disk as soon as the next one starts. When a sheet is full, the rows
+    continue on a new sheet that repeats the header.
+
+    Returns:
+        The number of data rows and the number of sheets written.
+    """
+    rows = iter(rows)
+    header = next(rows, [])
+    workbook = xlsxwriter.Workbook(xlsx_path, {
+        'constant_memory': True,
+        # Values are written as given; text from a query result is never a formula or a link
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+        'tmpdir': config.result_spool_dir,
+    })
+    worksheet = None
+    sheet_count = 0
+    sheet_row = max_rows_per_sheet
+    row_count = 0
+    try:
+        for row in rows:
+            if sheet_row >= max_rows_per_sheet:
+                sheet_count += 1
+                worksheet = workbook.add_worksheet(sheet_name if sheet_count == 1 else f"{sheet_name} {sheet_count}")
+                worksheet.write_row(0, 0, header)
+                worksheet.freeze_panes(1, 0)
+                sheet_row = 1
+            worksheet.write_row(sheet_row, 0, [_cell_value(value) for value in row])
+            sheet_row += 1
+            row_count += 1
+        if worksheet is None:
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, header)
+            sheet_count = 1
+    finally:
+        workbook.close()
+    return row_count, sheet_count
+
+
+def csv_to_xlsx(csv_path: str, xlsx_path: str, max_rows_per_sheet: int = EXCEL_MAX_ROWS) -> Tuple[int, int]:
+    """
+    Streams a CSV file into an xlsx file. Runs in an XlsxExporter worker process.
+    """
+    with open(csv_path, 'r', encoding='utf-8', newline='') as file:
+        return write_xlsx(csv.reader(file), xlsx_path, max_rows_per_sheet)
+
+
+class XlsxExporter:
+    """
+    Converts CSV results into xlsx workbooks on a pool of worker processes, so building
+    the workbook neither holds the GIL nor competes with the event loop. Workers are
+    spawned (not forked) on first use, since the parent runs threads and an event loop.
+    Spawned workers re-import the entry module, which is why main.py only imports the
+    app (server.py) inside main().
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.max_workers = config.xlsx_workers
+        self.max_rows_per_sheet = min(config.xlsx_max_rows_per_sheet, EXCEL_MAX_ROWS)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {"conversions": 0, "failures": 0, "rows": 0, "sheets": 0, "seconds": 0.0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def convert_file(self, csv_path: str, xlsx_path: str) -> int:
+        """
+        Converts a CSV file into an xlsx file on a worker process and waits for it.
+        Call from a worker thread, not the event loop.
+
+        Returns:
+            The number of data rows written.
+        """
+        started = time.perf_counter()
+        try:
+            row_count, sheet_count = self._get_executor().submit(
+                csv_to_xlsx, csv_path, xlsx_path, self.max_rows_per_sheet).result()
+        except Exception:
+            with self._lock:
+                self._stats["failures"] += 1
+            raise
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats["conversions"] += 1
+            self._stats["rows"] += row_count
+            self._stats["sheets"] += sheet_count
+            self._stats["seconds"] += elapsed
+        self.logger.info(f"Wrote {row_count} rows on {sheet_count} sheet(s) to {xlsx_path} in {elapsed:.1f}s")
+        return row_count
+
+    def convert_stream(self, source, sink) -> int:
+        """
+        Converts a binary CSV stream into xlsx written to the sink. Worker processes work
+        on files, so streams without a file on disk (in-memory result buffers) are first
+        copied to a temporary file.
+
+        Returns:
+            The number of data rows written.
+        """
+        temp_paths = []
+        try:
+            csv_path = getattr(source, "name", None)
+            if not (isinstance(csv_path, str) and os.path.isfile(csv_path)):
+                csv_path = self._temp_path(".csv")
+                temp_paths.append(csv_path)
+                with open(csv_path, 'wb') as file:
+                    shutil.copyfileobj(source, file, 1024 * 1024)
+            xlsx_path = self._temp_path(".xlsx")
+            temp_paths.append(xlsx_path)
+            row_count = self.convert_file(csv_path, xlsx_path)
+            with open(xlsx_path, 'rb') as file:
+                shutil.copyfileobj(file, sink, 1024 * 1024)
+            return row_count
+        finally:
+            for path in temp_paths:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    @staticmethod
+    def _temp_path(suffix: str) -> str:
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=config.result_spool_dir)
+        os.close(fd)
+        return path
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, workers=self.max_workers, max_rows_per_sheet=self.max_rows_per_sheet,
+                        started=self._executor is not None)
+
+
+# Global exporter; its worker processes are shared by result conversion and FileCreator
+xlsx_exporter = XlsxExporter()
@@ -0,0 +1,173 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from core.config import config
+from .question_index import QuestionIndex
+
+
+class SQLGenerationCache:
+    """
+    In-memory LRU cache of SQL generated from natural language questions.
+
+    Entries are keyed by the normalized question, the provider, the model name, the
+    schema name and a hash of the schema content the provider was given. When a
+    provider reports a new schema hash for a schema, every entry generated against
+    the old schema is dropped.
+
+    Cached questions are also kept in a MinHash/LSH index, so a differently worded
+    version of an earlier question can reuse its SQL (see `get_similar`).
+    """
+
+    def __init__(self, ttl_seconds: int = None, max_entries: int = None):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = config.llm_cache_enabled
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.llm_cache_ttl_seconds
+        self.max_entries = max_entries if max_entries is not None else config.llm_cache_max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._schema_versions: Dict[Tuple[str, str, str], str] = {}
+        self.similarity_enabled = config.llm_similar_questions_enabled
+        self.similarity_threshold = config.llm_similarity_threshold
+        self._index = QuestionIndex()
+        self._stats = {"hits": 0, "similar_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0,
+                       "invalidations": 0}
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        """
+        Lowercases the question, collapses whitespace and drops trailing punctuation.
+        """
+        normalized = re.sub(r"\s+", " ", question.strip().lower())
+        return normalized.rstrip("?!. ")
+
+    def _make_key(self, question: str, provider: str, model: str, schema_name: str, schema_hash: str) -> Tuple:
+        return self.normalize_question(question), provider, model, schema_name.lower(), schema_hash
+
+    def _check_schema_version(self, provider: str, model: str, schema_name: str, schema_hash: str):
+        # Must be called with the lock held
+        scope = (provider, model, schema_name.lower())
+        previous = self._schema_versions.get(scope)
+        if previous == schema_hash:
+            return
+        self._schema_versions[scope] = schema_hash
+        if previous is None:
+            return
+        stale = [key for key in self._entries if key[1:4] == scope and key[4] != schema_hash]
+        for key in stale:
+            self._remove(key)
+        self._stats["invalidations"] += len(stale)
+        self.logger.info(f"Schema '{schema_name}' changed for {provider}/{model}; "
+                         f"invalidated {len(stale)} cached generations")
+
+    def _remove(self, key: Tuple) -> Optional[Dict]:
+        # Must be called with the lock held
+        self._index.remove(key)
+        return self._entries.pop(key, None)
+
+    def get(self, question: str, provider: str, model: str, schema_name: str,
+            schema_hash: str) -> Optional[Tuple[str, Dict]]:
+        """
+        Returns the cached (sql_query, metadata) for the question, or None.
+        """
+        if not self.enabled:
+            return None
+        key = self._make_key(question, provider, model, schema_name, schema_hash)
+        with self._lock:
+            self._check_schema_version(provider, model, schema_name, schema_hash)
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(key, entry):
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry["sql"], dict(entry["metadata"])
+
+    def get_similar(self, question: str, provider: str, model: str, schema_name: str,
+                    schema_hash: str) -> Optional[Tuple[str, Dict]]:
+        """
+        Returns the cached (sql_query, metadata) of the most similar earlier question, or None.
+        The metadata gets the matched question and its similarity score.
+        """
+        if not self.enabled or not self.similarity_enabled:
+            return None
+        scope = (provider, model, schema_name.lower(), schema_hash)
+        with self._lock:
+            self._check_schema_version(provider, model, schema_name, schema_hash)
+            match = self._index.find_similar(scope, question, self.similarity_threshold)
+            if match is None:
+                return None
+            key, similarity = match
+            entry = self._entries.get(key)
+            if entry is None or self._expired(key, entry):
+                return None
+            self._entries.move_to_end(key)
+            self._stats["similar_hits"] += 1
+            metadata = dict(entry["metadata"], similar_question=entry["question"], similarity=round(similarity, 3))
+            return entry["sql"], metadata
+
+    def _expired(self, key: Tuple, entry: Dict) -> bool:
+        # Must be called with the lock held; drops the entry if it has expired
+        if time.time() - entry["created_at"] <= self.ttl_seconds:
+            return False
+        self._remove(key)
+        self._stats["expirations"] += 1
+        return True
+
+    def put(self, question: str, provider: str, model: str, schema_name: str, schema_hash: str,
+            sql_query: str, metadata: Dict):
+        if not self.enabled or not sql_query:
+            return
+        key = self._make_key(question, provider, model, schema_name, schema_hash)
+        with self._lock:
+            self._check_schema_version(provider, model, schema_name, schema_hash)
+            self._remove(key)
+            self._entries[key] = {"question": question, "sql": sql_query, "metadata": dict(metadata),
+                                  "created_at": time.time()}
+            if self.similarity_enabled:
+                self._index.add(key, key[1:], question)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def update_metadata(self, question: str, provider: str, model: str, schema_name: str, schema_hash: str,
+                        sql_query: str, metadata: Dict):
+        """
+        Adds metadata that arrived after the SQL (a streamed explanation) to a cached
+        generation, unless the entry was dropped or its SQL replaced in the meantime.
+        """
+        if not self.enabled:
+            return
+        key = self._make_key(question, provider, model, schema_name, schema_hash)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["sql"] == sql_query:
+                entry["metadata"].update(metadata)
+
+    def invalidate(self, question: str, provider: str, model: str, schema_name: str, schema_hash: str):
+        """
+        Drops a single cached generation, e.g. when its SQL turned out to be unusable.
+        """
+        key = self._make_key(question, provider, model, schema_name, schema_hash)
+        with self._lock:
+            if self._remove(key) is not None:
+                self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index = QuestionIndex()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, enabled=self.enabled, entries=len(self._entries), max_entries=self.max_entries)
+
+
+# Global generation cache shared across channels and requests
+generation_cache = SQLGenerationCache()
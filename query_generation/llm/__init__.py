@@ -1,4 +1,5 @@
 from .base import LLMProviderInterface
 from .mistral_provider import MistralLLMProvider
+from .hedged_provider import HedgedLLMProvider
 
-__all__ = ["LLMProviderInterface", "MistralLLMProvider"] 
\ No newline at end of file
+__all__ = ["LLMProviderInterface", "MistralLLMProvider", "HedgedLLMProvider"] 
\ No newline at end of file
@@ -1,6 +1,9 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Tuple, Dict
 
+from ..nl_classifier import nl_classifier
+
 class LLMProviderInterface(ABC):
     """
     Interface for LLM providers to generate SQL from natural language
@@ -21,10 +24,44 @@ class LLMProviderInterface(ABC):
         """
         pass
 
-    @abstractmethod
+    async def generate_sql_async(self, natural_language_query: str, schema_name: str) -> Tuple[str, Dict]:
+        """
+        Async variant of generate_sql. Providers with an async client should override this;
+        the default runs generate_sql on a worker thread so the event loop is never blocked.
+
+        Args:
+            natural_language_query: The user's question in natural language.
+            schema_name: The name of the database schema to target.
+
+        Returns:
+            A tuple containing the generated SQL query string and a dictionary of metadata.
+        """
+        return await asyncio.to_thread(self.generate_sql, natural_language_query, schema_name)
+
+    async def stream_sql_async(self, natural_language_query: str, schema_name: str, need_explanation: bool = True):
+        """
+        Returns the SQL as soon as it is known, before the rest of the completion (the
+        explanation) has arrived. Providers that can stream completions override this;
+        the default waits for the full completion.
+
+        Args:
+            natural_language_query: The user's question in natural language.
+            schema_name: The name of the database schema to target.
+            need_explanation: Whether the rest of the completion is wanted. If not,
+                generation may be stopped as soon as the SQL is complete.
+
+        Returns:
+            A tuple (sql_query, metadata, rest), where rest is None or an awaitable that
+            resolves to the full metadata (including the explanation) once the
+            completion has finished.
+        """
+        sql_query, metadata = await self.generate_sql_async(natural_language_query, schema_name)
+        return sql_query, metadata, None
+
     def is_natural_language(self, text: str) -> bool:
         """
         Determines if the given text is likely natural language or an SQL query.
+        Providers share the provider-independent NLClassifier unless they override this.
 
         Args:
             text: The input text to analyze.
@@ -32,4 +69,17 @@ class LLMProviderInterface(ABC):
         Returns:
             True if the text is considered natural language, False otherwise.
         """
-        pass 
\ No newline at end of file
+        return nl_classifier.is_natural_language(text)
+
+    def get_cache_identity(self, schema_name: str) -> Tuple[str, str, str]:
+        """
+        Identifies what this provider would generate for a schema, for keying generation caches.
+
+        Args:
+            schema_name: The name of the database schema to target.
+
+        Returns:
+            A tuple (provider_name, model_name, schema_hash). The schema hash must change
+            whenever the schema content given to the model changes.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} does not support generation caching.")
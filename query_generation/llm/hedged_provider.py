@@ -0,0 +1,339 @@
+import asyncio
+import bisect
+import logging
+import threading
+import time
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+from core.config import config
+from .base import LLMProviderInterface
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0, 6.0, 8.0, 12.0, 20.0, 30.0, 60.0)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram with approximate percentiles.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Returns the upper bound of the bucket holding the given percentile, or None without samples.
+        """
+        if not self.total:
+            return None
+        threshold = self.total * percent / 100.0
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold:
+                return self.buckets[index] if index < len(self.buckets) else self.buckets[-1] * 2
+        return self.buckets[-1] * 2
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.total,
+            "avg_seconds": round(self.sum / self.total, 3) if self.total else None,
+            "p50_seconds": self.percentile(50),
+            "p95_seconds": self.percentile(95),
+            "p99_seconds": self.percentile(99),
+            "buckets": {f"le_{bound}": count for bound, count in zip(self.buckets, self.counts)},
+        }
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and skips the provider for
+    `cooldown_seconds`; then lets a single trial call through (half-open) and closes
+    again on success.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.opened_count = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            return "half_open"
+        return "open"
+
+    def available(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self.trial_in_flight)
+
+    def allow(self) -> bool:
+        """
+        Like available(), but reserves the half-open trial call.
+        """
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.trial_in_flight = False
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                self.opened_count += 1
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        # A call that was cancelled neither succeeded nor failed
+        self.trial_in_flight = False
+
+
+class _ProviderSlot:
+    def __init__(self, provider: LLMProviderInterface):
+        self.provider = provider
+        self.name = getattr(provider, "name", provider.__class__.__name__)
+        self.histogram = LatencyHistogram()
+        self.breaker = CircuitBreaker(config.llm_breaker_failure_threshold, config.llm_breaker_cooldown_seconds)
+        self.stats = {"calls": 0, "wins": 0, "failures": 0, "invalid": 0, "cancelled": 0}
+
+
+_instances = weakref.WeakSet()
+
+
+class HedgedLLMProvider(LLMProviderInterface):
+    """
+    Composite provider over an ordered list of providers (or models).
+
+    A call goes to the first provider whose circuit breaker is closed. If it hasn't
+    answered within the primary's LLM_HEDGE_PERCENTILE latency, the next provider is
+    asked as well (a hedged request); a failed or invalid answer fails over to the
+    next provider immediately. The first valid answer wins and the other calls are
+    cancelled.
+    """
+
+    def __init__(self, providers: List[LLMProviderInterface]):
+        if not providers:
+            raise ValueError("HedgedLLMProvider needs at least one provider.")
+        self.logger = logging.getLogger(__name__)
+        self.slots = [_ProviderSlot(provider) for provider in providers]
+        self.name = "hedged(" + ",".join(slot.name for slot in self.slots) + ")"
+        self.hedge_percentile = config.llm_hedge_percentile
+        self.hedge_min_samples = config.llm_hedge_min_samples
+        self.default_hedge_delay = config.llm_hedge_delay_seconds
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "hedged": 0, "failovers": 0, "all_failed": 0}
+        _instances.add(self)
+
+    @staticmethod
+    def _is_valid(sql_query: str) -> bool:
+        # Imported here to avoid a circular import through the query_generation package
+        from query_generation.sql_validator import SQLValidator
+
+        if not sql_query:
+            return False
+        is_valid, details = SQLValidator().validate_query(sql_query)
+        # Unresolved tables or columns are the generation's mistake, not the provider's: the
+        # answer still wins and gets the caller's repair round instead of tripping the breaker
+        return is_valid or len(details["issues"]) == len(details["semantic_issues"])
+
+    def _hedge_delay(self, slot: _ProviderSlot) -> float:
+        if slot.histogram.total < self.hedge_min_samples:
+            return self.default_hedge_delay
+        return slot.histogram.percentile(self.hedge_percentile)
+
+    def _available_slots(self) -> Tuple[List[_ProviderSlot], bool]:
+        """
+        Returns the slots to try in order, and whether that is the primary forced past its
+        open breaker because every breaker is open.
+        """
+        with self._lock:
+            slots = [slot for slot in self.slots if slot.breaker.available()]
+        if not slots:
+            # Every breaker is open; better to try the primary than to fail outright
+            return [self.slots[0]], True
+        return slots, False
+
+    def _reserve(self, slot: _ProviderSlot, forced: bool) -> bool:
+        # Another request may have taken the half-open trial call since the slot was listed
+        with self._lock:
+            if not slot.breaker.allow() and not forced:
+                return False
+            slot.stats["calls"] += 1
+            return True
+
+    async def _hedged(self, call, describe: str):
+        """
+        Runs call(provider) with hedging and failover. call returns a tuple whose
+        first element is the SQL query.
+        """
+        with self._lock:
+            self._stats["requests"] += 1
+        candidates, forced = self._available_slots()
+        pending: Dict[asyncio.Future, Tuple[_ProviderSlot, float]] = {}
+        errors = []
+        next_index = 0
+        launched = 0
+
+        def launch_next() -> bool:
+            # Starts the next candidate whose breaker lets the call through
+            nonlocal next_index, launched
+            while next_index < len(candidates):
+                slot = candidates[next_index]
+                next_index += 1
+                if self._reserve(slot, forced):
+                    task = asyncio.ensure_future(call(slot.provider))
+                    pending[task] = (slot, time.monotonic())
+                    launched += 1
+                    return True
+                errors.append(f"{slot.name}: circuit open")
+            return False
+
+        launch_next()
+        try:
+            while pending:
+                timeout = None
+                if next_index < len(candidates):
+                    primary_slot, primary_started = next(iter(pending.values()))
+                    timeout = max(0.0, self._hedge_delay(primary_slot) - (time.monotonic() - primary_started))
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Too slow: hedge with the next provider while the first keeps running
+                    slow = next(iter(pending.values()))[0].name
+                    if launch_next():
+                        with self._lock:
+                            self._stats["hedged"] += 1
+                        self.logger.info(f"{describe}: no answer from {slow} in time, hedged with "
+                                         f"{candidates[next_index - 1].name}")
+                    continue
+
+                for task in done:
+                    slot, started = pending.pop(task)
+                    latency = time.monotonic() - started
+                    error = task.exception()
+                    if error is None and self._is_valid(task.result()[0]):
+                        with self._lock:
+                            slot.histogram.record(latency)
+                            slot.breaker.record_success()
+                            slot.stats["wins"] += 1
+                        result = task.result()
+                        if result[1] is not None:
+                            result[1]["llm_provider_used"] = slot.name
+                            result[1]["hedged"] = launched > 1
+                        return result
+                    if error is None and len(task.result()) > 2 and task.result()[2] is not None:
+                        task.result()[2].cancel()  # Stop streaming the rest of an answer that lost
+                    with self._lock:
+                        if error is None:
+                            slot.stats["invalid"] += 1
+                        else:
+                            slot.stats["failures"] += 1
+                        slot.breaker.record_failure()
+                    errors.append(f"{slot.name}: {error if error is not None else 'invalid SQL'}")
+                    self.logger.warning(f"{describe}: {errors[-1]}")
+                    if not pending and launch_next():
+                        with self._lock:
+                            self._stats["failovers"] += 1
+        finally:
+            for task, (slot, _) in pending.items():
+                task.cancel()
+                with self._lock:
+                    slot.stats["cancelled"] += 1
+                    slot.breaker.release()
+                task.add_done_callback(self._discard_loser)
+
+        with self._lock:
+            self._stats["all_failed"] += 1
+        raise RuntimeError(f"All LLM providers failed: {'; '.join(errors)}")
+
+    @staticmethod
+    def _discard_loser(task: asyncio.Future):
+        # A loser that finished anyway may own a still-running stream reader
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        if len(result) > 2 and result[2] is not None:
+            result[2].cancel()
+
+    def generate_sql(self, natural_language_query: str, schema_name: str) -> Tuple[str, Dict]:
+        # Synchronous callers get failover in order, without hedging
+        errors = []
+        candidates, forced = self._available_slots()
+        for slot in candidates:
+            if not self._reserve(slot, forced):
+                errors.append(f"{slot.name}: circuit open")
+                continue
+            started = time.monotonic()
+            try:
+                sql_query, metadata = slot.provider.generate_sql(natural_language_query, schema_name)
+            except Exception as e:
+                with self._lock:
+                    slot.stats["failures"] += 1
+                    slot.breaker.record_failure()
+                errors.append(f"{slot.name}: {e}")
+                continue
+            if self._is_valid(sql_query):
+                with self._lock:
+                    slot.histogram.record(time.monotonic() - started)
+                    slot.breaker.record_success()
+                    slot.stats["wins"] += 1
+                metadata["llm_provider_used"] = slot.name
+                return sql_query, metadata
+            with self._lock:
+                slot.stats["invalid"] += 1
+                slot.breaker.record_failure()
+            errors.append(f"{slot.name}: invalid SQL")
+        raise RuntimeError(f"All LLM providers failed: {'; '.join(errors)}")
+
+    async def generate_sql_async(self, natural_language_query: str, schema_name: str) -> Tuple[str, Dict]:
+        return await self._hedged(
+            lambda provider: provider.generate_sql_async(natural_language_query, schema_name),
+            "SQL generation")
+
+    async def stream_sql_async(self, natural_language_query: str, schema_name: str, need_explanation: bool = True):
+        return await self._hedged(
+            lambda provider: provider.stream_sql_async(natural_language_query, schema_name,
+                                                       need_explanation=need_explanation),
+            "Streaming SQL generation")
+
+    def get_cache_identity(self, schema_name: str) -> Tuple[str, str, str]:
+        # Any provider in the list may answer, so the whole list is part of the identity
+        _, model_name, schema_hash = self.slots[0].provider.get_cache_identity(schema_name)
+        return self.name, model_name, schema_hash
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(
+                self._stats,
+                providers={
+                    slot.name: dict(slot.stats, breaker=slot.breaker.state, breaker_opened=slot.breaker.opened_count,
+                                    latency=slot.histogram.summary())
+                    for slot in self.slots
+                },
+            )
+
+
+def hedged_provider_stats() -> Dict[str, Dict]:
+    return {provider.name: provider.get_stats() for provider in list(_instances)}
@@ -1,36 +1,65 @@
+import asyncio
+import hashlib
 import json
 import logging
-from typing import Dict, Tuple
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
 
+import httpx # The Mistral SDK's HTTP client; its transport errors surface unwrapped
 from mistralai import Mistral # Corrected import based on typical usage
-# from mistralai.models.chat_completion import ChatMessage # For older versions
-from mistralai.models.chat_completion import ChatMessage # Assuming this is the modern way or use mistral_models from QueryGenerator
 
 from core.config import config # Use the new AppConfig instance
 from .base import LLMProviderInterface
+from .rate_limiter import get_rate_limiter
+from .stream_parser import SQLStreamParser
+from ..schema_manager import schema_manager
+from ..schema_pruner import schema_pruner
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# HTTP statuses whose Retry-After header says when to try again
+RETRY_AFTER_STATUS_CODES = {429, 503}
 
 class MistralLLMProvider(LLMProviderInterface):
     """
     LLMProvider implementation for Mistral AI.
     """
 
-    def __init__(self):
+    def __init__(self, model_name: str = None, server_url: str = None):
+        """
+        Args:
+            model_name: The Mistral model to use; defaults to MISTRAL_MODEL.
+            server_url: Optional API endpoint, e.g. a self-hosted Mistral-compatible server.
+        """
         self.logger = logging.getLogger(__name__)
-        self.model_name = config.mistral_model # Get model from global config
+        self.model_name = model_name or config.mistral_model # Get model from global config
+        self.server_url = server_url
+        self.name = f"mistral:{self.model_name}" + (f"@{server_url}" if server_url else "")
 
         if not config.mistral_api_key:
             self.logger.error("MISTRAL_API_KEY not found in environment or config.")
             raise ValueError("MISTRAL_API_KEY is required for MistralLLMProvider.")
         
-        self.client = Mistral(api_key=config.mistral_api_key)
+        if server_url:
+            self.client = Mistral(api_key=config.mistral_api_key, server_url=server_url)
+        else:
+            self.client = Mistral(api_key=config.mistral_api_key)
+        self.max_tokens = 1000
+        self.temperature = 0.1
+        # Shared by every request to the same Mistral endpoint in this process
+        self.rate_limiter = get_rate_limiter(f"mistral@{server_url}" if server_url else 'mistral',
+                                             config.llm_requests_per_second,
+                                             config.llm_tokens_per_minute, config.llm_request_burst)
         # The schema will be passed to generate_sql or handled internally based on schema_name
         # For now, let's replicate the existing behavior by having a method for the default schema.
         self.default_schema_content = self._get_default_star_dwh_schema()
 
     def _get_default_star_dwh_schema(self) -> str:
         """
-        Returns the hardcoded star_dwh schema.
-        This is to maintain current functionality. Future versions should load this dynamically.
+        Returns the built-in star_dwh schema, used until the SchemaManager has
+        introspected the real one.
         """
         # This schema content is taken directly from the original QueryGenerator
         schema = """
@@ -84,6 +113,26 @@ class MistralLLMProvider(LLMProviderInterface):
         """
         return schema.strip()
 
+    def _get_schema_content(self, schema_name: str, question: str = None) -> str:
+        """
+        Returns the schema description given to the model for a schema name, pruned to
+        the tables relevant to the question when one is given.
+        """
+        catalog = schema_manager.get_catalog(schema_name)
+        if catalog is not None:
+            return schema_pruner.prune(question, catalog) if question else catalog.to_prompt_text()
+        if schema_name.lower() == "star_dwh":
+            return self.default_schema_content
+        raise ValueError(f"Schema '{schema_name}' has not been introspected yet; "
+                         f"check SCHEMA_SOURCES and the schema refresh logs.")
+
+    def get_cache_identity(self, schema_name: str) -> Tuple[str, str, str]:
+        catalog = schema_manager.get_catalog(schema_name)
+        if catalog is not None:
+            return 'mistral', self.model_name, catalog.content_hash[:16]
+        schema_hash = hashlib.sha256(self._get_schema_content(schema_name).encode('utf-8')).hexdigest()[:16]
+        return 'mistral', self.model_name, schema_hash
+
     def _build_prompt(self, question: str, schema_content: str) -> Dict[str, str]:
         """
         Builds the prompt to send to the Mistral AI model.
@@ -152,54 +201,45 @@ class MistralLLMProvider(LLMProviderInterface):
                     return sql_query, {"extracted": "heuristic", "original_response": response_text}
             return response_text, {"extracted": "raw", "parse_error": "Could not extract structured SQL"}
 
+    def _chat_messages(self, natural_language_query: str, schema_name: str) -> List[Dict[str, str]]:
+        schema_content = self._get_schema_content(schema_name, natural_language_query)
+        prompt_messages = self._build_prompt(natural_language_query, schema_content)
+        return [
+            {"role": "system", "content": prompt_messages["system"]},
+            {"role": "user", "content": prompt_messages["user"]},
+        ]
+
+    def _estimate_tokens(self, messages: List[Dict[str, str]]) -> int:
+        # Roughly 4 characters per token for the prompt, plus the completion budget
+        return sum(len(message["content"]) for message in messages) // 4 + self.max_tokens
+
+    def _parse_chat_response(self, chat_response, schema_name: str) -> Tuple[str, Dict]:
+        # Check if response.choices is non-empty and message.content exists
+        if not chat_response.choices or not chat_response.choices[0].message or not chat_response.choices[0].message.content:
+            self.logger.error("Mistral API response is empty or malformed.")
+            raise RuntimeError("Mistral API response is empty or malformed.")
+
+        sql_query, metadata = self._extract_sql_from_response(chat_response.choices[0].message.content)
+
+        # Add model name to metadata for clarity
+        metadata['llm_provider'] = 'mistral'
+        metadata['model_name'] = self.model_name
+        metadata['schema_used'] = schema_name
+        return sql_query, metadata
+
     def generate_sql(self, natural_language_query: str, schema_name: str) -> Tuple[str, Dict]:
         self.logger.info(f"Generating SQL for question: '{natural_language_query}' using schema: '{schema_name}' with Mistral model: '{self.model_name}'")
 
-        # For now, if schema_name is the default, use the hardcoded schema.
-        # Future: Load schema dynamically based on schema_name.
-        current_schema_content = ""
-        if schema_name.lower() == "star_dwh": # Assuming config.db_schema_name will be 'star_dwh' by default
-            current_schema_content = self.default_schema_content
-        else:
-            # Placeholder for handling other schemas or raising an error
-            self.logger.warning(f"Schema '{schema_name}' is not the default 'star_dwh'. Dynamic schema loading not yet implemented. Using default schema.")
-            current_schema_content = self.default_schema_content # Or raise NotImplementedError
+        messages = self._chat_messages(natural_language_query, schema_name)
 
-        prompt_messages = self._build_prompt(natural_language_query, current_schema_content)
-        
         try:
-            # Using the structure from QueryGenerator's Mistral call
-            # Note: The original QueryGenerator used self.client.chat.complete(...)
-            # The MistralClient might be initialized as `self.client = Mistral(...)` and then `self.client.chat(...)`
-            # Or, if `Mistral` from `mistralai` is the client itself, then `self.client.chat.completions.create(...)`
-            # Let's assume `MistralClient` is the correct top-level client from `mistralai.client`
-            # and the API is `self.client.chat(...)` as per newer SDK versions or `self.client.chat.completions.create(...)`
-            
-            # Based on the original QG: `response = self.client.chat.complete(` - this seems like a custom wrapper or older SDK.
-            # The standard Mistral Python client `mistralai.MistralClient` uses `client.chat(...)`.
-            # Let's stick to what seems more standard:
-            chat_response = self.client.chat(
+            chat_response = self.client.chat.complete(
                 model=self.model_name,
-                messages=[
-                    ChatMessage(role="system", content=prompt_messages["system"]),
-                    ChatMessage(role="user", content=prompt_messages["user"])
-                ],
-                temperature=0.1,
-                max_tokens=1000
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
             )
-            
-            # Check if response.choices is non-empty and message.content exists
-            if not chat_response.choices or not chat_response.choices[0].message or not chat_response.choices[0].message.content:
-                self.logger.error("Mistral API response is empty or malformed.")
-                raise RuntimeError("Mistral API response is empty or malformed.")
-
-            sql_query, metadata = self._extract_sql_from_response(chat_response.choices[0].message.content)
-            
-            # Add model name to metadata for clarity
-            metadata['llm_provider'] = 'mistral'
-            metadata['model_name'] = self.model_name
-            metadata['schema_used'] = schema_name
-
+            sql_query, metadata = self._parse_chat_response(chat_response, schema_name)
             self.logger.info(f"Generated SQL query: {sql_query}")
             return sql_query, metadata
             
@@ -208,66 +248,199 @@ class MistralLLMProvider(LLMProviderInterface):
             # Propagate a more specific error or the original one
             raise RuntimeError(f"MistralLLMProvider failed to generate SQL query: {str(e)}")
 
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        # httpx.TransportError covers timeouts (ReadTimeout) and connection failures (ConnectError)
+        if isinstance(error, (asyncio.TimeoutError, ConnectionError, httpx.TransportError)):
+            return True
+        return getattr(error, 'status_code', None) in RETRYABLE_STATUS_CODES
 
-    def is_natural_language(self, text: str) -> bool:
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
         """
-        Determines if the input is likely natural language rather than SQL.
-        (Logic moved from QueryGenerator)
+        Returns the seconds to wait from the Retry-After header (seconds or an HTTP date)
+        of a 429/503 response, or None if it has none.
         """
-        # Simple heuristic: if it doesn't contain common SQL keywords, it's likely natural language.
-        # This heuristic is case-insensitive.
-        sql_keywords = [
-            "SELECT", "FROM", "WHERE", "INSERT", "UPDATE", "DELETE", "CREATE", 
-            "ALTER", "DROP", "TABLE", "JOIN", "GROUP BY", "ORDER BY", "LIMIT",
-            "OFFSET", "HAVING", "UNION", "VALUES", "INDEX", "VIEW", "TRIGGER",
-            "PROCEDURE", "FUNCTION", "DATABASE", "SCHEMA" 
-        ]
-        text_upper = text.upper()
-        
-        # Check for specific patterns that are clearly SQL
-        if text_upper.strip().startswith("EXPLAIN ") or text_upper.strip().startswith("DESCRIBE "):
-            return False # These are usually SQL commands
-
-        # Check for SQL comments
-        if text.strip().startswith("--") or text.strip().startswith("/*"):
-            return False
-
-        # Check for presence of multiple SQL keywords
-        found_keywords = 0
-        for keyword in sql_keywords:
-            if keyword in text_upper:
-                found_keywords +=1
-        
-        # If very few or no SQL keywords, likely natural language
-        # If more, it's likely SQL or mixed. This threshold can be tuned.
-        # A simple approach: if common SQL starting words are present, it's likely SQL.
-        common_sql_starters = ["SELECT", "INSERT", "UPDATE", "DELETE", "CREATE", "ALTER", "DROP", "WITH"]
-        for starter in common_sql_starters:
-            if text_upper.startswith(starter):
-                return False
-        
-        # If no strong SQL signals, assume natural language.
-        # The original heuristic was: `not any(keyword in text_upper for keyword in sql_keywords)`
-        # Let's refine slightly: if it contains a few SQL keywords AND starts like one, it's SQL.
-        # Otherwise, more likely NL.
-        
-        # Let's stick to the original simple and effective heuristic for now to ensure no behavior change:
-        original_sql_keywords = ["SELECT", "FROM", "WHERE", "INSERT", "UPDATE", "DELETE", "CREATE", "ALTER", "DROP", "TABLE", "JOIN"]
-        if any(keyword in text_upper for keyword in original_sql_keywords):
-            # It contains at least one major SQL keyword.
-            # Further check: does it *primarily* look like SQL?
-            # A simple check: if it contains ';', it's highly likely SQL.
-            if ';' in text:
-                return False
-            # If it has several SQL keywords and not too many other words, it might be SQL.
-            # This gets complex. The original heuristic is safer for now.
-            # `return not any(keyword in text_upper for keyword in sql_keywords)` implies that if ANY keyword is found, it's NOT NL.
-            # This might be too strict. Example: "Show me sales FROM last month" would be SQL.
-            # The original `QueryGenerator` code read:
-            # `return not any(keyword in text_upper for keyword in sql_keywords)`
-            # This means: if any SQL keyword is found, `any(...)` is true, `not any(...)` is false. So it's considered SQL.
-            # If NO SQL keyword is found, `any(...)` is false, `not any(...)` is true. So it's considered NL.
-            # This seems correct for the original intent.
-            return False # It contains SQL keywords, so it's likely SQL or mixed. Treat as SQL for safety.
-
-        return True # No common SQL keywords found, assume Natural Language. 
\ No newline at end of file
+        if getattr(error, 'status_code', None) not in RETRY_AFTER_STATUS_CODES:
+            return None
+        # Older mistralai releases only expose the response, not its headers
+        headers = getattr(error, 'headers', None) or getattr(getattr(error, 'raw_response', None), 'headers', None)
+        value = headers.get('Retry-After') if headers is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        retry_after = self._retry_after(error)
+        if retry_after is not None:
+            return retry_after
+        # Exponential backoff with full jitter
+        ceiling = min(config.llm_retry_max_delay_seconds, config.llm_retry_base_delay_seconds * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+    async def _call_with_retries(self, call, estimated_tokens: int):
+        """
+        Runs `call` (an async function returning (result, used_tokens)) through the shared
+        rate limiter, bounded by LLM_TIMEOUT_SECONDS and retried with backoff on 429/5xx
+        and timeouts.
+
+        Returns:
+            A tuple (result, queue_wait_seconds, latency_seconds, attempts).
+        """
+        queue_wait = 0.0
+        attempt = 0
+        while True:
+            attempt += 1
+            queue_wait += await self.rate_limiter.acquire(estimated_tokens)
+            started = time.monotonic()
+            try:
+                result, used_tokens = await asyncio.wait_for(call(), timeout=config.llm_timeout_seconds)
+                latency = time.monotonic() - started
+                self.rate_limiter.release(estimated_tokens, used_tokens, latency, success=True)
+                return result, queue_wait, latency, attempt
+            except Exception as e:
+                latency = time.monotonic() - started
+                self.rate_limiter.release(estimated_tokens, None, latency, success=False)
+                if not self._is_retryable(e) or attempt > config.llm_max_retries:
+                    self.logger.error(f"Error calling Mistral AI API (attempt {attempt}): {str(e) or type(e).__name__}",
+                                      exc_info=True)
+                    raise RuntimeError(f"MistralLLMProvider failed to generate SQL query: {str(e) or type(e).__name__}")
+                delay = self._retry_delay(attempt, e)
+                self.logger.warning(f"Mistral call failed (attempt {attempt}, {str(e) or type(e).__name__}); "
+                                    f"retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def generate_sql_async(self, natural_language_query: str, schema_name: str) -> Tuple[str, Dict]:
+        """
+        Generates SQL without blocking the event loop. Calls go through the shared rate limiter,
+        are bounded by LLM_TIMEOUT_SECONDS and are retried with backoff on 429/5xx and timeouts.
+        """
+        self.logger.info(f"Generating SQL (async) for question: '{natural_language_query}' using schema: '{schema_name}' with Mistral model: '{self.model_name}'")
+
+        messages = self._chat_messages(natural_language_query, schema_name)
+
+        async def complete():
+            chat_response = await self.client.chat.complete_async(
+                model=self.model_name,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
+            )
+            usage = getattr(chat_response, 'usage', None)
+            return chat_response, getattr(usage, 'total_tokens', None)
+
+        chat_response, queue_wait, latency, attempts = await self._call_with_retries(
+            complete, self._estimate_tokens(messages))
+
+        sql_query, metadata = self._parse_chat_response(chat_response, schema_name)
+        metadata['queue_wait_ms'] = round(queue_wait * 1000)
+        metadata['llm_latency_ms'] = round(latency * 1000)
+        metadata['attempts'] = attempts
+        self.logger.info(f"Generated SQL query in {latency:.2f}s after {queue_wait:.2f}s rate limiter wait "
+                         f"({attempts} attempt(s)): {sql_query}")
+        return sql_query, metadata
+
+    @staticmethod
+    def _stream_delta(event) -> str:
+        choices = getattr(event.data, 'choices', None)
+        if not choices:
+            return ""
+        return choices[0].delta.content or ""
+
+    @staticmethod
+    async def _close_stream(stream):
+        # Closing the HTTP response stops the generation server-side
+        try:
+            await stream.__aexit__(None, None, None)
+        except Exception:
+            pass
+
+    async def stream_sql_async(self, natural_language_query: str, schema_name: str,
+                               need_explanation: bool = True):
+        """
+        Streams the completion and returns as soon as the "sql" field is complete.
+        With need_explanation=False the stream is closed right there; otherwise the
+        rest of the completion is read by a background task.
+        """
+        self.logger.info(f"Generating SQL (streaming) for question: '{natural_language_query}' using schema: '{schema_name}' with Mistral model: '{self.model_name}'")
+
+        messages = self._chat_messages(natural_language_query, schema_name)
+
+        async def read_until_sql():
+            stream = await self.client.chat.stream_async(
+                model=self.model_name,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
+            )
+            parser = SQLStreamParser()
+            iterator = stream.__aiter__()
+            done = False
+            try:
+                while parser.sql is None:
+                    try:
+                        event = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        done = True
+                        break
+                    parser.feed(self._stream_delta(event))
+            except BaseException:
+                await self._close_stream(stream)
+                raise
+            return (stream, iterator, parser, done), None
+
+        started = time.monotonic()
+        (stream, iterator, parser, done), queue_wait, latency, attempts = await self._call_with_retries(
+            read_until_sql, self._estimate_tokens(messages))
+        base_metadata = {
+            'llm_provider': 'mistral',
+            'model_name': self.model_name,
+            'schema_used': schema_name,
+            'queue_wait_ms': round(queue_wait * 1000),
+            'llm_latency_ms': round(latency * 1000),
+            'attempts': attempts,
+            'streamed': True,
+        }
+
+        if parser.sql is None:
+            # No "sql" field (an error object or free text): the stream ended, parse all of it
+            sql_query, metadata = self._extract_sql_from_response(parser.text)
+            return sql_query, dict(metadata, **base_metadata), None
+
+        sql_query = parser.sql
+        self.logger.info(f"SQL complete after {latency:.2f}s of streaming ({queue_wait:.2f}s rate limiter wait): {sql_query}")
+        if not need_explanation or done:
+            if not done:
+                await self._close_stream(stream)
+            metadata = dict(base_metadata, stopped_early=not done)
+            if done:
+                metadata.update(self._extract_sql_from_response(parser.text)[1])
+            return sql_query, metadata, None
+
+        async def read_rest() -> Dict:
+            try:
+                async for event in self._remaining_events(iterator):
+                    parser.feed(self._stream_delta(event))
+            finally:
+                await self._close_stream(stream)
+            _, metadata = self._extract_sql_from_response(parser.text)
+            metadata['total_latency_ms'] = round((time.monotonic() - started) * 1000)
+            return dict(metadata, **base_metadata)
+
+        rest_task = asyncio.ensure_future(asyncio.wait_for(read_rest(), timeout=config.llm_timeout_seconds))
+        return sql_query, dict(base_metadata), rest_task
+
+    @staticmethod
+    async def _remaining_events(iterator):
+        while True:
+            try:
+                yield await iterator.__anext__()
+            except StopAsyncIteration:
+                return
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` units and refills at `rate` units per second.
+    A rate of 0 disables the bucket.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        """
+        Returns how many seconds to wait before `amount` units are available.
+        """
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        # A request bigger than the bucket waits for a full bucket and then drives it negative
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self.rate)
+
+    def consume(self, amount: float):
+        if self.rate > 0:
+            self.level -= amount
+
+
+class LLMRateLimiter:
+    """
+    Async limiter for LLM API calls, shared by all requests to one provider.
+
+    Calls are limited by requests per second and by tokens per minute. Token usage
+    is estimated up front and corrected with the usage the API reports afterwards.
+    Waiters are served in arrival order.
+    """
+
+    def __init__(self, name: str, requests_per_second: float, tokens_per_minute: float, burst: int = 1):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.requests = TokenBucket(requests_per_second, max(burst, 1))
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+        self._lock: Optional[asyncio.Lock] = None
+        self._stats = {
+            "calls": 0, "failed": 0, "in_flight": 0, "tokens": 0,
+            "total_wait_seconds": 0.0, "max_wait_seconds": 0.0,
+            "total_latency_seconds": 0.0, "max_latency_seconds": 0.0,
+        }
+
+    async def acquire(self, estimated_tokens: int) -> float:
+        """
+        Waits until a call of `estimated_tokens` tokens may be made.
+
+        Returns:
+            The time spent waiting, in seconds.
+        """
+        if self._lock is None:
+            # Created lazily so it belongs to the running event loop
+            self._lock = asyncio.Lock()
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                delay = max(self.requests.time_until(1, now), self.tokens.time_until(estimated_tokens, now))
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            self.requests.consume(1)
+            self.tokens.consume(estimated_tokens)
+        waited = time.monotonic() - started
+        self._stats["in_flight"] += 1
+        self._stats["total_wait_seconds"] += waited
+        self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+        if waited > 0.5:
+            self.logger.info(f"{self.name} call waited {waited:.2f}s for the rate limiter")
+        return waited
+
+    def release(self, estimated_tokens: int, used_tokens: Optional[int], latency_seconds: float, success: bool):
+        """
+        Records a finished call and charges the difference between estimated and reported token usage.
+        """
+        if used_tokens is not None:
+            self.tokens.consume(used_tokens - estimated_tokens)
+        self._stats["in_flight"] -= 1
+        self._stats["calls"] += 1
+        self._stats["tokens"] += used_tokens if used_tokens is not None else estimated_tokens
+        self._stats["total_latency_seconds"] += latency_seconds
+        self._stats["max_latency_seconds"] = max(self._stats["max_latency_seconds"], latency_seconds)
+        if not success:
+            self._stats["failed"] += 1
+
+    def get_stats(self) -> Dict:
+        stats = dict(self._stats)
+        calls = max(stats["calls"], 1)
+        stats["avg_wait_seconds"] = round(stats["total_wait_seconds"] / calls, 4)
+        stats["avg_latency_seconds"] = round(stats["total_latency_seconds"] / calls, 4)
+        stats["requests_per_second"] = self.requests.rate
+        stats["tokens_per_minute"] = round(self.tokens.rate * 60)
+        return stats
+
+
+_limiters: Dict[str, LLMRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, requests_per_second: float, tokens_per_minute: float, burst: int = 1) -> LLMRateLimiter:
+    """
+    Returns the process-wide limiter for a provider, creating it on first use.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = LLMRateLimiter(name, requests_per_second, tokens_per_minute, burst)
+        return _limiters[name]
+
+
+def rate_limiter_stats() -> Dict[str, Dict]:
+    with _limiters_lock:
+        return {name: limiter.get_stats() for name, limiter in _limiters.items()}
@@ -0,0 +1,63 @@
+import json
+import re
+from typing import Optional
+
+_FIELD_START = re.compile(r'"sql"\s*:\s*"|"error"\s*:')
+
+
+class SQLStreamParser:
+    """
+    Incrementally extracts the "sql" string field from a streamed JSON completion
+    such as {"sql": "SELECT ...", "explanation": "..."}, possibly wrapped in a
+    ```json fence. `sql` is set as soon as the field's closing quote arrives, so
+    the rest of the completion doesn't have to be waited for.
+
+    If the model answers with an "error" object instead, `saw_error` is set and
+    the full text should be parsed once the stream is complete.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.sql: Optional[str] = None
+        self.saw_error = False
+        self._value_start: Optional[int] = None
+        self._scan_pos = 0
+        self._escaped = False
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Adds the next piece of the completion. Returns the SQL once it is complete.
+        """
+        if not chunk:
+            return self.sql
+        self.text += chunk
+        if self.sql is not None or self.saw_error:
+            return self.sql
+
+        if self._value_start is None:
+            # Look back a little in case the key was split across chunks
+            match = _FIELD_START.search(self.text, max(0, self._scan_pos - 16))
+            if match is None:
+                self._scan_pos = len(self.text)
+                return None
+            if match.group(0).startswith('"error"'):
+                self.saw_error = True
+                return None
+            self._value_start = match.end()
+            self._scan_pos = self._value_start
+
+        # Scan the string value for its unescaped closing quote
+        text = self.text
+        pos = self._scan_pos
+        while pos < len(text):
+            char = text[pos]
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self.sql = json.loads(text[self._value_start - 1:pos + 1])
+                return self.sql
+            pos += 1
+        self._scan_pos = pos
+        return None
@@ -0,0 +1,136 @@
+import re
+from typing import Dict, Tuple
+
+# One scan over the text picks out every feature the classifier looks at
+_SCAN = re.compile(r"""
+    (?P<comment>--[^\n]*|/\*.*?(?:\*/|$))
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<clause>\b(?:GROUP|ORDER|PARTITION)\s+BY\b)
+  | (?P<qualified>\b[A-Za-z_]\w*\.(?:[A-Za-z_]\w*|\*))
+  | (?P<call>\b[A-Za-z_]\w*\()
+  | (?P<word>\b[A-Za-z_]\w*\b)
+  | (?P<number>\b\d+(?:\.\d+)?\b)
+  | (?P<op><>|!=|>=|<=|=|::|\|\|)
+  | (?P<star>\*)
+  | (?P<semicolon>;)
+  | (?P<question>\?)
+""", re.VERBOSE | re.DOTALL | re.IGNORECASE)
+
+# Word -> (SQL weight, natural language weight)
+WORD_WEIGHTS = {
+    "SELECT": (1.0, 0.0), "FROM": (0.5, 0.0), "WHERE": (1.0, 0.0), "JOIN": (1.5, 0.0), "HAVING": (1.5, 0.0),
+    "LIMIT": (1.0, 0.0), "UNION": (1.0, 0.0), "DISTINCT": (1.0, 0.0), "AS": (0.5, 0.0), "NULL": (1.0, 0.0),
+    "INNER": (0.5, 0.0), "OUTER": (1.0, 0.0), "VALUES": (1.0, 0.0), "SET": (0.5, 0.0), "INTO": (1.0, 0.0),
+    "CASE": (1.0, 0.0), "THEN": (0.5, 0.0), "ASC": (1.0, 0.0), "DESC": (1.0, 0.0), "OFFSET": (1.0, 0.0),
+    "ROWNUM": (1.5, 0.0), "NVL": (1.5, 0.0), "SYSDATE": (1.5, 0.0), "ILIKE": (1.5, 0.0), "DUAL": (1.5, 0.0),
+    "WHAT": (0.0, 2.0), "WHICH": (0.0, 1.5), "WHO": (0.0, 1.5), "HOW": (0.0, 2.0), "WHY": (0.0, 2.0),
+    "WHEN": (0.25, 0.5), "SHOW": (0.0, 1.5), "LIST": (0.0, 1.0), "GIVE": (0.0, 1.5), "TELL": (0.0, 1.5),
+    "FIND": (0.0, 1.0), "GET": (0.0, 0.75), "DISPLAY": (0.0, 1.0), "COMPARE": (0.0, 1.5), "PLEASE": (0.0, 2.0),
+    "ME": (0.0, 1.5), "MY": (0.0, 1.5), "OUR": (0.0, 1.5), "US": (0.0, 1.0), "I": (0.0, 1.0), "WE": (0.0, 1.0),
+    "YOU": (0.0, 1.0), "CAN": (0.0, 1.0), "COULD": (0.0, 1.0), "WOULD": (0.0, 1.0), "THE": (0.0, 0.75),
+    "OF": (0.0, 0.5), "ARE": (0.0, 1.0), "WAS": (0.0, 1.0), "WERE": (0.0, 1.0), "DID": (0.0, 1.5),
+    "DO": (0.0, 1.0), "DOES": (0.0, 1.5), "MANY": (0.0, 1.0), "MUCH": (0.0, 1.0), "LAST": (0.0, 0.5),
+    "EACH": (0.0, 0.5), "PER": (0.0, 0.5), "TOP": (0.0, 0.5), "THIS": (0.0, 0.5), "ALL": (0.0, 0.25),
+    "HIGHEST": (0.0, 1.0), "LOWEST": (0.0, 1.0), "MOST": (0.0, 1.0), "BEST": (0.0, 1.0), "WORST": (0.0, 1.0),
+}
+
+# First words that start SQL statements -> weight; SELECT and WITH need structure to back them up
+STATEMENT_STARTERS = {
+    "SELECT": 3.0, "WITH": 1.0, "EXPLAIN": 6.0, "DESCRIBE": 6.0, "DESC": 6.0, "INSERT": 3.0, "UPDATE": 2.0,
+    "DELETE": 3.0, "CREATE": 2.0, "ALTER": 3.0, "DROP": 3.0, "TRUNCATE": 3.0, "MERGE": 2.0, "GRANT": 2.0,
+}
+# First words that start questions and requests
+QUESTION_STARTERS = {
+    "WHAT", "WHICH", "WHO", "HOW", "WHY", "WHEN", "WHERE", "SHOW", "LIST", "GIVE", "TELL", "FIND", "GET",
+    "DISPLAY", "COMPARE", "CAN", "COULD", "PLEASE", "IS", "ARE", "DO", "DOES", "DID", "I", "WE", "TOP",
+}
+
+FEATURE_WEIGHTS = {
+    # feature: (SQL weight, natural language weight), per occurrence
+    "comment": (2.0, 0.0),
+    "string": (0.5, 0.0),
+    "clause": (1.5, 0.0),
+    "qualified": (1.5, 0.0),
+    "call": (1.5, 0.0),
+    "op": (1.0, 0.0),
+    "star": (1.0, 0.0),
+    "semicolon": (2.0, 0.0),
+    "question": (0.0, 3.0),
+    "snake_case": (0.5, 0.0),
+    "plain_word": (0.0, 0.25),
+}
+
+
+class NLClassifier:
+    """
+    Tells natural language questions from SQL queries with a small scored feature model.
+
+    The text is scanned once with a compiled regex; SQL structure (clauses, operators,
+    function calls, qualified names, literals, statement starters) and natural language
+    cues (question words, pronouns, question marks, plain words) add to two scores, and
+    the text is natural language when its score is higher. Independent of the LLM provider.
+    """
+
+    def score(self, text: str) -> Tuple[float, float, Dict[str, float]]:
+        """
+        Returns (sql_score, nl_score, feature counts) for the text.
+        """
+        sql_score = 0.0
+        nl_score = 0.0
+        features: Dict[str, float] = {}
+        first_word = None
+        structure = False  # FROM, an operator, a call or a star seen
+
+        for match in _SCAN.finditer(text):
+            kind = match.lastgroup
+            if kind == "word":
+                word = match.group().upper()
+                if first_word is None:
+                    first_word = word
+                if word == "FROM":
+                    structure = True
+                weights = WORD_WEIGHTS.get(word)
+                if weights is None:
+                    kind = "snake_case" if "_" in word else "plain_word"
+                    weights = FEATURE_WEIGHTS[kind]
+            elif kind == "number":
+                continue
+            else:
+                if kind == "comment" and first_word is None:
+                    first_word = "--"
+                elif kind in ("op", "call", "star", "qualified"):
+                    structure = True
+                if first_word is None and kind in ("call", "qualified"):
+                    first_word = match.group().rstrip("(").split(".")[0].upper()
+                weights = FEATURE_WEIGHTS[kind]
+            sql_score += weights[0]
+            nl_score += weights[1]
+            features[kind] = features.get(kind, 0) + 1
+
+        if first_word == "--":
+            sql_score += 6.0  # Starts with a comment; only SQL does that
+        elif first_word in STATEMENT_STARTERS:
+            starter_weight = STATEMENT_STARTERS[first_word]
+            if first_word in ("SELECT", "WITH") and not structure:
+                starter_weight = 0.5  # "select the top 10 customers by revenue"
+            sql_score += starter_weight
+        if first_word in QUESTION_STARTERS:
+            nl_score += 2.0
+        return sql_score, nl_score, features
+
+    def is_natural_language(self, text: str) -> bool:
+        """
+        Determines if the given text is likely natural language or an SQL query.
+
+        Args:
+            text: The input text to analyze.
+
+        Returns:
+            True if the text is considered natural language, False otherwise.
+        """
+        sql_score, nl_score, _ = self.score(text)
+        return nl_score >= sql_score
+
+
+# Global classifier shared by all message processors
+nl_classifier = NLClassifier()
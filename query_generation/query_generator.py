@@ -1,9 +1,14 @@
+import asyncio
 import logging
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from core.config import config # New config import
+from .generation_cache import generation_cache
+from .nl_classifier import nl_classifier
+from .template_engine import template_engine
 from .llm.base import LLMProviderInterface # Import the interface
 from .llm.mistral_provider import MistralLLMProvider # Import concrete Mistral provider
+from .llm.hedged_provider import HedgedLLMProvider
 
 # Remove old Mistral-specific imports if they are now handled by MistralLLMProvider
 # import json
@@ -13,6 +18,11 @@ from .llm.mistral_provider import MistralLLMProvider # Import concrete Mistral p
 
 # Helper to create providers (can be expanded for more providers)
 def get_llm_provider(provider_name: str) -> LLMProviderInterface:
+    if config.llm_providers and len(config.llm_providers) > 1:
+        # Several providers/models: hedge and fail over between them in the configured order
+        return HedgedLLMProvider([_create_provider(spec) for spec in config.llm_providers])
+    if config.llm_providers:
+        return _create_provider(config.llm_providers[0])
     if provider_name.lower() == "mistral":
         # Configuration for Mistral (like API key, model) is handled within MistralLLMProvider using core.config
         return MistralLLMProvider()
@@ -22,6 +32,16 @@ def get_llm_provider(provider_name: str) -> LLMProviderInterface:
     else:
         raise ValueError(f"Unsupported LLM provider: {provider_name}")
 
+def _create_provider(spec: str) -> LLMProviderInterface:
+    """
+    Creates a provider from an LLM_PROVIDERS entry of the form "provider[:model][@server_url]".
+    """
+    spec, _, server_url = spec.partition("@")
+    provider_name, _, model_name = spec.partition(":")
+    if provider_name.lower() == "mistral":
+        return MistralLLMProvider(model_name=model_name or None, server_url=server_url or None)
+    raise ValueError(f"Unsupported LLM provider: {provider_name}")
+
 class QueryGenerator:
     """
     Handles natural language processing and conversion to SQL queries
@@ -44,29 +64,88 @@ class QueryGenerator:
             # Depending on desired behavior, either raise e or fallback to a default/dummy provider
             raise  # Re-raise the error to halt initialization if provider is crucial
 
-    def generate_sql_from_natural_language(self, question: str) -> Tuple[str, Dict]:
+        self.generation_cache = generation_cache
+        self.template_engine = template_engine
+
+    def _template_generation(self, question: str) -> Optional[Tuple[str, Dict]]:
+        # Formulaic questions are answered from templates without calling the LLM
+        matched = self.template_engine.match(question, self.schema_name)
+        if matched is None:
+            return None
+        sql_query, metadata = matched
+        self.logger.info(f"SQL query generated from template '{metadata['template']}': {sql_query}")
+        metadata["cache"] = "template"
+        return sql_query, metadata
+
+    def _cache_identity(self) -> Optional[Tuple[str, str, str]]:
+        # (provider, model, schema_hash) for the generation cache; None if the provider can't be cached
+        try:
+            return self.llm_handler.get_cache_identity(self.schema_name)
+        except NotImplementedError:
+            return None
+
+    def _cached_generation(self, question: str, identity: Optional[Tuple[str, str, str]],
+                           use_cache: bool) -> Optional[Tuple[str, Dict]]:
+        # Exact question first, then a near-duplicate of an earlier question
+        if identity is None or not use_cache:
+            return None
+        cached = self.generation_cache.get(question, identity[0], identity[1], self.schema_name, identity[2])
+        if cached is not None:
+            sql_query, metadata = cached
+            self.logger.info(f"Reusing cached SQL for question: {sql_query}")
+            metadata["cache"] = "hit"
+            return sql_query, metadata
+        similar = self.generation_cache.get_similar(question, identity[0], identity[1], self.schema_name,
+                                                    identity[2])
+        if similar is not None:
+            sql_query, metadata = similar
+            self.logger.info(f"Reusing SQL of similar question '{metadata['similar_question']}' "
+                             f"(similarity {metadata['similarity']}): {sql_query}")
+            metadata["cache"] = "similar"
+            return sql_query, metadata
+        return None
+
+    def _store_generation(self, question: str, identity: Optional[Tuple[str, str, str]], sql_query: str,
+                          metadata: Dict) -> Dict:
+        self.logger.info(f"SQL query generated by LLM provider: {sql_query}")
+        if identity is not None:
+            self.generation_cache.put(question, identity[0], identity[1], self.schema_name, identity[2],
+                                      sql_query, metadata)
+        return dict(metadata, cache="miss")
+
+    def _check_handler(self):
+        if not self.llm_handler:
+            error_message = "LLM handler not initialized. Cannot generate SQL."
+            self.logger.error(error_message)
+            raise RuntimeError(error_message)
+
+    def generate_sql_from_natural_language(self, question: str, use_cache: bool = True) -> Tuple[str, Dict]:
         """
         Takes a natural language question and generates a SQL query
         using the configured LLM provider and schema.
         
         Args:
             question: A natural language question about the database.
+            use_cache: Whether a previously generated query for the same question may be reused.
             
         Returns:
             A tuple containing the generated SQL query and additional metadata from the LLM provider.
         """
         self.logger.info(f"Delegating SQL generation for question: '{question}' to {config.llm_provider_name} for schema '{self.schema_name}'")
-        
-        if not self.llm_handler:
-            error_message = "LLM handler not initialized. Cannot generate SQL."
-            self.logger.error(error_message)
-            raise RuntimeError(error_message)
-            
+        self._check_handler()
+
+        templated = self._template_generation(question)
+        if templated is not None:
+            return templated
+        identity = self._cache_identity()
+        cached = self._cached_generation(question, identity, use_cache)
+        if cached is not None:
+            return cached
+
         try:
             # The llm_handler is responsible for using the correct schema context
             sql_query, metadata = self.llm_handler.generate_sql(question, self.schema_name)
-            self.logger.info(f"SQL query generated by LLM provider: {sql_query}")
-            return sql_query, metadata
+            return sql_query, self._store_generation(question, identity, sql_query, metadata)
         except Exception as e:
             # Catching Exception to be generic, specific providers might raise specific errors
             self.logger.error(f"LLM provider failed to generate SQL: {str(e)}", exc_info=True)
@@ -75,10 +154,103 @@ class QueryGenerator:
             # For now, re-raising to ensure errors are visible.
             raise RuntimeError(f"Failed to generate SQL query via {config.llm_provider_name}: {str(e)}")
 
+    async def generate_sql_async(self, question: str, use_cache: bool = True) -> Tuple[str, Dict]:
+        """
+        Async variant of generate_sql_from_natural_language, used from the Slack message path
+        so a slow completion never blocks the event loop.
+        """
+        self.logger.info(f"Delegating SQL generation for question: '{question}' to {config.llm_provider_name} for schema '{self.schema_name}'")
+        self._check_handler()
+
+        templated = self._template_generation(question)
+        if templated is not None:
+            return templated
+        identity = self._cache_identity()
+        cached = self._cached_generation(question, identity, use_cache)
+        if cached is not None:
+            return cached
+
+        try:
+            sql_query, metadata = await self.llm_handler.generate_sql_async(question, self.schema_name)
+            return sql_query, self._store_generation(question, identity, sql_query, metadata)
+        except Exception as e:
+            self.logger.error(f"LLM provider failed to generate SQL: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to generate SQL query via {config.llm_provider_name}: {str(e)}")
+
+    async def stream_sql_async(self, question: str, use_cache: bool = True, need_explanation: bool = True):
+        """
+        Like generate_sql_async, but returns as soon as the SQL is known. See
+        LLMProviderInterface.stream_sql_async for the returned (sql_query, metadata, rest) tuple.
+        """
+        self.logger.info(f"Delegating streaming SQL generation for question: '{question}' to {config.llm_provider_name} for schema '{self.schema_name}'")
+        self._check_handler()
+
+        templated = self._template_generation(question)
+        if templated is not None:
+            return templated[0], templated[1], None
+        identity = self._cache_identity()
+        cached = self._cached_generation(question, identity, use_cache)
+        if cached is not None:
+            return cached[0], cached[1], None
+
+        try:
+            sql_query, metadata, rest = await self.llm_handler.stream_sql_async(
+                question, self.schema_name, need_explanation=need_explanation)
+            metadata = self._store_generation(question, identity, sql_query, metadata)
+            if rest is not None and identity is not None:
+                # The entry is stored before the explanation arrives; add it once the stream finishes
+                rest = asyncio.ensure_future(rest)
+                rest.add_done_callback(
+                    lambda task: self._complete_generation(question, identity, sql_query, task))
+            return sql_query, metadata, rest
+        except Exception as e:
+            self.logger.error(f"LLM provider failed to generate SQL: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to generate SQL query via {config.llm_provider_name}: {str(e)}")
+
+    def _complete_generation(self, question: str, identity: Tuple[str, str, str], sql_query: str,
+                             rest: asyncio.Future):
+        if rest.cancelled() or rest.exception() is not None:
+            return
+        self.generation_cache.update_metadata(question, identity[0], identity[1], self.schema_name, identity[2],
+                                              sql_query, rest.result())
+
+    def discard_generation(self, question: str, metadata: Dict):
+        """
+        Drops the cached generation a query came from, e.g. after it failed validation,
+        so the same question isn't answered with the same bad SQL again.
+        """
+        identity = self._cache_identity()
+        if identity is None or metadata.get("cache") == "template":
+            return
+        # A similar-question hit came from the entry of the other question
+        cached_question = metadata.get("similar_question", question)
+        self.generation_cache.invalidate(cached_question, identity[0], identity[1], self.schema_name, identity[2])
+
+    async def repair_sql_async(self, question: str, sql_query: str, issues: List[str]) -> Tuple[str, Dict]:
+        """
+        Asks the LLM once more, telling it what was wrong with the query it generated.
+        The repaired query replaces the cached one for the question.
+        """
+        self.logger.info(f"Asking {config.llm_provider_name} to repair SQL with issues: {issues}")
+        self._check_handler()
+        feedback = (f"{question}\n\n"
+                    f"A previous answer to this question was the SQL query below, but it references tables "
+                    f"or columns that don't exist in the schema:\n{sql_query}\n"
+                    f"Problems: {'; '.join(issues)}\n"
+                    f"Answer again using only tables and columns from the schema.")
+        identity = self._cache_identity()
+        try:
+            repaired_sql, metadata = await self.llm_handler.generate_sql_async(feedback, self.schema_name)
+        except Exception as e:
+            self.logger.error(f"LLM provider failed to repair SQL: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to repair SQL query via {config.llm_provider_name}: {str(e)}")
+        metadata = self._store_generation(question, identity, repaired_sql, metadata)
+        return repaired_sql, dict(metadata, repaired=True, repair_issues=issues)
+
     def is_natural_language(self, text: str) -> bool:
         """
         Determines if the input is likely natural language rather than SQL,
-        delegating to the configured LLM provider.
+        using the provider-independent NLClassifier.
         
         Args:
             text: The input text.
@@ -86,12 +258,7 @@ class QueryGenerator:
         Returns:
             True if the text is considered natural language, False otherwise.
         """
-        if not self.llm_handler:
-            self.logger.warning("LLM handler not initialized. Defaulting is_natural_language to False (expecting SQL).")
-            # Fallback behavior if handler isn't there - might need adjustment based on desired resilience
-            return False 
-            
-        return self.llm_handler.is_natural_language(text)
+        return nl_classifier.is_natural_language(text)
 
 # Removed:
 # _get_sample_schema() - This logic is now within MistralLLMProvider for the default case
@@ -0,0 +1,165 @@
+import hashlib
+import random
+import re
+from collections import defaultdict
+from typing import Dict, FrozenSet, Hashable, Optional, Set, Tuple
+
+# Filler words that don't change what a question asks for
+STOPWORDS = frozenset("""
+a an the of for in on at with is are was were be been me us my our
+show list give get find display what which who whose how please can could would you i we
+all any each that this these those there their its it do does did
+""".split())
+
+# Words that relate the words around them ("products per store", "from 2020 to 2023"):
+# their neighbours become order-sensitive features
+RELATION_WORDS = frozenset("by per from to".split())
+
+NUMBER_WORDS = {
+    "zero": "0", "one": "1", "two": "2", "three": "3", "four": "4", "five": "5", "six": "6",
+    "seven": "7", "eight": "8", "nine": "9", "ten": "10", "eleven": "11", "twelve": "12",
+    "fifteen": "15", "twenty": "20", "thirty": "30", "fifty": "50", "hundred": "100", "thousand": "1000",
+}
+
+# Wording that never changes the SQL a question needs. Questions may differ in these words
+# only; any other differing word (a filter value, "including"/"excluding", "highest"/"lowest")
+# means a different question.
+PHRASING_WORDS = frozenset("""
+tell know want need see like just also now then some kindly thank thanks hi hello
+data result information info breakdown overview report summary view table query
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+(?:\.[0-9]+)?")
+
+# Mersenne prime used for the universal hash family
+_PRIME = (1 << 61) - 1
+
+
+def question_tokens(question: str) -> FrozenSet[str]:
+    """
+    Reduces a question to a set of content tokens: lowercased, stopwords removed,
+    number words turned into digits and simple plurals folded ("products" -> "product").
+    Word order is ignored except around RELATION_WORDS, which add their neighbours as
+    features ("product<per", "per>store"). So "top 10 products by revenue 2023" and
+    "2023 top ten products by revenue" give the same set, but "products per store" and
+    "stores per product" don't.
+    """
+    words = []
+    for token in TOKEN_PATTERN.findall(question.lower()):
+        token = NUMBER_WORDS.get(token, token)
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        words.append(token)
+
+    tokens = set()
+    for index, word in enumerate(words):
+        if word in RELATION_WORDS:
+            following = words[index + 1] if index + 1 < len(words) else None
+            if following is None or following in RELATION_WORDS or _is_phrasing(following):
+                # "want to see": no relation between things the question asks for
+                continue
+            tokens.add(f"{word}>{following}")
+            preceding = words[index - 1] if index > 0 else None
+            if preceding is not None and preceding not in RELATION_WORDS and not _is_phrasing(preceding):
+                tokens.add(f"{preceding}<{word}")
+        tokens.add(word)
+    return frozenset(tokens)
+
+
+def _is_phrasing(token: str) -> bool:
+    # Folded like the question tokens ("results" -> "result")
+    return token in PHRASING_WORDS or token + "s" in PHRASING_WORDS
+
+
+def _same_meaning(tokens: FrozenSet[str], other: FrozenSet[str]) -> bool:
+    return all(_is_phrasing(token) for token in tokens ^ other)
+
+
+class QuestionIndex:
+    """
+    MinHash/LSH index of past questions for finding near-duplicates.
+
+    Each question is reduced to a token set and signed with `num_perm` MinHash values,
+    split into `bands` bands. Questions sharing a band within the same scope become
+    candidates, which are then ranked by exact Jaccard similarity of their token sets.
+    Candidates only match if every word outside the shared set is a PHRASING_WORDS word, so
+    questions that differ in a number ("top 10" vs "top 20"), a filter value ("germany" vs
+    "austria"), a qualifier ("including" vs "excluding", "and" vs "or") or the order around
+    a relation word ("from 2020 to 2023" vs "to 2020 from 2023") never match.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        self._buckets: Dict[Tuple, Set[Hashable]] = defaultdict(set)
+        self._entries: Dict[Hashable, Tuple[Hashable, FrozenSet[str], list]] = {}
+
+    @staticmethod
+    def _token_hash(token: str) -> int:
+        return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def _signature(self, tokens: FrozenSet[str]) -> list:
+        hashes = [self._token_hash(token) for token in tokens] or [0]
+        return [min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms]
+
+    def _band_keys(self, scope: Hashable, signature: list):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield scope, band, tuple(signature[start:start + self.rows])
+
+    def add(self, entry_id: Hashable, scope: Hashable, question: str):
+        """
+        Indexes a question under an id. Only questions with the same scope are compared.
+        """
+        self.remove(entry_id)
+        tokens = question_tokens(question)
+        if not tokens:
+            return
+        signature = self._signature(tokens)
+        band_keys = list(self._band_keys(scope, signature))
+        for band_key in band_keys:
+            self._buckets[band_key].add(entry_id)
+        self._entries[entry_id] = (scope, tokens, band_keys)
+
+    def remove(self, entry_id: Hashable):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for band_key in entry[2]:
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def find_similar(self, scope: Hashable, question: str, threshold: float) -> Optional[Tuple[Hashable, float]]:
+        """
+        Returns (entry_id, similarity) of the most similar indexed question in the scope,
+        or None if none reaches the threshold.
+        """
+        tokens = question_tokens(question)
+        if not tokens:
+            return None
+        candidates = set()
+        for band_key in self._band_keys(scope, self._signature(tokens)):
+            candidates.update(self._buckets.get(band_key, ()))
+
+        best = None
+        for entry_id in candidates:
+            candidate_tokens = self._entries[entry_id][1]
+            if not _same_meaning(tokens, candidate_tokens):
+                continue
+            similarity = len(tokens & candidate_tokens) / len(tokens | candidate_tokens)
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (entry_id, similarity)
+        return best
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from core.config import config
+
+
+class SchemaCatalog:
+    """
+    Tables, columns, types and foreign keys of one database schema, as introspected
+    from the database. The content hash changes whenever any of that changes.
+    """
+
+    def __init__(self, db_key: str, schema_name: str, tables: Dict[str, Dict],
+                 table_versions: Optional[Dict[str, str]] = None, refreshed_at: float = None):
+        self.db_key = db_key
+        self.schema_name = schema_name
+        self.tables = tables
+        self.table_versions = table_versions or {}
+        self.refreshed_at = refreshed_at or time.time()
+        self.content_hash = self._compute_hash(tables)
+
+    @staticmethod
+    def _compute_hash(tables: Dict[str, Dict]) -> str:
+        canonical = json.dumps(tables, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def table_text(self, table_name: str, columns: Optional[List[str]] = None) -> str:
+        """
+        Renders one table for the LLM prompt, optionally limited to some of its columns.
+        """
+        table = self.tables[table_name]
+        foreign_keys = {fk["column"]: fk for fk in table["foreign_keys"]}
+        parts = []
+        for column in table["columns"]:
+            if columns is not None and column["name"] not in columns:
+                continue
+            attributes = [column["type"]]
+            if column["primary_key"]:
+                attributes.append("PRIMARY KEY")
+            foreign_key = foreign_keys.get(column["name"])
+            if foreign_key is not None:
+                attributes.append(f"FOREIGN KEY to {foreign_key['ref_table']}.{foreign_key['ref_column']}")
+            parts.append(f"{column['name']} ({', '.join(attributes)})")
+        return f"Table: {self.schema_name}.{table_name}\nColumns: {', '.join(parts)}"
+
+    def to_prompt_text(self, tables: Optional[Dict[str, Optional[List[str]]]] = None) -> str:
+        """
+        Renders the schema for the LLM prompt.
+
+        Args:
+            tables: Optional mapping of table name -> columns to include (None for all columns).
+                All tables are included when omitted.
+        """
+        if tables is None:
+            tables = {name: None for name in sorted(self.tables)}
+        return "\n\n".join(self.table_text(name, columns) for name, columns in tables.items() if name in self.tables)
+
+    def to_dict(self) -> Dict:
+        return {
+            "db_key": self.db_key,
+            "schema_name": self.schema_name,
+            "content_hash": self.content_hash,
+            "refreshed_at": self.refreshed_at,
+            "table_versions": self.table_versions,
+            "tables": self.tables,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SchemaCatalog":
+        return cls(data["db_key"], data["schema_name"], data["tables"],
+                   data.get("table_versions"), data.get("refreshed_at"))
+
+
+class SchemaManager:
+    """
+    Maintains the schema catalogs given to the LLM.
+
+    Catalogs are introspected from each configured database in a background scheduler
+    job, written to a JSON file per schema and loaded from those files at startup, so
+    looking up a catalog never touches a database. Where the database reports per-table
+    change markers (Oracle's LAST_DDL_TIME), a refresh re-reads only changed tables.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = config.schema_cache_dir
+        self.refresh_seconds = config.schema_refresh_seconds
+        self.sources: List[Tuple[str, str]] = config.schema_sources
+        self._lock = threading.Lock()
+        self._catalogs: Dict[Tuple[str, str], SchemaCatalog] = {}
+        self._stats = {"refreshes": 0, "refresh_errors": 0, "changes": 0, "last_refresh_seconds": None}
+        self.scheduler: Optional[BackgroundScheduler] = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_cached()
+
+    def _cache_path(self, db_key: str, schema_name: str) -> str:
+        return os.path.join(self.cache_dir, f"{db_key.upper()}.{schema_name.lower()}.json")
+
+    def _load_cached(self):
+        for db_key, schema_name in self.sources:
+            path = self._cache_path(db_key, schema_name)
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as cache_file:
+                    catalog = SchemaCatalog.from_dict(json.load(cache_file))
+                self._catalogs[(db_key.upper(), schema_name.lower())] = catalog
+                self.logger.info(f"Loaded cached schema {db_key}.{schema_name} "
+                                 f"({len(catalog.tables)} tables, hash {catalog.content_hash[:12]})")
+            except (OSError, ValueError, KeyError) as e:
+                self.logger.warning(f"Ignoring unreadable schema cache {path}: {e}")
+
+    def get_catalog(self, schema_name: str, db_key: str = None) -> Optional[SchemaCatalog]:
+        """
+        Returns the latest catalog for a schema (from any configured database unless
+        db_key is given), or None if it hasn't been introspected yet.
+        """
+        with self._lock:
+            for (catalog_db_key, catalog_schema), catalog in self._catalogs.items():
+                if catalog_schema == schema_name.lower() and (db_key is None or catalog_db_key == db_key.upper()):
+                    return catalog
+        return None
+
+    def start(self):
+        """
+        Starts the background refresh job; the first refresh runs immediately.
+        """
+        if self.scheduler is not None or not self.sources:
+            return
+        self.scheduler = BackgroundScheduler()
+        self.scheduler.add_job(self.refresh_all, 'interval', seconds=self.refresh_seconds,
+                               next_run_time=datetime.now(), max_instances=1, coalesce=True)
+        self.scheduler.start()
+        self.logger.info(f"Schema refresh scheduled every {self.refresh_seconds}s for {self.sources}")
+
+    def stop(self):
+        if self.scheduler is not None:
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+
+    def refresh_all(self):
+        started = time.monotonic()
+        for db_key, schema_name in self.sources:
+            try:
+                self.refresh(db_key, schema_name)
+            except Exception as e:
+                self._stats["refresh_errors"] += 1
+                self.logger.error(f"Schema refresh failed for {db_key}.{schema_name}: {e}", exc_info=True)
+        self._stats["last_refresh_seconds"] = round(time.monotonic() - started, 3)
+
+    def refresh(self, db_key: str, schema_name: str) -> SchemaCatalog:
+        """
+        Introspects one schema and replaces its catalog if anything changed.
+        """
+        # Imported here so the database drivers are only loaded by the refresh job
+        from database import get_database
+
+        db = get_database(db_key.upper())
+        key = (db_key.upper(), schema_name.lower())
+        with self._lock:
+            previous = self._catalogs.get(key)
+
+        versions = db.table_versions(schema_name)
+        if previous is not None and versions is not None and previous.table_versions:
+            changed = [table for table, version in versions.items() if previous.table_versions.get(table) != version]
+            dropped = set(previous.tables) - set(versions)
+            tables = {table: entry for table, entry in previous.tables.items() if table not in dropped}
+            if changed:
+                tables.update(db.introspect_schema(schema_name, changed))
+            self.logger.info(f"Incremental schema refresh of {db_key}.{schema_name}: "
+                             f"{len(changed)} changed, {len(dropped)} dropped")
+        else:
+            tables = db.introspect_schema(schema_name)
+
+        catalog = SchemaCatalog(db_key.upper(), schema_name, tables, versions)
+        self._stats["refreshes"] += 1
+        if previous is not None and previous.content_hash == catalog.content_hash:
+            # Keep the version markers current without rewriting an identical catalog
+            previous.table_versions = catalog.table_versions
+            previous.refreshed_at = catalog.refreshed_at
+            catalog = previous
+        else:
+            self._stats["changes"] += 1
+            self.logger.info(f"Schema {db_key}.{schema_name} updated: {len(tables)} tables, "
+                             f"hash {catalog.content_hash[:12]}")
+        self._write_cache(catalog)
+        with self._lock:
+            self._catalogs[key] = catalog
+        return catalog
+
+    def _write_cache(self, catalog: SchemaCatalog):
+        path = self._cache_path(catalog.db_key, catalog.schema_name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as cache_file:
+            json.dump(catalog.to_dict(), cache_file)
+        os.replace(tmp_path, path)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            catalogs = {
+                f"{db_key}.{schema_name}": {
+                    "tables": len(catalog.tables),
+                    "content_hash": catalog.content_hash[:12],
+                    "refreshed_at": catalog.refreshed_at,
+                }
+                for (db_key, schema_name), catalog in self._catalogs.items()
+            }
+        return dict(self._stats, catalogs=catalogs)
+
+
+# Global schema manager; its catalogs are shared by all LLM providers
+schema_manager = SchemaManager()
@@ -0,0 +1,250 @@
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from core.config import config
+from .question_index import question_tokens
+from .schema_manager import SchemaCatalog
+
+# Business terms users say -> identifier fragments they usually map to
+DEFAULT_SYNONYMS = {
+    "revenue": ["price", "amount", "total", "sale"],
+    "sale": ["fact", "sale", "order"],
+    "sold": ["sale", "quantity"],
+    "earning": ["price", "amount", "total"],
+    "income": ["price", "amount", "total"],
+    "cost": ["cost", "price"],
+    "client": ["customer"],
+    "customer": ["client", "buyer"],
+    "buyer": ["customer"],
+    "staff": ["employee"],
+    "employee": ["staff", "worker"],
+    "worker": ["employee"],
+    "shop": ["store"],
+    "store": ["shop", "branch"],
+    "branch": ["store"],
+    "item": ["product", "article"],
+    "product": ["item", "article"],
+    "article": ["product", "item"],
+    "day": ["date"],
+    "month": ["date", "month"],
+    "year": ["date", "year"],
+    "quarter": ["date", "quarter"],
+    "week": ["date", "week"],
+    "when": ["date", "time"],
+    "currency": ["currency", "rate"],
+    "city": ["city", "address"],
+    "country": ["country", "address"],
+}
+
+# Table name prefixes that carry no meaning for matching (DimCustomer, FACT_SALES, ...)
+IGNORED_FRAGMENTS = {"dim", "fact", "tbl", "t", "v", "vw"}
+
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_SPLIT = re.compile(r"[^A-Za-z0-9]+")
+
+
+def identifier_fragments(identifier: str) -> Set[str]:
+    """
+    Splits an identifier like "DimCustomer" or "unit_price_usd" into lowercase words,
+    with simple plurals folded as in question_tokens().
+    """
+    fragments = set()
+    for part in _SPLIT.split(_CAMEL_BOUNDARY.sub("_", identifier)):
+        part = part.lower()
+        if not part or part in IGNORED_FRAGMENTS:
+            continue
+        if len(part) > 3 and part.endswith("s") and not part.endswith("ss"):
+            part = part[:-1]
+        fragments.add(part)
+    return fragments
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly 4 characters per token
+    return len(text) // 4
+
+
+class SchemaPruner:
+    """
+    Picks the tables and columns of a schema that are relevant to a question, so the
+    LLM prompt only carries that part of the schema.
+
+    Question words (expanded with synonyms) are matched against table and column name
+    fragments. The best matching tables are joined up along the foreign-key graph so
+    the join path is included, and the result is cut down to fit the token budget.
+    Schemas smaller than SCHEMA_PRUNING_MIN_TOKENS are always sent whole.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = config.schema_pruning_enabled
+        self.token_budget = config.schema_prompt_token_budget
+        self.min_tokens = config.schema_pruning_min_tokens
+        self.max_seed_tables = config.schema_pruning_max_tables
+        self.synonyms = self._load_synonyms(config.schema_synonyms_file)
+        self._lock = threading.Lock()
+        # Per-catalog match index, keyed by content hash
+        self._indexes: "OrderedDict[str, Dict]" = OrderedDict()
+        self._stats = {"requests": 0, "pruned": 0, "full_schema": 0, "tokens_before": 0, "tokens_after": 0}
+
+    def _load_synonyms(self, path: Optional[str]) -> Dict[str, List[str]]:
+        synonyms = {term: list(fragments) for term, fragments in DEFAULT_SYNONYMS.items()}
+        if path:
+            try:
+                with open(path, "r", encoding="utf-8") as synonyms_file:
+                    for term, fragments in json.load(synonyms_file).items():
+                        synonyms.setdefault(term.lower(), []).extend(fragment.lower() for fragment in fragments)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Could not load schema synonyms from {path}: {e}")
+        return synonyms
+
+    def _catalog_index(self, catalog: SchemaCatalog) -> Dict:
+        with self._lock:
+            index = self._indexes.get(catalog.content_hash)
+            if index is not None:
+                self._indexes.move_to_end(catalog.content_hash)
+                return index
+
+        graph: Dict[str, Set[str]] = {name: set() for name in catalog.tables}
+        table_fragments = {}
+        column_fragments = {}
+        for name, table in catalog.tables.items():
+            table_fragments[name] = identifier_fragments(name)
+            column_fragments[name] = {column["name"]: identifier_fragments(column["name"])
+                                      for column in table["columns"]}
+            for foreign_key in table["foreign_keys"]:
+                if foreign_key["ref_table"] in graph:
+                    graph[name].add(foreign_key["ref_table"])
+                    graph[foreign_key["ref_table"]].add(name)
+        index = {
+            "graph": graph,
+            "table_fragments": table_fragments,
+            "column_fragments": column_fragments,
+            "full_tokens": estimate_tokens(catalog.to_prompt_text()),
+        }
+        with self._lock:
+            self._indexes[catalog.content_hash] = index
+            while len(self._indexes) > 8:
+                self._indexes.popitem(last=False)
+        return index
+
+    def _question_terms(self, question: str) -> Set[str]:
+        terms = set()
+        for token in question_tokens(question):
+            if token[0].isdigit():
+                continue  # Numbers are filter values, not table or column names
+            terms.add(token)
+            terms.update(self.synonyms.get(token, ()))
+        return terms
+
+    def _score_tables(self, terms: Set[str], index: Dict) -> Tuple[Dict[str, float], Dict[str, Set[str]]]:
+        scores = {}
+        matched_columns = {}
+        for name, fragments in index["table_fragments"].items():
+            score = 3.0 * len(fragments & terms)
+            columns = {column for column, column_fragments in index["column_fragments"][name].items()
+                       if column_fragments & terms}
+            score += len(columns)
+            if score:
+                scores[name] = score
+                matched_columns[name] = columns
+        return scores, matched_columns
+
+    @staticmethod
+    def _shortest_path(graph: Dict[str, Set[str]], sources: Set[str], target: str) -> List[str]:
+        # BFS from the already selected tables to the target table
+        previous = {source: None for source in sources}
+        queue = deque(sources)
+        while queue:
+            node = queue.popleft()
+            if node == target:
+                path = []
+                while node is not None and node not in sources:
+                    path.append(node)
+                    node = previous[node]
+                return path
+            for neighbour in graph[node]:
+                if neighbour not in previous:
+                    previous[neighbour] = node
+                    queue.append(neighbour)
+        return [target]  # Not connected; include it on its own
+
+    def _table_columns(self, catalog: SchemaCatalog, name: str, matched: Set[str], compact: bool) -> Optional[List[str]]:
+        if not compact:
+            return None  # All columns
+        table = catalog.tables[name]
+        foreign_key_columns = {foreign_key["column"] for foreign_key in table["foreign_keys"]}
+        return [column["name"] for column in table["columns"]
+                if column["primary_key"] or column["name"] in foreign_key_columns or column["name"] in matched]
+
+    def prune(self, question: str, catalog: SchemaCatalog) -> str:
+        """
+        Returns the prompt text for the part of the catalog relevant to the question.
+        """
+        index = self._catalog_index(catalog)
+        full_tokens = index["full_tokens"]
+        with self._lock:
+            self._stats["requests"] += 1
+        if not self.enabled or full_tokens <= self.min_tokens:
+            return self._full_schema(catalog, full_tokens)
+
+        scores, matched_columns = self._score_tables(self._question_terms(question), index)
+        if not scores:
+            self.logger.info("Schema pruning found no tables matching the question; sending the full schema")
+            return self._full_schema(catalog, full_tokens)
+
+        seeds = sorted(scores, key=lambda name: (-scores[name], name))[:self.max_seed_tables]
+        # Join the seeds up along foreign keys, best match first
+        selected = [seeds[0]]
+        for seed in seeds[1:]:
+            if seed in selected:
+                continue
+            for table in reversed(self._shortest_path(index["graph"], set(selected), seed)):
+                if table not in selected:
+                    selected.append(table)
+
+        # Full column lists while they fit, then key and matched columns only, then drop tables
+        tables: "OrderedDict[str, Optional[List[str]]]" = OrderedDict()
+        used_tokens = 0
+        for name in selected:
+            matched = matched_columns.get(name, set())
+            for compact in (False, True):
+                columns = self._table_columns(catalog, name, matched, compact)
+                table_tokens = estimate_tokens(catalog.table_text(name, columns)) + 1
+                if used_tokens + table_tokens <= self.token_budget:
+                    tables[name] = columns
+                    used_tokens += table_tokens
+                    break
+            else:
+                self.logger.info(f"Schema token budget reached; leaving out table {name}")
+
+        text = catalog.to_prompt_text(tables)
+        pruned_tokens = estimate_tokens(text)
+        with self._lock:
+            self._stats["pruned"] += 1
+            self._stats["tokens_before"] += full_tokens
+            self._stats["tokens_after"] += pruned_tokens
+        self.logger.info(f"Schema pruning kept {len(tables)}/{len(catalog.tables)} tables of "
+                         f"{catalog.schema_name}: ~{full_tokens} -> ~{pruned_tokens} prompt tokens "
+                         f"(saved ~{full_tokens - pruned_tokens})")
+        return text
+
+    def _full_schema(self, catalog: SchemaCatalog, full_tokens: int) -> str:
+        with self._lock:
+            self._stats["full_schema"] += 1
+            self._stats["tokens_before"] += full_tokens
+            self._stats["tokens_after"] += full_tokens
+        return catalog.to_prompt_text()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, tokens_saved=self._stats["tokens_before"] - self._stats["tokens_after"],
+                        token_budget=self.token_budget)
+
+
+# Global schema pruner shared by all LLM providers
+schema_pruner = SchemaPruner()
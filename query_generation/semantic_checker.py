@@ -0,0 +1,179 @@
+import difflib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from core.config import config
+from .schema_manager import schema_manager
+from .schema_pruner import DEFAULT_SYNONYMS, identifier_fragments
+
+# Words that can appear bare in a query without being a column reference:
+# keywords, type names, date parts and functions that are called without parentheses
+SQL_WORDS = {
+    "select", "from", "where", "and", "or", "not", "in", "is", "null", "as", "on", "using", "join", "inner",
+    "left", "right", "full", "outer", "cross", "natural", "lateral", "group", "order", "by", "having", "limit",
+    "offset", "fetch", "first", "next", "rows", "row", "only", "union", "all", "intersect", "except", "minus",
+    "distinct", "case", "when", "then", "else", "end", "between", "like", "ilike", "similar", "escape", "exists",
+    "any", "some", "asc", "desc", "nulls", "last", "with", "recursive", "over", "partition", "window", "range",
+    "unbounded", "preceding", "following", "current", "filter", "within", "true", "false", "unknown", "interval",
+    "cast", "collate", "at", "time", "zone", "top", "percent", "ties", "qualify", "connect", "prior", "start",
+    "level", "rownum", "rowid", "sysdate", "systimestamp", "current_date", "current_time", "current_timestamp",
+    "localtime", "localtimestamp", "current_user", "session_user", "user", "dual", "year", "quarter", "month",
+    "week", "day", "hour", "minute", "second", "epoch", "dow", "doy", "isodow", "isoyear", "millisecond",
+    "microsecond", "date", "timestamp", "timestamptz", "integer", "int", "bigint", "smallint", "numeric",
+    "decimal", "number", "float", "real", "double", "precision", "varchar", "varchar2", "nvarchar2", "char",
+    "character", "varying", "text", "boolean", "bool", "money", "uuid", "json", "jsonb", "clob", "blob",
+    "leading", "trailing", "both", "for", "to", "of", "without", "default", "values", "array", "sets",
+    "ordinality",
+}
+
+# Keywords that end an expression, so a bare word after them is an output alias
+# ("CASE ... END size_bucket", "NULL missing", "CURRENT_DATE today")
+EXPRESSION_END_WORDS = {"end", "null", "true", "false", "current_date", "current_time", "current_timestamp",
+                        "localtime", "localtimestamp", "sysdate", "systimestamp"}
+
+# Unknown words with at least this difflib ratio to a column are offered as suggestions
+SUGGESTION_CUTOFF = 0.6
+
+
+class SemanticChecker:
+    """
+    Resolves every table, alias and column a query references against the cached
+    schema catalog, so a query using a column that doesn't exist (e.g. `revenue`
+    instead of `total_price_usd`) is rejected locally instead of by the warehouse.
+
+    Works on the token analysis of SQLValidator. Qualified columns are checked against
+    their table; unqualified ones against all tables in scope, as long as every source
+    in the query is a catalog table. Issues name the closest existing columns.
+    """
+
+    def __init__(self, schema_name: str = None):
+        self.schema_name = schema_name or config.db_schema_name
+
+    def check(self, analysis: Dict, catalog_hashes: Dict[str, Optional[str]]) -> List[str]:
+        """
+        Returns the unresolved references of an analysed query. The catalog hashes the
+        check relied on are added to catalog_hashes.
+        """
+        issues = []
+        cte_names = analysis["cte_names"]
+        # Alias or table name -> (table name, lowercased column -> column), or None when unknown
+        sources: Dict[str, Optional[Tuple[str, Dict[str, str]]]] = {
+            name: None for name in cte_names | analysis["derived_aliases"]}
+        in_scope: List[Optional[Tuple[str, Dict[str, str]]]] = []
+        if analysis["derived_aliases"] or cte_names:
+            in_scope.append(None)
+
+        for parts, alias in analysis["tables"]:
+            table = parts[-1]
+            schema_name = parts[-2] if len(parts) > 1 else self.schema_name
+            resolved = None
+            if not (len(parts) == 1 and (table.lower() in cte_names or table.lower() in _NO_CATALOG_TABLES)):
+                catalog_tables = self._catalog_tables(schema_name, catalog_hashes)
+                if catalog_tables is not None:
+                    resolved = catalog_tables.get(table.lower())
+                    if resolved is None:
+                        issues.append(f"Unknown table: {schema_name}.{table}"
+                                      + self._suggest(table, [name for name, _ in catalog_tables.values()]))
+            in_scope.append(resolved)
+            sources[(alias or table).lower()] = resolved
+            if alias:
+                sources.setdefault(table.lower(), resolved)
+            sources.setdefault(f"{schema_name}.{table}".lower(), resolved)
+
+        if issues:
+            return issues
+        has_catalog = catalog_hashes.get(self.schema_name) is not None
+
+        for parts in analysis["columns"]:
+            column = parts[-1]
+            qualifier = ".".join(parts[:-1]).lower()
+            if qualifier not in sources:
+                if has_catalog and len(parts) == 2:
+                    issues.append(f"Unknown table or alias: {parts[0]}"
+                                  + self._suggest(parts[0], [name for name in sources if "." not in name]))
+                continue
+            resolved = sources[qualifier]
+            if resolved is not None and column != "*" and column.lower() not in resolved[1]:
+                issues.append(f"Unknown column: {'.'.join(parts)} in {resolved[0]}"
+                              + self._suggest(column, list(resolved[1].values())))
+
+        if in_scope and None not in in_scope:
+            issues.extend(self._check_unqualified(analysis, sources, in_scope))
+        return issues
+
+    def _check_unqualified(self, analysis: Dict, sources: Dict, in_scope: List[Tuple[str, Dict[str, str]]]) -> List[str]:
+        # Names the query defines itself: output column aliases, table aliases
+        defined = set(sources)
+        candidates = []
+        for name, previous in analysis["bare_words"]:
+            lowered = name.lower()
+            if lowered in SQL_WORDS:
+                continue
+            if previous is not None and (previous[1].upper() == "AS"
+                                         or previous[0] in ("number", "string", "quoted", "qualified")
+                                         or previous == ("punct", ")")
+                                         or (previous[0] == "word" and (previous[1].lower() not in SQL_WORDS
+                                                                        or previous[1].lower() in EXPRESSION_END_WORDS))):
+                defined.add(lowered)  # "SUM(x) AS total", "SUM(x) total", "name customer_name", "... END bucket"
+            elif previous is not None and previous[1] == "::":
+                continue  # A type name
+            else:
+                candidates.append(name)
+
+        issues = []
+        reported = set()
+        for name in candidates:
+            lowered = name.lower()
+            if lowered in defined or lowered in reported:
+                continue
+            if any(lowered in columns for _, columns in in_scope):
+                continue
+            reported.add(lowered)
+            all_columns = sorted({column for _, columns in in_scope for column in columns.values()})
+            issues.append(f"Unknown column: {name}" + self._suggest(name, all_columns))
+        return issues
+
+    @staticmethod
+    def _suggest(name: str, candidates: List[str]) -> str:
+        """
+        Closest existing names by spelling, then by business synonyms ("revenue" -> total_price_usd).
+        """
+        by_lower = {candidate.lower(): candidate for candidate in candidates}
+        suggestions = [by_lower[match] for match in
+                       difflib.get_close_matches(name.lower(), list(by_lower), n=3, cutoff=SUGGESTION_CUTOFF)]
+        if len(suggestions) < 3:
+            wanted = set()
+            for fragment in identifier_fragments(name):
+                wanted.update(DEFAULT_SYNONYMS.get(fragment, ()))
+            overlaps = {candidate: len(identifier_fragments(candidate) & wanted) for candidate in candidates
+                        if candidate not in suggestions}
+            ranked = sorted((candidate for candidate, overlap in overlaps.items() if overlap),
+                            key=lambda candidate: -overlaps[candidate])
+            suggestions.extend(ranked[:3 - len(suggestions)])
+        return f" (did you mean {', '.join(suggestions)}?)" if suggestions else ""
+
+    @staticmethod
+    def _catalog_tables(schema_name: str, catalog_hashes: Dict[str, Optional[str]]) -> Optional[Dict]:
+        """
+        Lowercased table name -> (table name, lowercased column name -> column name) of a
+        schema, or None if the schema has no catalog.
+        """
+        catalog = schema_manager.get_catalog(schema_name)
+        catalog_hashes[schema_name] = catalog.content_hash if catalog is not None else None
+        if catalog is None:
+            return None
+        with _catalog_lock:
+            tables = _catalog_cache.get(catalog.content_hash)
+            if tables is None:
+                tables = {name.lower(): (name, {column["name"].lower(): column["name"] for column in table["columns"]})
+                          for name, table in catalog.tables.items()}
+                _catalog_cache[catalog.content_hash] = tables
+                while len(_catalog_cache) > 8:
+                    _catalog_cache.popitem(last=False)
+            return tables
+
+
+_NO_CATALOG_TABLES = {"dual"}
+_catalog_cache: "OrderedDict[str, Dict]" = OrderedDict()
+_catalog_lock = threading.Lock()
@@ -1,121 +1,402 @@
+import hashlib
 import logging
 import re
-from typing import Dict, Tuple, Union
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from core.config import config
+from .schema_manager import schema_manager
+from .semantic_checker import SemanticChecker
+
+# One pass over the query splits it into tokens; comments and literals are single
+# tokens, so their contents are never mistaken for SQL.
+_TOKEN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_$#]*)
+  | (?P<punct>[(),;.])
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<quoted>"(?:[^"]|"")*")
+  | (?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<dollar>\$(?P<tag>[A-Za-z_]*)\$.*?\$(?P=tag)\$)
+  | (?P<param>\$\d+|:[A-Za-z_]\w*|%\(\w+\)s|%s|\?)
+  | (?P<op>::|<=|>=|<>|!=|\|\||[-+*/%=<>|&^~!:@\[\]{}])
+  | (?P<unterminated>['"]|/\*|\$[A-Za-z_]*\$)
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+# A statement inside a string literal, e.g. EXECUTE IMMEDIATE 'DROP TABLE x' or dblink(..., 'DELETE FROM y')
+_HIDDEN_STATEMENT = re.compile(
+    r"\b(?:DROP\s+(?:TABLE|VIEW|SCHEMA|DATABASE|INDEX|USER|FUNCTION|PROCEDURE)|TRUNCATE\s+TABLE|DELETE\s+FROM"
+    r"|INSERT\s+INTO|UPDATE\s+[\w.\"]+\s+SET|ALTER\s+(?:TABLE|USER|SYSTEM|SESSION)|CREATE\s+(?:OR\s+REPLACE\s+)?"
+    r"(?:TABLE|VIEW|FUNCTION|PROCEDURE|USER|ROLE)|GRANT\s+\w+|REVOKE\s+\w+|MERGE\s+INTO)\b",
+    re.IGNORECASE,
+)
+
+# Keywords that make a query modify data, schema or permissions, wherever they appear
+FORBIDDEN_KEYWORDS = {
+    "INSERT", "UPDATE", "DELETE", "MERGE", "UPSERT", "DROP", "TRUNCATE", "ALTER", "CREATE", "RENAME",
+    "GRANT", "REVOKE", "EXEC", "EXECUTE", "CALL", "INTO", "COPY", "VACUUM", "LOCK",
+}
+
+# Words that can't be a table alias because they continue the query
+_NOT_ALIAS = {
+    "WHERE", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "OUTER", "CROSS", "NATURAL", "LATERAL", "ON", "USING",
+    "GROUP", "ORDER", "HAVING", "LIMIT", "OFFSET", "FETCH", "UNION", "INTERSECT", "EXCEPT", "MINUS", "WINDOW",
+    "QUALIFY", "FOR", "SELECT", "FROM", "WITH", "START", "CONNECT", "SAMPLE", "TABLESAMPLE", "PIVOT", "UNPIVOT",
+    "AS", "AND", "OR", "NOT", "IN", "IS", "BETWEEN", "LIKE", "ILIKE", "WHEN", "THEN", "ELSE", "END", "CASE",
+}
+
+# A FROM clause ends at any of these
+_CLAUSE_END = {
+    "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "OFFSET", "FETCH", "UNION", "INTERSECT", "EXCEPT", "MINUS",
+    "WINDOW", "QUALIFY", "ON", "USING", "SELECT", "CONNECT", "START",
+}
+
+# A parenthesis after one of these opens a subquery or a grouping, not a function call
+_NON_FUNCTION_WORDS = _NOT_ALIAS | {"ALL", "ANY", "SOME", "EXISTS", "VALUES", "BY", "DISTINCT", "RECURSIVE"}
+
+_TABLE_PREFIXES = {"LATERAL", "ONLY"}
+
+
+def tokenize(sql_query: str) -> List[Tuple[str, str]]:
+    """
+    Splits a query into (kind, text) tokens, leaving out whitespace and comments.
+    """
+    tokens = []
+    for match in _TOKEN.finditer(sql_query):
+        kind = match.lastgroup
+        if kind == "tag":
+            kind = "dollar"
+        if kind != "ws" and kind != "comment":
+            tokens.append((kind, match.group()))
+    return tokens
+
+
+def fingerprint(sql_query: str) -> str:
+    """
+    Hash of the query with whitespace differences removed; used as the verdict cache key.
+    """
+    normalized = " ".join(sql_query.split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _identifier(kind: str, text: str) -> str:
+    # Quoted identifiers keep their case; unquoted ones are compared case-insensitively
+    if kind == "quoted":
+        return text[1:-1].replace('""', '"')
+    return text
+
+
+class _VerdictCache:
+    """
+    LRU of validation verdicts by query fingerprint. A verdict also remembers the
+    catalog hashes it was checked against and is ignored once a schema changes.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[bool, Dict, Dict[str, Optional[str]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0}
+
+    def get(self, key: Tuple[str, str]):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            is_valid, result, catalog_hashes = entry
+            for schema_name, content_hash in catalog_hashes.items():
+                catalog = schema_manager.get_catalog(schema_name)
+                if (catalog.content_hash if catalog is not None else None) != content_hash:
+                    del self._entries[key]
+                    self._stats["stale"] += 1
+                    self._stats["misses"] += 1
+                    return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return is_valid, {name: list(value) if isinstance(value, list) else value for name, value in result.items()}
+
+    def put(self, key: Tuple[str, str], is_valid: bool, result: Dict, catalog_hashes: Dict[str, Optional[str]]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (is_valid, result, catalog_hashes)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), max_entries=self.max_entries)
+
+
+# Shared by all validators, since one is created wherever a query has to be checked
+verdict_cache = _VerdictCache(config.sql_validation_cache_entries)
 
 
 class SQLValidator:
     """
     Validates SQL queries for syntax correctness and security issues.
-    This is a simple implementation for Phase 1, which will be enhanced over time.
+
+    The query is tokenized once; statement type, forbidden keywords, statements hidden
+    in string literals, parentheses and statement separators are all checked on that
+    token stream. Referenced tables and qualified columns are checked against the
+    schema catalogs where one is available. Verdicts are cached by query fingerprint.
     """
-    
-    def __init__(self):
+
+    def __init__(self, schema_name: str = None):
         """
-        Initialize the SQL validator with basic validation rules.
+        Initialize the SQL validator.
+
+        Args:
+            schema_name: Schema that unqualified table names refer to (defaults to DB_SCHEMA_NAME).
         """
         self.logger = logging.getLogger(__name__)
-        
-        # List of potentially dangerous SQL operations that should be blocked
-        self.dangerous_operations = [
-            r"\bDROP\s+",
-            r"\bTRUNCATE\s+",
-            r"\bDELETE\s+FROM\s+",
-            r"\bALTER\s+TABLE\s+",
-            r"\bUPDATE\s+",
-            r"\bINSERT\s+INTO\s+",
-            r";\s*DROP\s+",  # Prevent SQL injection with multiple statements
-            r"--",  # SQL comment that could be used for injection
-            r"/\*"  # Multi-line comment that could be used for injection
-        ]
-        
-        # For Phase 1, we'll only allow SELECT statements
-        self.allowed_operations = [
-            r"\bSELECT\s+"
-        ]
-    
+        self.schema_name = schema_name or config.db_schema_name
+        self.semantic_checker = SemanticChecker(self.schema_name)
+
     def validate_query(self, sql_query: str) -> Tuple[bool, Dict[str, Union[bool, str]]]:
         """
         Validates a SQL query for syntax and security issues.
-        
+
         Args:
             sql_query: The SQL query to validate.
-            
+
         Returns:
             A tuple with:
             - Boolean indicating if the query is valid
-            - Dictionary with validation details
+            - Dictionary with validation details (is_valid, issues, statement_type, tables)
         """
         self.logger.info(f"Validating query: {sql_query}")
-        
-        validation_result = {
-            "is_valid": True,
-            "issues": []
-        }
-        
+
         # Check if the query is empty
         if not sql_query or not sql_query.strip():
-            validation_result["is_valid"] = False
-            validation_result["issues"].append("Empty query")
-            return False, validation_result
-        
-        # Check for allowed operations (for Phase 1, only SELECT is allowed)
-        allowed = False
-        for pattern in self.allowed_operations:
-            if re.search(pattern, sql_query, re.IGNORECASE):
-                allowed = True
-                break
-        
-        if not allowed:
-            validation_result["is_valid"] = False
-            validation_result["issues"].append("Only SELECT queries are allowed in this phase")
-            return False, validation_result
-        
-        # Check for dangerous operations
-        for pattern in self.dangerous_operations:
-            if re.search(pattern, sql_query, re.IGNORECASE):
-                validation_result["is_valid"] = False
-                validation_result["issues"].append(f"Potentially dangerous operation detected: {pattern}")
-                return False, validation_result
-        
-        # Basic syntax check
-        if not self._check_basic_syntax(sql_query):
-            validation_result["is_valid"] = False
-            validation_result["issues"].append("Basic syntax check failed")
-            return False, validation_result
-        
-        self.logger.info("Query passed validation")
-        return True, validation_result
-    
-    def _check_basic_syntax(self, sql_query: str) -> bool:
+            return False, {"is_valid": False, "issues": ["Empty query"], "semantic_issues": [],
+                           "statement_type": None, "tables": []}
+
+        key = (fingerprint(sql_query), self.schema_name.lower())
+        cached = verdict_cache.get(key)
+        if cached is not None:
+            return cached
+
+        analysis = self._analyze(tokenize(sql_query))
+        issues = analysis["issues"]
+        catalog_hashes = {}
+        semantic_issues = []
+        if not issues:
+            # References are only resolved once the query is known to be a safe, well-formed SELECT
+            semantic_issues = self.semantic_checker.check(analysis, catalog_hashes)
+            issues.extend(semantic_issues)
+
+        validation_result = {
+            "is_valid": not issues,
+            "issues": issues,
+            "semantic_issues": list(semantic_issues),
+            "statement_type": analysis["statement_type"],
+            "tables": [".".join(parts) for parts, _ in analysis["tables"]],
+        }
+        verdict_cache.put(key, not issues, validation_result, catalog_hashes)
+        if issues:
+            self.logger.warning(f"Query failed validation: {'; '.join(issues)}")
+        else:
+            self.logger.info("Query passed validation")
+        return not issues, validation_result
+
+    def _analyze(self, tokens: List[Tuple[str, str]]) -> Dict:
         """
-        Performs a basic syntax check on the SQL query.
-        This is a simplified check for Phase 1.
-        
-        Args:
-            sql_query: The SQL query to check.
-            
-        Returns:
-            Boolean indicating if the query's basic syntax is valid.
+        Walks the token stream once, collecting issues, the statement type, CTE names,
+        table references (with aliases), qualified column references and bare words
+        (with the token before them) for the semantic checks.
         """
-        # In a production system, you might use a SQL parser library here,
-        # but for Phase 1 we'll do some basic checks
-        
-        # Check for balanced parentheses
-        if sql_query.count('(') != sql_query.count(')'):
-            self.logger.warning("Unbalanced parentheses in query")
-            return False
-        
-        # Check for semicolon at the end (or not in the middle)
-        semicolons = sql_query.count(';')
-        if semicolons > 1 or (semicolons == 1 and not sql_query.rstrip().endswith(';')):
-            self.logger.warning("Improper semicolon usage in query")
-            return False
-        
-        # Check for basic SELECT structure (very simplified)
-        if sql_query.upper().startswith('SELECT'):
-            # Very basic check: should have FROM after SELECT
-            if 'FROM' not in sql_query.upper():
-                self.logger.warning("SELECT query missing FROM clause")
-                return False
-        
-        return True 
\ No newline at end of file
+        issues: List[str] = []
+        tables: List[Tuple[List[str], Optional[str]]] = []
+        derived_aliases: Set[str] = set()
+        columns: List[List[str]] = []
+        bare_words: List[Tuple[str, Optional[Tuple[str, str]]]] = []
+        qualified_ends: Set[int] = set()  # Token positions right after a qualified name
+        cte_names: Set[str] = set()
+        statement_type = None
+        forbidden_seen: Set[str] = set()
+
+        contexts: List[str] = []   # Per open parenthesis: "function", "subquery" or "group"
+        in_from = [False]          # Per nesting depth: inside a FROM clause
+        expecting_table = False
+        with_depth = None          # Depth of the WITH clause whose CTE list is being read
+        derived_pending = False    # The parenthesis just closed was a derived table
+        count = len(tokens)
+        i = 0
+
+        def peek(offset: int) -> Tuple[Optional[str], str]:
+            position = i + offset
+            return tokens[position] if position < count else (None, "")
+
+        while i < count:
+            kind, text = tokens[i]
+            upper = text.upper() if kind == "word" else text
+
+            if kind == "unterminated":
+                issues.append("Unterminated string, identifier or comment")
+                break
+            if kind in ("string", "dollar"):
+                if _HIDDEN_STATEMENT.search(text):
+                    issues.append("String literal contains a SQL statement")
+                i += 1
+                continue
+
+            if statement_type is None and not (kind == "punct" and text == "("):
+                statement_type = upper if kind == "word" else None
+                if statement_type not in ("SELECT", "WITH"):
+                    issues.append("Only SELECT queries are allowed in this phase")
+                    break
+                if statement_type == "WITH":
+                    with_depth = len(contexts)
+
+            if kind == "punct":
+                if text == ";":
+                    if contexts:
+                        issues.append("Statement separator inside parentheses")
+                    elif i + 1 < count:
+                        issues.append("Multiple statements are not allowed")
+                    break
+                if text == "(":
+                    previous_kind, previous = tokens[i - 1] if i else (None, "")
+                    next_kind, next_text = peek(1)
+                    if next_kind == "word" and next_text.upper() in ("SELECT", "WITH"):
+                        context = "subquery"
+                    elif previous_kind in ("word", "quoted") and previous.upper() not in _NON_FUNCTION_WORDS:
+                        context = "function"
+                    else:
+                        context = "group"
+                    derived_pending = expecting_table and context == "subquery"
+                    if derived_pending:
+                        expecting_table = False
+                    contexts.append("derived" if derived_pending else context)
+                    in_from.append(False)
+                elif text == ")":
+                    if not contexts:
+                        issues.append("Unbalanced parentheses")
+                        break
+                    closed = contexts.pop()
+                    in_from.pop()
+                    if closed == "derived":
+                        # The derived table's alias; its columns aren't known from the catalog
+                        next_kind, next_text = peek(1)
+                        offset = 1
+                        if next_kind == "word" and next_text.upper() == "AS":
+                            next_kind, next_text = peek(2)
+                            offset = 2
+                        if next_kind in ("word", "quoted") and next_text.upper() not in _NOT_ALIAS:
+                            derived_aliases.add(_identifier(next_kind, next_text).lower())
+                            i += offset
+                elif text == "," and in_from[-1]:
+                    expecting_table = True
+                i += 1
+                continue
+
+            if kind == "word":
+                if upper in FORBIDDEN_KEYWORDS and upper not in forbidden_seen:
+                    forbidden_seen.add(upper)
+                    issues.append(f"Potentially dangerous operation detected: {upper}")
+                if with_depth is not None and len(contexts) == with_depth:
+                    if upper == "AS" and peek(1)[1] == "(":
+                        cte_names.add(self._cte_name(tokens, i))
+                    elif upper == "SELECT":
+                        with_depth = None
+                    elif upper in FORBIDDEN_KEYWORDS:
+                        with_depth = None
+                if upper == "FROM":
+                    if not contexts or contexts[-1] != "function":  # Not EXTRACT(YEAR FROM ...)
+                        in_from[-1] = True
+                        expecting_table = True
+                    i += 1
+                    continue
+                if upper == "JOIN":
+                    in_from[-1] = True
+                    expecting_table = True
+                    i += 1
+                    continue
+                if upper in _CLAUSE_END:
+                    in_from[-1] = False
+                    expecting_table = False
+                    i += 1
+                    continue
+                if expecting_table and upper in _TABLE_PREFIXES:
+                    i += 1
+                    continue
+
+            if kind in ("word", "quoted"):
+                parts = [_identifier(kind, text)]
+                j = i + 1
+                while j + 1 < count and tokens[j] == ("punct", ".") and tokens[j + 1][0] in ("word", "quoted", "op"):
+                    if tokens[j + 1] == ("op", "*"):
+                        parts.append("*")
+                        j += 2
+                        break
+                    if tokens[j + 1][0] == "op":
+                        break
+                    parts.append(_identifier(*tokens[j + 1]))
+                    j += 2
+                is_call = j < count and tokens[j] == ("punct", "(")
+
+                if expecting_table and not is_call:
+                    alias = None
+                    next_kind, next_text = tokens[j] if j < count else (None, "")
+                    if next_kind == "word" and next_text.upper() == "AS":
+                        j += 1
+                        next_kind, next_text = tokens[j] if j < count else (None, "")
+                    if next_kind in ("word", "quoted") and next_text.upper() not in _NOT_ALIAS:
+                        alias = _identifier(next_kind, next_text)
+                        j += 1
+                    tables.append((parts, alias))
+                    expecting_table = False
+                elif len(parts) > 1 and not is_call:
+                    columns.append(parts)
+                elif expecting_table:
+                    expecting_table = False  # Table function such as generate_series(...)
+                elif not is_call:
+                    previous = ("qualified", "") if i in qualified_ends else (tokens[i - 1] if i else None)
+                    bare_words.append((parts[0], previous))
+                if len(parts) > 1:
+                    qualified_ends.add(j)
+                i = j
+                continue
+
+            i += 1
+
+        if not issues and contexts:
+            issues.append("Unbalanced parentheses")
+        if not issues and statement_type == "WITH" and with_depth is not None:
+            issues.append("WITH clause is not followed by a SELECT")
+        return {
+            "issues": issues,
+            "statement_type": statement_type,
+            "tables": tables,
+            "derived_aliases": derived_aliases,
+            "columns": columns,
+            "bare_words": bare_words,
+            "cte_names": cte_names,
+        }
+
+    @staticmethod
+    def _cte_name(tokens: List[Tuple[str, str]], as_index: int) -> str:
+        # "name AS (" or "name (col, ...) AS ("
+        j = as_index - 1
+        if tokens[j] == ("punct", ")"):
+            depth = 0
+            while j >= 0:
+                if tokens[j] == ("punct", ")"):
+                    depth += 1
+                elif tokens[j] == ("punct", "("):
+                    depth -= 1
+                    if depth == 0:
+                        break
+                j -= 1
+            j -= 1
+        return _identifier(*tokens[j]).lower() if j >= 0 else ""
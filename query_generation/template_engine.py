@@ -0,0 +1,303 @@
+import logging
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from core.config import config
+from .question_index import NUMBER_WORDS
+from .schema_manager import schema_manager
+
+# Measures: (phrase pattern, SQL expression, result alias), most specific first
+MEASURES = [
+    (r"(?:number of (?:sales|transactions|orders)|transaction count|order count|sales count|transactions|orders)",
+     "COUNT(*)", "sales_count"),
+    (r"(?:units sold|quantity sold|(?:total )?quantity|(?:total )?units)", "SUM(fs.quantity)", "total_quantity"),
+    (r"(?:(?:total |gross )?(?:revenue|turnover|income)|sales (?:amount|value))",
+     "SUM(fs.total_price_usd)", "total_revenue"),
+    (r"(?:total )?sales", "SUM(fs.total_price_usd)", "total_sales"),
+]
+
+# Dimensions: name -> (tables needed, select expressions, group by expressions, order by time)
+DIMENSIONS = {
+    "store": (["ds"], ["ds.name AS store_name"], ["ds.store_key", "ds.name"], False),
+    "product": (["dp"], ["dp.name AS product_name"], ["dp.product_key", "dp.name"], False),
+    "category": (["dp"], ["dp.category"], ["dp.category"], False),
+    "brand": (["dp"], ["dp.brand"], ["dp.brand"], False),
+    "customer": (["dc"], ["dc.first_name", "dc.last_name"], ["dc.customer_key", "dc.first_name", "dc.last_name"], False),
+    "employee": (["de"], ["de.first_name", "de.last_name"], ["de.employee_key", "de.first_name", "de.last_name"], False),
+    "city": (["ds"], ["ds.city"], ["ds.city"], False),
+    "country": (["ds"], ["ds.country"], ["ds.country"], False),
+    "year": (["dd"], ["dd.year"], ["dd.year"], True),
+    "quarter": (["dd"], ["dd.year", "dd.quarter"], ["dd.year", "dd.quarter"], True),
+    "month": (["dd"], ["dd.year", "dd.month"], ["dd.year", "dd.month"], True),
+    "day": (["dd"], ["dd.full_date"], ["dd.full_date"], True),
+}
+DIMENSION_ALIASES = {
+    "stores": "store", "shop": "store", "shops": "store", "products": "product", "items": "product",
+    "item": "product", "categories": "category", "brands": "brand", "customers": "customer",
+    "employees": "employee", "cities": "city", "countries": "country", "years": "year",
+    "quarters": "quarter", "months": "month", "days": "day", "date": "day",
+}
+
+JOINS = {
+    "ds": "JOIN {schema}.DimStore ds ON fs.store_key = ds.store_key",
+    "dp": "JOIN {schema}.DimProduct dp ON fs.product_key = dp.product_key",
+    "dc": "JOIN {schema}.DimCustomer dc ON fs.customer_key = dc.customer_key",
+    "de": "JOIN {schema}.DimEmployee de ON fs.employee_key = de.employee_key",
+    "dd": "JOIN {schema}.DimDate dd ON fs.date_key = dd.date_key",
+}
+
+# Tables used in counting questions ("how many customers in Germany")
+ENTITIES = {
+    "customer": ("DimCustomer", "dc"), "store": ("DimStore", "ds"),
+    "product": ("DimProduct", "dp"), "employee": ("DimEmployee", "de"),
+}
+
+# Places a filter may name: the cities and countries of the star_dwh data, plus SQL_TEMPLATE_PLACES.
+# Any other "in/for ..." text ("last month", "product x") is left to the LLM.
+KNOWN_PLACES = {
+    "new york", "los angeles", "chicago", "houston", "phoenix", "philadelphia", "san antonio", "san diego",
+    "dallas", "san jose", "london", "paris", "tokyo", "sydney", "toronto", "berlin", "rome", "madrid",
+    "amsterdam", "singapore", "united states", "united kingdom", "france", "japan", "australia", "canada",
+    "germany", "italy", "spain", "netherlands", "china", "india", "brazil", "mexico", "south korea",
+    "russia", "turkey", "saudi arabia", "sweden",
+}
+PLACE_ALIASES = {
+    "us": "united states", "usa": "united states", "u.s.": "united states", "u.s.a.": "united states",
+    "america": "united states", "uk": "united kingdom", "u.k.": "united kingdom", "britain": "united kingdom",
+    "great britain": "united kingdom", "england": "united kingdom", "holland": "netherlands",
+    "korea": "south korea", "nyc": "new york", "la": "los angeles",
+}
+
+# Place columns filtered for each dimension; employees have no place of work in the model
+PLACE_COLUMNS = {"customer": ["dc.city", "dc.country"], "employee": None}
+STORE_PLACE_COLUMNS = ["ds.city", "ds.country"]
+
+REQUIRED_TABLES = {"factsales", "dimdate", "dimstore", "dimproduct", "dimcustomer", "dimemployee"}
+
+MONTHS = {
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6, "july": 7,
+    "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "jun": 6, "jul": 7, "aug": 8, "sep": 9, "sept": 9,
+    "oct": 10, "nov": 11, "dec": 12,
+}
+
+_MEASURE_PATTERN = "|".join(f"(?:{pattern})" for pattern, _, _ in MEASURES)
+_DIMENSION_PATTERN = "|".join(sorted(set(DIMENSIONS) | set(DIMENSION_ALIASES), key=len, reverse=True))
+_COUNT_PATTERN = r"\d+|" + "|".join(NUMBER_WORDS)
+_FILTER = r"(?:\s+(?:in|for|during|from)\s+(?P<filter>[a-z0-9][a-z0-9 .'\-]*?))?"
+
+_PREFIX = re.compile(
+    r"^(?:(?:please\s+)?(?:show(?:\s+me)?|list|give\s+me|get|find|display|what\s+(?:is|are|was|were))\s+)?"
+    r"(?:(?:the|our|all)\s+)?",
+    re.IGNORECASE,
+)
+
+TEMPLATES = [
+    ("top_n", re.compile(
+        rf"^top\s+(?P<n>{_COUNT_PATTERN})\s+(?P<dim>{_DIMENSION_PATTERN})\s+by\s+(?P<measure>{_MEASURE_PATTERN}){_FILTER}$",
+        re.IGNORECASE)),
+    ("measure_by_dimension", re.compile(
+        rf"^(?P<measure>{_MEASURE_PATTERN})\s+(?:by|per)\s+(?P<dim>{_DIMENSION_PATTERN}){_FILTER}$",
+        re.IGNORECASE)),
+    ("measure_total", re.compile(rf"^(?P<measure>{_MEASURE_PATTERN}){_FILTER}$", re.IGNORECASE)),
+    ("count_entities", re.compile(
+        r"^how\s+many\s+(?P<entity>customers|stores|shops|products|employees)"
+        r"(?:\s+(?:are\s+there|do\s+we\s+have))?(?:\s+(?:in|from)\s+(?P<filter>[a-z][a-z .'\-]*?))?"
+        r"(?:\s+(?:are\s+there|do\s+we\s+have))?$",
+        re.IGNORECASE)),
+]
+
+# _parse_filter has already dropped a leading "the" ("for the year 2023")
+_YEAR = re.compile(r"^(?:year\s+)?(?P<year>(?:19|20)\d\d)$", re.IGNORECASE)
+_MONTH = re.compile(r"^(?P<month>[a-z]+)(?:\s+(?:of\s+)?(?P<year>(?:19|20)\d\d))?$", re.IGNORECASE)
+_QUARTER = re.compile(r"^q(?P<quarter>[1-4])(?:\s+(?P<year>(?:19|20)\d\d))?$", re.IGNORECASE)
+_PLACE = re.compile(r"^[a-z][a-z .'\-]{1,60}$", re.IGNORECASE)
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class SQLTemplateEngine:
+    """
+    Deterministic fast path for formulaic questions against the star_dwh model, such as
+    "total sales by store for 2023", "top 10 products by revenue in March 2023" or
+    "how many customers in Germany". Matching questions get SQL in microseconds
+    without an LLM call; everything else falls through to the LLM.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = config.sql_templates_enabled
+        self._lock = threading.Lock()
+        self._schema_support: Dict[Tuple[str, str], bool] = {}
+        self._stats = {"attempts": 0, "hits": 0, "misses": 0, "match_ns": 0}
+        self._template_hits = {name: 0 for name, _ in TEMPLATES}
+
+    def _supports_schema(self, schema_name: str) -> bool:
+        catalog = schema_manager.get_catalog(schema_name)
+        if catalog is None:
+            # Only the built-in star_dwh description is known to have the expected tables
+            return schema_name.lower() == "star_dwh"
+        key = (schema_name.lower(), catalog.content_hash)
+        supported = self._schema_support.get(key)
+        if supported is None:
+            supported = REQUIRED_TABLES <= {table.lower() for table in catalog.tables}
+            self._schema_support[key] = supported
+        return supported
+
+    def match(self, question: str, schema_name: str) -> Optional[Tuple[str, Dict]]:
+        """
+        Returns (sql_query, metadata) if the question matches a template, otherwise None.
+        """
+        if not self.enabled or not self._supports_schema(schema_name):
+            return None
+        started = time.perf_counter_ns()
+        result = self._match(question.strip().rstrip("?!. "), schema_name)
+        elapsed = time.perf_counter_ns() - started
+        with self._lock:
+            self._stats["attempts"] += 1
+            self._stats["match_ns"] += elapsed
+            if result is None:
+                self._stats["misses"] += 1
+            else:
+                self._stats["hits"] += 1
+                self._template_hits[result[1]["template"]] += 1
+        if result is not None:
+            self.logger.info(f"Question matched template '{result[1]['template']}' in {elapsed / 1000:.0f}us")
+        return result
+
+    def _match(self, question: str, schema_name: str) -> Optional[Tuple[str, Dict]]:
+        question = re.sub(r"\s+", " ", question)
+        question = question[_PREFIX.match(question).end():]
+        for name, pattern in TEMPLATES:
+            match = pattern.match(question)
+            if match is None:
+                continue
+            groups = match.groupdict()
+            if name == "count_entities":
+                built = self._count_query(groups, schema_name)
+            else:
+                built = self._sales_query(name, groups, schema_name)
+            if built is not None:
+                sql_query, explanation = built
+                return sql_query, {"template": name, "llm_provider": "template", "explanation": explanation}
+        return None
+
+    @staticmethod
+    def _measure(phrase: str) -> Tuple[str, str]:
+        for pattern, expression, alias in MEASURES:
+            if re.fullmatch(pattern, phrase, re.IGNORECASE):
+                return expression, alias
+        raise ValueError(f"Unknown measure: {phrase}")
+
+    @staticmethod
+    def _parse_filter(value: Optional[str], place_columns: Optional[List[str]]) -> Optional[Tuple[List[str], set, str]]:
+        """
+        Turns the "in/for ..." part of a question into (conditions, tables, description).
+        Places must be known cities or countries and are matched on place_columns (None
+        allows no place filter). Returns None for filters no template can express.
+        """
+        if not value:
+            return [], set(), ""
+        value = re.sub(r"^the\s+", "", value.strip(), flags=re.IGNORECASE)
+        year = _YEAR.match(value)
+        if year:
+            return [f"dd.year = {int(year.group('year'))}"], {"dd"}, f" in {year.group('year')}"
+        quarter = _QUARTER.match(value)
+        if quarter:
+            conditions = [f"dd.quarter = {int(quarter.group('quarter'))}"]
+            if quarter.group("year"):
+                conditions.append(f"dd.year = {int(quarter.group('year'))}")
+            return conditions, {"dd"}, f" in {value}"
+        month = _MONTH.match(value)
+        if month and month.group("month").lower() in MONTHS:
+            conditions = [f"dd.month = {MONTHS[month.group('month').lower()]}"]
+            if month.group("year"):
+                conditions.append(f"dd.year = {int(month.group('year'))}")
+            return conditions, {"dd"}, f" in {value}"
+        place = value.lower()
+        place = PLACE_ALIASES.get(place, place)
+        if place_columns and _PLACE.match(value) and (place in KNOWN_PLACES or place in config.sql_template_places):
+            literal = _quote(place)
+            alias = place_columns[0].split(".")[0]
+            condition = " OR ".join(f"LOWER({column}) = {literal}" for column in place_columns)
+            return [f"({condition})"], {alias}, f" in {value}"
+        return None
+
+    def _sales_query(self, name: str, groups: Dict, schema_name: str) -> Optional[Tuple[str, str]]:
+        expression, alias = self._measure(groups["measure"])
+        dimension = None
+        if groups.get("dim"):
+            dimension = DIMENSION_ALIASES.get(groups["dim"].lower(), groups["dim"].lower())
+        # "by customer in Germany" means customers from Germany, otherwise the store's location
+        parsed = self._parse_filter(groups.get("filter"), PLACE_COLUMNS.get(dimension, STORE_PLACE_COLUMNS))
+        if parsed is None:
+            return None
+        conditions, tables, filter_text = parsed
+
+        select, group_by, order_by = [], [], f"{alias} DESC"
+        if dimension:
+            dim_tables, select, group_by, by_time = DIMENSIONS[dimension]
+            tables.update(dim_tables)
+            if by_time and name != "top_n":
+                order_by = ", ".join(group_by)
+
+        limit = None
+        if name == "top_n":
+            count = groups["n"].lower()
+            limit = int(NUMBER_WORDS.get(count, count))
+            if limit <= 0:
+                return None
+
+        lines = [f"SELECT {', '.join(select + [f'{expression} AS {alias}'])}",
+                 f"FROM {schema_name}.FactSales fs"]
+        lines += [JOINS[table].format(schema=schema_name) for table in sorted(tables)]
+        if conditions:
+            lines.append("WHERE " + " AND ".join(conditions))
+        if group_by:
+            lines.append(f"GROUP BY {', '.join(group_by)}")
+            lines.append(f"ORDER BY {order_by}")
+        if limit is not None:
+            lines.append(f"LIMIT {limit}")
+
+        measure_text = alias.replace("_", " ")
+        if name == "top_n":
+            explanation = f"Top {limit} {groups['dim'].lower()} by {measure_text}{filter_text}."
+        elif dimension:
+            explanation = f"{measure_text.capitalize()} per {dimension}{filter_text}."
+        else:
+            explanation = f"{measure_text.capitalize()}{filter_text}."
+        return "\n".join(lines), explanation
+
+    def _count_query(self, groups: Dict, schema_name: str) -> Optional[Tuple[str, str]]:
+        entity = DIMENSION_ALIASES.get(groups["entity"].lower(), groups["entity"].lower())
+        table, alias = ENTITIES[entity]
+        place_columns = [f"{alias}.city", f"{alias}.country"] if entity in ("customer", "store") else None
+        parsed = self._parse_filter(groups.get("filter"), place_columns)
+        if parsed is None or parsed[1] - {alias}:
+            return None  # Date filters don't apply to dimension tables
+        conditions, _, filter_text = parsed
+        lines = [f"SELECT COUNT(*) AS {entity}_count", f"FROM {schema_name}.{table} {alias}"]
+        if conditions:
+            lines.append("WHERE " + " AND ".join(conditions))
+        return "\n".join(lines), f"Number of {entity}s{filter_text}."
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            attempts = self._stats["attempts"]
+            return {
+                "enabled": self.enabled,
+                "attempts": attempts,
+                "hits": self._stats["hits"],
+                "misses": self._stats["misses"],
+                "hit_rate": round(self._stats["hits"] / attempts, 4) if attempts else None,
+                "avg_match_us": round(self._stats["match_ns"] / attempts / 1000, 1) if attempts else None,
+                "templates": dict(self._template_hits),
+            }
+
+
+# Global template engine shared by all query generators
+template_engine = SQLTemplateEngine()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Benchmark for the SQL validator.
+Generates long star_dwh queries (CTEs, many joins and columns, literals containing
+comment markers) and reports microseconds per validation, with and without the
+verdict cache.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Validation logs every query at INFO; keep the output readable
+logging.basicConfig(level=logging.ERROR)
+
+from core.config import config
+from query_generation.schema_manager import schema_manager
+from query_generation.sql_validator import SQLValidator, verdict_cache
+
+DIMENSIONS = [
+    ("DimCustomer", "dc", "customer_key", ["first_name", "last_name", "city", "country"]),
+    ("DimProduct", "dp", "product_key", ["name", "category", "brand", "price_usd"]),
+    ("DimStore", "ds", "store_key", ["name", "city", "country", "manager_name"]),
+    ("DimEmployee", "de", "employee_key", ["first_name", "last_name", "position"]),
+    ("DimDate", "dd", "date_key", ["year", "quarter", "month", "day_name"]),
+]
+
+
+def generate_query(schema: str, variant: int, ctes: int) -> str:
+    """
+    Builds a long query; `variant` makes every generated query distinct.
+    """
+    parts = []
+    for index in range(ctes):
+        parts.append(
+            f"cte_{index} AS (\n"
+            f"    SELECT fs.store_key, SUM(fs.total_price_usd) AS revenue_{index}\n"
+            f"    FROM {schema}.FactSales fs\n"
+            f"    WHERE fs.quantity > {variant + index} AND fs.hour BETWEEN {index % 24} AND 23\n"
+            f"    GROUP BY fs.store_key\n"
+            f")")
+    select_columns = ["fs.sales_key", "fs.quantity", "fs.total_price_usd", "fs.transaction_time"]
+    joins = []
+    for table, alias, key, columns in DIMENSIONS:
+        select_columns += [f"{alias}.{column}" for column in columns]
+        joins.append(f"JOIN {schema}.{table} {alias} ON fs.{key} = {alias}.{key}")
+    for index in range(ctes):
+        select_columns.append(f"c{index}.revenue_{index}")
+        joins.append(f"LEFT JOIN cte_{index} c{index} ON c{index}.store_key = fs.store_key")
+    return (
+        (f"WITH {', '.join(parts)}\n" if parts else "")
+        + f"SELECT {', '.join(select_columns)},\n"
+        + "       CASE WHEN dp.description LIKE '%--%' THEN 'n/a -- see notes' ELSE dp.description END AS note\n"
+        + f"FROM {schema}.FactSales fs\n"
+        + "\n".join(joins) + "\n"
+        + f"WHERE dd.year = {2000 + variant % 30} AND dc.country IN ('Germany', 'Croatia', 'O''Brien--Land')\n"
+        + f"  AND EXTRACT(MONTH FROM fs.transaction_time) = {1 + variant % 12}\n"
+        + "ORDER BY fs.total_price_usd DESC\n"
+        + "LIMIT 100"
+    )
+
+
+def benchmark(queries: int, ctes: int, repeats: int):
+    schema = config.db_schema_name
+    validator = SQLValidator()
+    generated = [generate_query(schema, variant, ctes) for variant in range(queries)]
+    catalog = schema_manager.get_catalog(schema)
+    print(f"{queries} queries, {ctes} CTEs each, average {sum(map(len, generated)) // queries} characters")
+    print(f"Catalog checks: {'on (' + str(len(catalog.tables)) + ' tables)' if catalog else 'off (no catalog cached)'}")
+
+    verdict_cache.clear()
+    started = time.perf_counter()
+    invalid = [query for query in generated if not validator.validate_query(query)[0]]
+    cold = time.perf_counter() - started
+    print(f"Uncached: {cold / queries * 1e6:.1f} us per validation")
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for query in generated:
+            validator.validate_query(query)
+    warm = time.perf_counter() - started
+    print(f"Cached:   {warm / (queries * repeats) * 1e6:.1f} us per validation")
+
+    if invalid:
+        print(f"{len(invalid)} generated queries were rejected, e.g.: {validator.validate_query(invalid[0])[1]['issues']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the SQL validator")
+    parser.add_argument("--queries", type=int, default=1000, help="Number of distinct queries")
+    parser.add_argument("--ctes", type=int, default=4, help="CTEs per query")
+    parser.add_argument("--repeats", type=int, default=5, help="Passes over the queries with a warm cache")
+    args = parser.parse_args()
+    benchmark(args.queries, args.ctes, args.repeats)
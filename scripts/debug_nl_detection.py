@@ -1,12 +1,17 @@
 #!/usr/bin/env python
 """
 Debug utility for the natural language detection.
-This script tests whether a message would be detected as natural language or SQL.
+
+Without arguments, runs the classifier over a labelled corpus of questions and SQL
+queries and reports accuracy, misclassified examples and throughput. With a message
+argument (or -i for interactive mode), shows how that message is scored.
 """
 
+import argparse
 import logging
 import os
 import sys
+import time
 
 # Add the parent directory to the path so we can import our modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -18,20 +23,111 @@ logging.basicConfig(
 )
 logger = logging.getLogger("debug_nl_detection")
 
-# Import the QueryGenerator class
-from query_generation.query_generator import QueryGenerator
+from query_generation.nl_classifier import nl_classifier
+
+NL = True
+SQL = False
+
+# (text, is natural language)
+CORPUS = [
+    ("What are the top 5 products by price?", NL),
+    ("Show me all users in New York", NL),
+    ("show me sales FROM last month", NL),
+    ("Show me sales from last month where the store is in Zagreb", NL),
+    ("total sales by store in 2023", NL),
+    ("top 10 products by revenue for March 2023", NL),
+    ("How many customers do we have in Germany?", NL),
+    ("which employees sold the most in Q3", NL),
+    ("list stores ordered by revenue", NL),
+    ("Give me the average order value per month", NL),
+    ("select the top 10 customers by revenue", NL),
+    ("update me on last week's sales", NL),
+    ("what was our best selling brand last year", NL),
+    ("compare revenue of Zagreb and Split stores", NL),
+    ("revenue per category where price is above 100", NL),
+    ("can you list customers who joined this year", NL),
+    ("Who is the manager of the store with the highest sales?", NL),
+    ("sales in the UK", NL),
+    ("number of orders by country", NL),
+    ("how many products are in the Electronics category", NL),
+    ("please show revenue by quarter", NL),
+    ("tell me which products have never been sold", NL),
+    ("customers from Croatia", NL),
+    ("find orders where quantity is greater than 10", NL),
+    ("delete all my doubts: which store earned most in 2022?", NL),
+    ("monthly revenue trend for 2023 and 2024", NL),
+    ("with the highest margin, which products should we promote?", NL),
+    ("get the list of employees hired after 2020", NL),
+    ("average unit price per brand", NL),
+    ("is there any store without sales last month?", NL),
+    ("SELECT * FROM users", SQL),
+    ("select name, email from customers where city = 'Zagreb'", SQL),
+    ("SELECT COUNT(*) FROM star_dwh.FactSales", SQL),
+    ("SELECT 1", SQL),
+    ("select now()", SQL),
+    ("SELECT dp.name, SUM(fs.total_price_usd) AS revenue FROM star_dwh.FactSales fs "
+     "JOIN star_dwh.DimProduct dp ON fs.product_key = dp.product_key GROUP BY dp.name ORDER BY revenue DESC LIMIT 10", SQL),
+    ("WITH monthly AS (SELECT month, SUM(total) t FROM sales GROUP BY month) SELECT * FROM monthly", SQL),
+    ("with x as (select 1 as a) select a from x", SQL),
+    ("-- top customers\nSELECT customer_key FROM star_dwh.DimCustomer", SQL),
+    ("/* report */ SELECT 1 FROM dual", SQL),
+    ("EXPLAIN SELECT * FROM orders", SQL),
+    ("DESCRIBE star_dwh.DimStore", SQL),
+    ("SELECT * FROM orders WHERE status = 'what is this?'", SQL),
+    ("select city, count(*) from star_dwh.DimCustomer group by city", SQL),
+    ("SELECT name FROM products WHERE price > 100;", SQL),
+    ("(SELECT a FROM t) UNION (SELECT b FROM u)", SQL),
+    ("SELECT DISTINCT brand FROM star_dwh.DimProduct ORDER BY brand", SQL),
+    ("select * from sales where created_at >= DATE '2023-01-01'", SQL),
+    ("SELECT e.first_name, e.last_name FROM star_dwh.DimEmployee e WHERE e.salary > 50000", SQL),
+    ("select product_key, sum(quantity) from star_dwh.FactSales group by product_key having sum(quantity) > 100", SQL),
+    ("SELECT * FROM t WHERE ROWNUM <= 10", SQL),
+    ("select count(1) from orders", SQL),
+    ("SELECT name\nFROM star_dwh.DimStore\nWHERE country = 'Croatia'\nORDER BY name", SQL),
+    ("UPDATE users SET active = false WHERE id = 3", SQL),
+    ("DELETE FROM sessions WHERE created_at < now() - interval '1 day'", SQL),
+    ("insert into audit (event) values ('x')", SQL),
+    ("DROP TABLE tmp_sales", SQL),
+    ("select o.id, c.name from orders o join customers c on c.id = o.customer_id", SQL),
+    ("SELECT year, SUM(revenue) FROM yearly GROUP BY year", SQL),
+    ("SELECT NVL(commission, 0) FROM employees", SQL),
+]
+
+
+def run_corpus(repeats: int):
+    """
+    Reports accuracy on the labelled corpus and classification throughput.
+    """
+    correct = 0
+    for text, expected in CORPUS:
+        predicted = nl_classifier.is_natural_language(text)
+        if predicted == expected:
+            correct += 1
+        else:
+            sql_score, nl_score, _ = nl_classifier.score(text)
+            print(f"MISCLASSIFIED as {'NL' if predicted else 'SQL'} (sql={sql_score:.2f}, nl={nl_score:.2f}): {text!r}")
+    print(f"Accuracy: {correct}/{len(CORPUS)} ({correct / len(CORPUS):.1%})")
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for text, _ in CORPUS:
+            nl_classifier.is_natural_language(text)
+    elapsed = time.perf_counter() - started
+    count = repeats * len(CORPUS)
+    print(f"Throughput: {count / elapsed:,.0f} classifications/s ({elapsed / count * 1e6:.1f} us each)")
+
 
 def debug_nl_detection(message):
     """
     Debug natural language detection for a given message.
-    
+
     Args:
         message: The message text to test.
     """
     logger.info(f"Debugging natural language detection for message: {message}")
-    
+
     # If the message starts with 'SQLoslav', extract the actual text
-    if message.startswith("SQLoslav"):
+    if message.lower().startswith("sqloslav"):
         lines = message.strip().split("\n")
         if len(lines) > 1:
             actual_text = "\n".join(lines[1:])
@@ -41,26 +137,26 @@ def debug_nl_detection(message):
             return
     else:
         actual_text = message
-    
-    # Initialize the QueryGenerator
-    query_generator = QueryGenerator()
-    
-    # Test if the text is natural language
-    is_natural_language = query_generator.is_natural_language(actual_text)
-    
+
+    sql_score, nl_score, features = nl_classifier.score(actual_text)
+    is_natural_language = nl_classifier.is_natural_language(actual_text)
+
+    logger.info(f"Scores: sql={sql_score:.2f}, nl={nl_score:.2f}; features: {features}")
     logger.info(f"Is natural language? {is_natural_language}")
     logger.info(f"Would be processed as: {'Natural Language' if is_natural_language else 'SQL'}")
-    
-    # Print SQL keyword checks
-    for keyword in query_generator.sql_starters:
-        if actual_text.strip().upper().startswith(keyword):
-            logger.info(f"Matched SQL keyword: {keyword}")
+
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
+    parser = argparse.ArgumentParser(description="Debug and benchmark natural language detection")
+    parser.add_argument("message", nargs="?", help="Message to score")
+    parser.add_argument("-i", "--interactive", action="store_true", help="Score messages typed at a prompt")
+    parser.add_argument("--repeats", type=int, default=2000, help="Passes over the corpus for the throughput benchmark")
+    args = parser.parse_args()
+
+    if args.message:
         # If message is provided as command line argument
-        debug_nl_detection(sys.argv[1])
-    else:
+        debug_nl_detection(args.message)
+    elif args.interactive:
         # Interactive mode
         print("Enter messages to test natural language detection (Ctrl+C to exit):")
         try:
@@ -69,4 +165,6 @@ if __name__ == "__main__":
                 debug_nl_detection(message)
                 print()
         except KeyboardInterrupt:
-            print("\nExiting.") 
\ No newline at end of file
+            print("\nExiting.")
+    else:
+        run_corpus(args.repeats)
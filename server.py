@@ -0,0 +1,121 @@
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from slack_bot import SlackBot
+from slack_bot.event_queue import EventQueueFullError
+from slack_bot.file_deletion_scheduler import FileDeletionScheduler
+from slack_uploader.http_session import slack_http_session
+from slack_uploader.upload_pipeline import upload_stats
+import logging
+import os
+from database.engine_registry import engine_registry
+from processing.artifact_retention import artifact_retention
+from processing.cost_guard import cost_guard
+from processing.query_dispatcher import query_dispatcher
+from processing.result_buffer import result_buffer_stats
+from processing.result_cache import result_cache
+from processing.xlsx_writer import xlsx_exporter
+from query_generation.generation_cache import generation_cache
+from query_generation.llm.hedged_provider import hedged_provider_stats
+from query_generation.llm.rate_limiter import rate_limiter_stats
+from query_generation.schema_manager import schema_manager
+from query_generation.schema_pruner import schema_pruner
+from query_generation.sql_validator import verdict_cache
+from query_generation.template_engine import template_engine
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("sqloslav")
+
+app = FastAPI(title="SQLoslav API", description="A Slack bot for SQL queries")
+slack_bot = SlackBot()
+
+
+@app.get("/")
+async def root():
+    """Health check endpoint"""
+    return {"status": "ok", "message": "SQLoslav is running"}
+
+
+@app.get("/stats")
+async def stats():
+    """Runtime statistics for connection pools, query execution and caches"""
+    return {
+        "database_pools": engine_registry.pool_stats(),
+        "query_dispatcher": query_dispatcher.get_stats(),
+        "result_cache": result_cache.get_stats(),
+        "result_buffers": result_buffer_stats.get_stats(),
+        "xlsx_exporter": xlsx_exporter.get_stats(),
+        "artifacts": artifact_retention.get_stats(),
+        "cost_guard": cost_guard.get_stats(),
+        "generation_cache": generation_cache.get_stats(),
+        "sql_templates": template_engine.get_stats(),
+        "sql_validator": verdict_cache.get_stats(),
+        "llm_rate_limiters": rate_limiter_stats(),
+        "llm_providers": hedged_provider_stats(),
+        "schema_manager": schema_manager.get_stats(),
+        "schema_pruner": schema_pruner.get_stats(),
+        "event_queue": slack_bot.event_queue.get_stats(),
+        "slack_uploads": upload_stats.get_stats(),
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """State of a queued Slack event job"""
+    job = slack_bot.event_queue.get_job(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"status": "not_found"})
+    return job.to_dict()
+
+
+@app.on_event("startup")
+async def startup():
+    await slack_bot.start()
+    schema_manager.start()
+    artifact_retention.start(FileDeletionScheduler(os.getenv('SLACK_BOT_TOKEN')))
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await slack_bot.stop()
+    await slack_http_session.close()
+    schema_manager.stop()
+    artifact_retention.stop()
+    query_dispatcher.shutdown()
+    xlsx_exporter.shutdown()
+    engine_registry.dispose()
+
+
+@app.post("/slack/events")
+async def slack_events(request: Request):
+    data = await request.json()
+
+    # Short-circuit redundant Slack retries of events that were already received
+    retry_num = request.headers.get("X-Slack-Retry-Num")
+    if retry_num is not None:
+        retry_reason = request.headers.get("X-Slack-Retry-Reason", "")
+        logger.info(f"Slack retry #{retry_num} received (reason: {retry_reason})")
+        if slack_bot.should_skip_retry(retry_reason, data.get('event_id')):
+            return JSONResponse(content={"status": "ok"}, headers={"X-Slack-No-Retry": "1"})
+
+    logger.info(f"Received event: {data}")
+    # Add more detailed logging
+    logger.info(f"Event type: {data.get('type')}")
+    if 'event' in data:
+        logger.info(f"Inner event type: {data.get('event', {}).get('type')}")
+        logger.info(f"User: {data.get('event', {}).get('user')}")
+        logger.info(f"Text: {data.get('event', {}).get('text')}")
+
+    # Only enqueues the event; processing happens in the event queue workers
+    # so Slack gets its acknowledgement well within the 3-second deadline.
+    try:
+        response = await slack_bot.handle_event(data)
+    except EventQueueFullError as e:
+        logger.warning(f"Rejecting event: {e}")
+        return JSONResponse(status_code=503, content={"status": "busy"})
+    logger.info(f"Response: {response}")
+    return response
+
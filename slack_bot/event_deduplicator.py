@@ -0,0 +1,158 @@
+# slack_bot/event_deduplicator.py
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from core.config import config
+
+
+class InMemoryDedupStore:
+    """
+    Time-windowed set of event IDs with a fixed size ceiling.
+
+    Entries are kept in insertion order, so expired entries and the overflow
+    beyond `max_entries` are always evicted from the front in O(1).
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add_if_absent(self, event_id: str) -> bool:
+        """
+        Records an event ID unless it was already seen within the TTL window.
+
+        Returns:
+            True if the ID was recorded (first delivery), False if it is a duplicate.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if event_id in self._entries:
+                return False
+            self._entries[event_id] = now + self.ttl_seconds
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def discard(self, event_id: str):
+        with self._lock:
+            self._entries.pop(event_id, None)
+
+    def __contains__(self, event_id: str) -> bool:
+        with self._lock:
+            self._expire(time.monotonic())
+            return event_id in self._entries
+
+    def _expire(self, now: float):
+        while self._entries:
+            oldest_id, expires_at = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteDedupStore:
+    """
+    Event ID store in a local SQLite file, so several uvicorn workers on the
+    same host deduplicate against each other.
+    """
+
+    PURGE_EVERY = 100  # Inserts between purges of expired/overflow entries
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._inserts = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS processed_events ("
+            " event_id TEXT PRIMARY KEY,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS processed_events_expires_at ON processed_events (expires_at)"
+        )
+
+    def add_if_absent(self, event_id: str) -> bool:
+        """
+        Records an event ID unless it was already seen within the TTL window.
+
+        Returns:
+            True if the ID was recorded (first delivery), False if it is a duplicate.
+        """
+        # Wall-clock time, since entries are shared between processes
+        now = time.time()
+        with self._lock:
+            cursor = self._connection.cursor()
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("DELETE FROM processed_events WHERE event_id = ? AND expires_at <= ?", (event_id, now))
+                cursor.execute(
+                    "INSERT OR IGNORE INTO processed_events (event_id, expires_at) VALUES (?, ?)",
+                    (event_id, now + self.ttl_seconds)
+                )
+                inserted = cursor.rowcount == 1
+                self._inserts += inserted
+                if inserted and self._inserts % self.PURGE_EVERY == 0:
+                    self._purge(cursor, now)
+                cursor.execute("COMMIT")
+                return inserted
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            finally:
+                cursor.close()
+
+    def _purge(self, cursor, now: float):
+        cursor.execute("DELETE FROM processed_events WHERE expires_at <= ?", (now,))
+        cursor.execute(
+            "DELETE FROM processed_events WHERE event_id IN ("
+            " SELECT event_id FROM processed_events ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def discard(self, event_id: str):
+        with self._lock:
+            self._connection.execute("DELETE FROM processed_events WHERE event_id = ?", (event_id,))
+
+    def __contains__(self, event_id: str) -> bool:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT 1 FROM processed_events WHERE event_id = ? AND expires_at > ?", (event_id, time.time())
+            ).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM processed_events").fetchone()[0]
+
+
+def create_dedup_store():
+    """
+    Creates the event deduplication store configured by EVENT_DEDUP_BACKEND ('memory' or 'sqlite').
+    """
+    backend = config.event_dedup_backend.lower()
+    if backend == "sqlite":
+        logging.info(f"Using SQLite event deduplication store at {config.event_dedup_sqlite_path}")
+        return SQLiteDedupStore(config.event_dedup_sqlite_path, config.event_dedup_ttl_seconds,
+                                config.event_dedup_max_entries)
+    elif backend == "memory":
+        return InMemoryDedupStore(config.event_dedup_ttl_seconds, config.event_dedup_max_entries)
+    else:
+        raise ValueError(f"Unsupported event deduplication backend: {config.event_dedup_backend}")
@@ -36,3 +36,4 @@ class EventHandler:
                 self.logger.warning(f"Unhandled event type: {event_type}")
         except Exception as e:
             self.logger.error(f"Error handling {event_type} event: {str(e)}", exc_info=True)
+            raise  # Lets the event queue mark the job as failed
@@ -0,0 +1,187 @@
+# slack_bot/event_queue.py
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class EventQueueFullError(Exception):
+    """Raised when an event cannot be accepted because the queue is at capacity."""
+
+
+class EventJob:
+    def __init__(self, event: dict):
+        self.job_id = uuid.uuid4().hex
+        self.event = event
+        self.state = JOB_QUEUED
+        self.error: Optional[str] = None
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def queue_wait(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return self.started_at - self.enqueued_at
+
+    @property
+    def service_time(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "event_type": self.event.get('type'),
+            "state": self.state,
+            "error": self.error,
+            "queue_wait_seconds": self.queue_wait,
+            "service_time_seconds": self.service_time,
+        }
+
+
+class EventQueue:
+    """
+    Bounded queue of Slack events drained by a pool of async workers.
+
+    The Slack endpoint only enqueues events and returns immediately; the slow
+    LLM -> DB -> file -> upload pipeline runs in the workers.
+    """
+
+    def __init__(self, handler: Callable[[dict], Awaitable], num_workers: int, max_size: int,
+                 history_size: int = 500, metrics_window: int = 1000):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.handler = handler
+        self.num_workers = num_workers
+        self.max_size = max_size
+        self.history_size = history_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[str, EventJob]" = OrderedDict()
+        self._queue_waits = deque(maxlen=metrics_window)
+        self._service_times = deque(maxlen=metrics_window)
+        self._counts = {JOB_DONE: 0, JOB_FAILED: 0, "rejected": 0}
+
+    def _get_queue(self) -> asyncio.Queue:
+        # Created lazily so the queue belongs to the running event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        return self._queue
+
+    async def start(self):
+        queue = self._get_queue()
+        for index in range(self.num_workers):
+            self._workers.append(asyncio.create_task(self._worker(queue, index)))
+        self.logger.info(f"Started {self.num_workers} event workers (queue capacity {self.max_size})")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.logger.info("Stopped event workers")
+
+    def submit(self, event: dict) -> EventJob:
+        """
+        Enqueues an event for background processing.
+
+        Args:
+            event: The inner Slack event.
+
+        Returns:
+            The queued job.
+
+        Raises:
+            EventQueueFullError: If the queue is at capacity.
+        """
+        job = EventJob(event)
+        try:
+            self._get_queue().put_nowait(job)
+        except asyncio.QueueFull:
+            self._counts["rejected"] += 1
+            self.logger.warning(f"Event queue is full ({self.max_size} jobs). Rejecting {event.get('type')} event.")
+            raise EventQueueFullError(f"Event queue is full ({self.max_size} jobs)")
+
+        self._jobs[job.job_id] = job
+        self._trim_history()
+        self.logger.info(f"Queued job {job.job_id} for {event.get('type')} event")
+        return job
+
+    def _trim_history(self):
+        # Forget the oldest finished jobs; queued and running jobs are always kept
+        excess = len(self._jobs) - self.history_size
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in (JOB_DONE, JOB_FAILED)]
+        for job_id in finished[:excess]:
+            self._jobs.pop(job_id)
+
+    async def _worker(self, queue: asyncio.Queue, index: int):
+        while True:
+            job = await queue.get()
+            job.state = JOB_RUNNING
+            job.started_at = time.monotonic()
+            self._queue_waits.append(job.queue_wait)
+            try:
+                await self.handler(job.event)
+                job.state = JOB_DONE
+            except Exception as e:
+                job.state = JOB_FAILED
+                job.error = str(e)
+                self.logger.error(f"Job {job.job_id} failed in worker {index}: {str(e)}", exc_info=True)
+            finally:
+                job.finished_at = time.monotonic()
+                self._service_times.append(job.service_time)
+                if job.state in self._counts:  # Not counted when the worker is cancelled mid-job
+                    self._counts[job.state] += 1
+                queue.task_done()
+            self.logger.info(f"Job {job.job_id} {job.state} "
+                             f"(queue wait {job.queue_wait:.3f}s, service time {job.service_time:.3f}s)")
+
+    def get_job(self, job_id: str) -> Optional[EventJob]:
+        return self._jobs.get(job_id)
+
+    @staticmethod
+    def _summarize(samples) -> Dict[str, float]:
+        if not samples:
+            return {"count": 0, "avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        ordered = sorted(samples)
+        return {
+            "count": len(ordered),
+            "avg": sum(ordered) / len(ordered),
+            "p50": ordered[int(0.50 * (len(ordered) - 1))],
+            "p95": ordered[int(0.95 * (len(ordered) - 1))],
+            "max": ordered[-1],
+        }
+
+    def get_stats(self) -> dict:
+        """
+        Returns queue depth, job counts and queue-wait/service-time summaries
+        (over the most recent jobs).
+        """
+        states = {JOB_QUEUED: 0, JOB_RUNNING: 0}
+        for job in self._jobs.values():
+            if job.state in states:
+                states[job.state] += 1
+        return {
+            "workers": len(self._workers),
+            "capacity": self.max_size,
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "queued": states[JOB_QUEUED],
+            "running": states[JOB_RUNNING],
+            "done": self._counts[JOB_DONE],
+            "failed": self._counts[JOB_FAILED],
+            "rejected": self._counts["rejected"],
+            "queue_wait_seconds": self._summarize(self._queue_waits),
+            "service_time_seconds": self._summarize(self._service_times),
+        }
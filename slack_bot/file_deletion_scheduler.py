@@ -22,6 +22,9 @@ class FileDeletionScheduler:
         except SlackApiError as e:
             logging.error(f"Slack API error: {e.response['error']}")
 
+    def shutdown(self):
+        self.scheduler.shutdown(wait=False)
+
     def schedule_file_deletion(self, file_id, delay_seconds):
         # Schedule the deletion
         run_date = datetime.datetime.now() + datetime.timedelta(seconds=delay_seconds)
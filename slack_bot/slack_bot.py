@@ -3,7 +3,10 @@
 import logging
 from slack_sdk.web.async_client import AsyncWebClient
 from dotenv import load_dotenv
+from core.config import config
+from slack_bot.event_deduplicator import create_dedup_store
 from slack_bot.event_handler import EventHandler
+from slack_bot.event_queue import EventQueue, EventQueueFullError
 from slack_bot.logger import LoggerSetup  # Import LoggerSetup
 import os
 
@@ -15,22 +18,45 @@ class SlackBot:
         LoggerSetup.setup_logging()  # Set up logging first
         self.client = AsyncWebClient(token=os.getenv('SLACK_BOT_TOKEN'))
         self.event_handler = EventHandler(self.client)
-        self.processed_events = set()
+        self.event_queue = EventQueue(
+            self.event_handler.handle_event,
+            num_workers=config.event_workers,
+            max_size=config.event_queue_size
+        )
+        self.processed_events = create_dedup_store()
 
-    async def handle_event(self, data: dict):
-        logging.info(f"Received request: {data}")
+    async def start(self):
+        await self.event_queue.start()
 
-        event_id = data.get('event_id')
-        if event_id in self.processed_events:
-            logging.info(f"Event {event_id} has already been processed. Skipping.")
-            return {"status": "ok"}
+    async def stop(self):
+        await self.event_queue.stop()
 
-        self.processed_events.add(event_id)
+    async def handle_event(self, data: dict):
+        logging.info(f"Received request: {data}")
 
         if data['type'] == "url_verification":
             logging.info(f"Challenge received: {data['challenge']}")
             return {"challenge": data['challenge']}
 
+        event_id = data.get('event_id')
+        if event_id and not self.processed_events.add_if_absent(event_id):
+            logging.info(f"Event {event_id} has already been processed. Skipping.")
+            return {"status": "ok"}
+
         event = data.get('event', {})
-        await self.event_handler.handle_event(event)
-        return {"status": "ok"}
+        try:
+            job = self.event_queue.submit(event)
+        except EventQueueFullError:
+            # Forget the event so Slack's retry gets another chance
+            if event_id:
+                self.processed_events.discard(event_id)
+            raise
+        return {"status": "ok", "job_id": job.job_id}
+
+    def should_skip_retry(self, retry_reason: str, event_id: str) -> bool:
+        """
+        Whether a Slack retry (X-Slack-Retry-Num present) can be acknowledged without processing it.
+        Only a retry of an event already in the dedup store is redundant; if the original delivery
+        never reached the queue (e.g. the process restarted), the retry is processed as usual.
+        """
+        return retry_reason in config.slack_skip_retry_reasons and bool(event_id) and event_id in self.processed_events
@@ -2,10 +2,13 @@
 
 import logging
 import os
-import aiohttp
 from slack_sdk.web.async_client import AsyncWebClient
 from slack_sdk.errors import SlackApiError
 
+from core.config import config
+from processing.artifact_retention import artifact_retention
+from slack_uploader.http_session import slack_http_session
+
 
 class SlackFileHandler:
     def __init__(self, client: AsyncWebClient):
@@ -57,23 +60,23 @@ class SlackFileHandler:
         filename = file_info['name']
         headers = {"Authorization": f"Bearer {self.client.token}"}
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as resp:
-                if resp.status == 200:
-                    download_path = os.path.join('downloads', filename)
-                    os.makedirs('downloads', exist_ok=True)
-                    with open(download_path, 'wb') as f:
-                        while True:
-                            chunk = await resp.content.read(8192)
-                            if not chunk:
-                                break
-                            f.write(chunk)
-                    logging.info(f"File downloaded successfully: {download_path}")
-                    await self.verify_download(download_path, file_info['size'])
-                    return download_path
-                else:
-                    logging.error(f"Failed to download file. Status: {resp.status}")
-                    raise Exception(f"File download failed with status {resp.status}")
+        async with slack_http_session.get().get(url, headers=headers) as resp:
+            if resp.status == 200:
+                download_path = os.path.join(config.download_dir, filename)
+                os.makedirs(config.download_dir, exist_ok=True)
+                with open(download_path, 'wb') as f:
+                    while True:
+                        chunk = await resp.content.read(8192)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                artifact_retention.track(download_path, "download")
+                logging.info(f"File downloaded successfully: {download_path}")
+                await self.verify_download(download_path, file_info['size'])
+                return download_path
+            else:
+                logging.error(f"Failed to download file. Status: {resp.status}")
+                raise Exception(f"File download failed with status {resp.status}")
 
     async def verify_download(self, file_path, expected_size):
         actual_size = os.path.getsize(file_path)
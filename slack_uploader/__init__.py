@@ -1,5 +1,7 @@
 # slack_uploader/__init__.py
 from .file_uploader import FileUploader
+from .http_session import SlackHTTPSession, slack_http_session
 from .slack_uploader import SlackUploader
 from .upload_completer import UploadCompleter
+from .upload_pipeline import UploadPipeline, content_type_for, upload_stats
 from .upload_url_retriever import UploadURLRetriever
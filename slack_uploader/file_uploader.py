@@ -1,22 +1,48 @@
-import requests
+import asyncio
 import logging
-import os
+
+import aiohttp
+
+from core.config import config
+from processing.result_buffer import in_memory
+from .http_session import slack_http_session
 
 
 class FileUploader:
     @staticmethod
-    def upload_file_content(upload_url: str, file_path: str):
+    async def read_chunks(fileobj, chunk_bytes: int):
+        """
+        Yields a binary file object's content in chunks. Reads from in-memory buffers
+        happen inline; reads from disk run on a worker thread to keep the event loop free.
+        """
+        memory_only = in_memory(fileobj)
+        loop = asyncio.get_running_loop()
+        while True:
+            chunk = fileobj.read(chunk_bytes) if memory_only else await loop.run_in_executor(
+                None, fileobj.read, chunk_bytes)
+            if not chunk:
+                break
+            yield chunk
+
+    @staticmethod
+    async def upload_file_content(upload_url: str, fileobj, length: int, content_type: str):
+        """
+        Streams the file object, from its current position, to the upload URL. The body
+        may take longer than SLACK_HTTP_TIMEOUT_SECONDS in total, so only connecting and
+        each read are bounded by it.
+        """
         logging.info(f"Uploading file content to URL: {upload_url}")
-        filesize = os.path.getsize(file_path)
-        with open(file_path, 'rb') as file_content:
-            response = requests.put(
-                url=upload_url,
-                headers={
-                    'Content-Type': 'text/csv; charset=utf-8',
-                    'Content-Length': str(filesize)
-                },
-                data=file_content
-            )
-        logging.info(f"Response from file upload (upload_file_content): {response.status_code}")
-        response.raise_for_status()
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=config.slack_http_timeout_seconds,
+                                        sock_read=config.slack_http_timeout_seconds)
+        async with slack_http_session.get().post(
+            upload_url,
+            timeout=timeout,
+            headers={
+                'Content-Type': content_type,
+                'Content-Length': str(length)
+            },
+            data=FileUploader.read_chunks(fileobj, config.slack_upload_chunk_bytes)
+        ) as response:
+            logging.info(f"Response from file upload (upload_file_content): {response.status}")
+            response.raise_for_status()
         logging.info(f"File content uploaded successfully to: {upload_url}")
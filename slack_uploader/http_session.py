@@ -0,0 +1,38 @@
+import logging
+from typing import Optional
+
+import aiohttp
+
+from core.config import config
+
+
+class SlackHTTPSession:
+    """
+    One aiohttp session shared by all Slack HTTP calls (upload URLs, file bodies,
+    completions, downloads), so connections to Slack are kept alive and reused
+    instead of being opened for every request.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def get(self) -> aiohttp.ClientSession:
+        # Created lazily so the session belongs to the running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=config.slack_http_max_connections,
+                                             keepalive_timeout=config.slack_http_keepalive_seconds)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=config.slack_http_timeout_seconds))
+            self.logger.info("Opened shared Slack HTTP session")
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            self.logger.info("Closed shared Slack HTTP session")
+        self._session = None
+
+
+# Global session shared by all Slack uploaders
+slack_http_session = SlackHTTPSession()
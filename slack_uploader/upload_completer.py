@@ -1,30 +1,29 @@
-import requests
 import logging
-import os
+
+from .http_session import slack_http_session
 
 
 class UploadCompleter:
     def __init__(self, token: str):
         self.token = token
 
-    def complete_upload(self, file_id: str, file_path: str, channel_id: str):
+    async def complete_upload(self, file_id: str, title: str, channel_id: str, initial_comment: str = None):
         logging.info(f"Completing file upload for File ID: {file_id}, Channel ID: {channel_id}")
         headers = {
             'Authorization': f'Bearer {self.token}',
             'Content-Type': 'application/json; charset=utf-8'
         }
         data = {
-            'files': [{'id': file_id, 'title': os.path.basename(file_path)}],
+            'files': [{'id': file_id, 'title': title}],
             'channel_id': channel_id
         }
-        response = requests.post(
-            url='https://slack.com/api/files.completeUploadExternal',
-            headers=headers,
-            json=data
-        )
-        logging.info(f"Response from Slack (complete_upload): {response.text}")
-        response.raise_for_status()
-        response_json = response.json()
+        if initial_comment:
+            data['initial_comment'] = initial_comment
+        async with slack_http_session.get().post(
+                'https://slack.com/api/files.completeUploadExternal', headers=headers, json=data) as response:
+            response.raise_for_status()
+            response_json = await response.json()
+        logging.info(f"Response from Slack (complete_upload): {response_json}")
         if response_json.get('ok'):
             file_url = response_json['files'][0]['permalink']
             logging.info(f"File upload completed successfully: {file_url}")
@@ -0,0 +1,137 @@
+import logging
+import mimetypes
+import os
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from processing.artifact_retention import artifact_retention
+from .file_uploader import FileUploader
+from .upload_completer import UploadCompleter
+from .upload_url_retriever import UploadURLRetriever
+
+# File suffix -> (Content-Type of the uploaded body, Slack snippet type or None)
+CONTENT_TYPES = {
+    ".csv": ("text/csv; charset=utf-8", "csv"),
+    ".csv.gz": ("application/gzip", None),
+    ".csv.zst": ("application/zstd", None),
+    ".parquet": ("application/vnd.apache.parquet", None),
+    ".arrow": ("application/vnd.apache.arrow.file", None),
+    ".xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", None),
+    ".txt": ("text/plain; charset=utf-8", "text"),
+}
+
+PHASES = ("get_url", "upload", "complete")
+
+
+def content_type_for(filename: str) -> Tuple[str, Optional[str]]:
+    """
+    Returns the (Content-Type, snippet type) for a file name, matching the longest known suffix.
+    """
+    lowered = filename.lower()
+    for suffix in sorted(CONTENT_TYPES, key=len, reverse=True):
+        if lowered.endswith(suffix):
+            return CONTENT_TYPES[suffix]
+    guessed, _ = mimetypes.guess_type(filename)
+    return guessed or "application/octet-stream", None
+
+
+class UploadStats:
+    """
+    Per-phase upload timings over the most recent uploads, with totals.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._timings = {phase: deque(maxlen=window) for phase in PHASES + ("total",)}
+        self._counts = {"uploads": 0, "failures": 0, "bytes": 0}
+        self._failures_by_phase = {phase: 0 for phase in PHASES}
+
+    def record(self, timings: Dict[str, float], length: int):
+        for phase, seconds in timings.items():
+            self._timings[phase].append(seconds)
+        self._counts["uploads"] += 1
+        self._counts["bytes"] += length
+
+    def record_failure(self, phase: str):
+        self._counts["failures"] += 1
+        self._failures_by_phase[phase] += 1
+
+    @staticmethod
+    def _summarize(samples) -> Dict[str, float]:
+        if not samples:
+            return {"count": 0, "avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        ordered = sorted(samples)
+        return {
+            "count": len(ordered),
+            "avg": sum(ordered) / len(ordered),
+            "p50": ordered[int(0.50 * (len(ordered) - 1))],
+            "p95": ordered[int(0.95 * (len(ordered) - 1))],
+            "max": ordered[-1],
+        }
+
+    def get_stats(self) -> Dict:
+        return dict(
+            self._counts,
+            failures_by_phase=dict(self._failures_by_phase),
+            **{f"{phase}_seconds": self._summarize(samples) for phase, samples in self._timings.items()},
+        )
+
+
+class UploadPipeline:
+    """
+    Uploads a file through Slack's external upload API without blocking the event loop:
+    get an upload URL, stream the body to it in chunks, then complete the upload into
+    the channel. All calls share one keep-alive HTTP session; each phase is timed.
+    """
+
+    def __init__(self, token: str):
+        self.logger = logging.getLogger(__name__)
+        self.url_retriever = UploadURLRetriever(token)
+        self.file_uploader = FileUploader()
+        self.upload_completer = UploadCompleter(token)
+
+    async def upload(self, fileobj, filename: str, channel_id: str, initial_comment: str = None) -> str:
+        """
+        Uploads a binary file object (an open file or an in-memory buffer), from its current
+        position to the end, as `filename` into the channel.
+
+        Returns:
+            The permalink of the uploaded file.
+        """
+        start = fileobj.tell()
+        fileobj.seek(0, os.SEEK_END)
+        length = fileobj.tell() - start
+        fileobj.seek(start)
+        content_type, snippet_type = content_type_for(filename)
+
+        timings = {}
+        phase = PHASES[0]
+        started = time.perf_counter()
+        try:
+            upload_url, file_id = await self.url_retriever.get_upload_url(filename, length, snippet_type)
+            timings[phase] = time.perf_counter() - started
+
+            phase = PHASES[1]
+            phase_started = time.perf_counter()
+            await self.file_uploader.upload_file_content(upload_url, fileobj, length, content_type)
+            timings[phase] = time.perf_counter() - phase_started
+
+            phase = PHASES[2]
+            phase_started = time.perf_counter()
+            file_url = await self.upload_completer.complete_upload(file_id, filename, channel_id, initial_comment)
+            timings[phase] = time.perf_counter() - phase_started
+        except Exception:
+            upload_stats.record_failure(phase)
+            raise
+
+        timings["total"] = time.perf_counter() - started
+        upload_stats.record(timings, length)
+        artifact_retention.schedule_remote_deletion(file_id)
+        self.logger.info(
+            f"Uploaded {filename} ({length} bytes, {content_type}) in {timings['total'] * 1000:.0f} ms: "
+            + ", ".join(f"{name} {timings[name] * 1000:.0f} ms" for name in PHASES))
+        return file_url
+
+
+# Upload timings shared by all pipelines
+upload_stats = UploadStats()
@@ -1,41 +1,32 @@
-import requests
 import logging
-import os
+
+from .http_session import slack_http_session
 
 
 class UploadURLRetriever:
     def __init__(self, token: str):
         self.token = token
 
-    def get_upload_url(self, file_path: str, channel_id: str):
+    async def get_upload_url(self, filename: str, length: int, snippet_type: str = None):
         logging.info("Requesting upload URL from Slack")
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/x-www-form-urlencoded;'
-        }
-        filename = os.path.basename(file_path)
-        filesize = os.path.getsize(file_path)
-        logging.info(f"Filename: {filename}, Filesize: {filesize}")
+        headers = {'Authorization': f'Bearer {self.token}'}
+        logging.info(f"Filename: {filename}, Filesize: {length}")
 
         data = {
             'filename': filename,
-            'length': filesize,
-            'channels': channel_id,
+            'length': str(length),
             'alt_txt': 'File uploaded by bot',
-            'snippet_type': 'csv',
-            'filetype': 'csv',
-            'mime_type': 'text/csv'
         }
+        if snippet_type:
+            data['snippet_type'] = snippet_type
 
         logging.info(f"Payload for get_upload_url: {data}")
-        response = requests.post(
-            url='https://slack.com/api/files.getUploadURLExternal',
-            headers=headers,
-            data=data  # Use `data` instead of `json` for x-www-form-urlencoded
-        )
-        logging.info(f"Response from Slack (get_upload_url): {response.text}")
-        response.raise_for_status()
-        response_json = response.json()
+        # Sent as application/x-www-form-urlencoded
+        async with slack_http_session.get().post(
+                'https://slack.com/api/files.getUploadURLExternal', headers=headers, data=data) as response:
+            response.raise_for_status()
+            response_json = await response.json()
+        logging.info(f"Response from Slack (get_upload_url): {response_json}")
         if response_json.get('ok'):
             upload_url = response_json['upload_url']
             file_id = response_json['file_id']
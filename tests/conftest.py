@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Add the repository root to the path so the tests can import the application modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
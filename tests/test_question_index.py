@@ -0,0 +1,26 @@
+import pytest
+
+from query_generation.question_index import QuestionIndex
+
+
+def find(cached_question: str, question: str):
+    index = QuestionIndex()
+    index.add("cached", "scope", cached_question)
+    return index.find_similar("scope", question, threshold=0.5)
+
+
+@pytest.mark.parametrize("cached_question, question", [
+    ("number of stores per product", "number of products per store"),
+    ("sales in germany and austria", "sales in germany or austria"),
+    ("sales from 2020 to 2023", "sales to 2020 from 2023"),
+])
+def test_different_questions_with_the_same_words_dont_match(cached_question, question):
+    assert find(cached_question, question) is None
+
+
+@pytest.mark.parametrize("cached_question, question", [
+    ("top 10 products by revenue 2023", "2023 top ten products by revenue"),
+    ("sales from 2020 to 2023", "I want to see the sales from 2020 to 2023"),
+])
+def test_rephrased_questions_match(cached_question, question):
+    assert find(cached_question, question) is not None
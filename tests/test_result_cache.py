@@ -0,0 +1,65 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from core.config import config
+from processing import result_cache as result_cache_module
+from processing.result_cache import ResultCache, TeeWriter
+
+SQL = "SELECT 1 AS one"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "result_cache_enabled", True)
+    monkeypatch.setattr(config, "result_cache_dir", str(tmp_path))
+    return ResultCache()
+
+
+def test_failing_cache_write_doesnt_fail_the_export(cache, monkeypatch):
+    cache_writer = cache.writer(SQL, "POSTGRES")
+
+    def fail(data):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(cache_writer._file, "write", fail)
+    sink = io.BytesIO()
+    TeeWriter(sink, cache_writer).write(b"one\n1\n")
+    cache_writer.commit(1)
+
+    assert sink.getvalue() == b"one\n1\n"
+    assert cache.lookup(SQL, "POSTGRES") is None
+    assert cache.get_stats()["store_errors"] == 1
+    assert not os.path.exists(cache_writer.tmp_path)
+
+
+def test_failing_commit_doesnt_fail_the_export(cache, monkeypatch):
+    cache_writer = cache.writer(SQL, "POSTGRES")
+    cache_writer.write(b"one\n1\n")
+
+    def fail(source, target):
+        raise OSError(5, "Input/output error")
+
+    monkeypatch.setattr(result_cache_module.os, "replace", fail)
+    cache_writer.commit(1)
+
+    assert cache.lookup(SQL, "POSTGRES") is None
+    assert cache.get_stats()["store_errors"] == 1
+    assert not os.path.exists(cache_writer.tmp_path)
+
+
+def test_startup_keeps_entries_other_processes_are_writing(cache, tmp_path):
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    live_tmp = tmp_path / f"live.{os.getpid()}.1.tmp"
+    dead_tmp = tmp_path / f"dead.{dead.pid}.1.tmp"
+    live_tmp.write_bytes(b"")
+    dead_tmp.write_bytes(b"")
+
+    ResultCache()
+
+    assert live_tmp.exists()
+    assert not dead_tmp.exists()
@@ -0,0 +1,54 @@
+import pytest
+
+from query_generation.schema_manager import SchemaCatalog, schema_manager
+from query_generation.sql_validator import SQLValidator, verdict_cache
+
+TABLES = {
+    "FactSales": {
+        "columns": [{"name": name, "type": "INT"} for name in
+                    ("sales_key", "store_key", "product_key", "quantity", "total_price_usd")],
+        "foreign_keys": [],
+    },
+    "DimStore": {
+        "columns": [{"name": name, "type": "VARCHAR"} for name in ("store_key", "name", "city", "country")],
+        "foreign_keys": [],
+    },
+}
+
+
+@pytest.fixture
+def validator(monkeypatch):
+    catalog = SchemaCatalog("POSTGRES", "star_dwh", TABLES)
+    monkeypatch.setattr(schema_manager, "get_catalog", lambda schema_name, db_key=None: catalog)
+    verdict_cache.clear()
+    yield SQLValidator("star_dwh")
+    verdict_cache.clear()
+
+
+@pytest.mark.parametrize("sql_query", [
+    "SELECT SUM(quantity) AS total FROM star_dwh.FactSales ORDER BY total",
+    "SELECT SUM(quantity) total FROM star_dwh.FactSales ORDER BY total",
+    "SELECT name store_name FROM star_dwh.DimStore ORDER BY store_name",
+    "SELECT CASE WHEN quantity > 5 THEN 'big' ELSE 'small' END size_bucket, COUNT(*) "
+    "FROM star_dwh.FactSales GROUP BY size_bucket",
+    "SELECT CASE WHEN quantity > 5 THEN 'big' ELSE 'small' END AS size_bucket, COUNT(*) "
+    "FROM star_dwh.FactSales GROUP BY size_bucket",
+    "SELECT NULL missing, CURRENT_DATE today FROM star_dwh.FactSales ORDER BY today",
+])
+def test_output_aliases_are_defined(validator, sql_query):
+    is_valid, details = validator.validate_query(sql_query)
+    assert is_valid, details["issues"]
+
+
+def test_unknown_bare_column_is_reported(validator):
+    is_valid, details = validator.validate_query("SELECT revenue FROM star_dwh.FactSales")
+    assert not is_valid
+    assert details["semantic_issues"] == details["issues"]
+    assert details["issues"][0].startswith("Unknown column: revenue")
+
+
+def test_unknown_qualified_column_is_reported(validator):
+    is_valid, details = validator.validate_query(
+        "SELECT ds.region FROM star_dwh.FactSales fs JOIN star_dwh.DimStore ds ON fs.store_key = ds.store_key")
+    assert not is_valid
+    assert details["issues"][0].startswith("Unknown column: ds.region in DimStore")
@@ -0,0 +1,25 @@
+import pytest
+
+from core.config import config
+from query_generation.schema_manager import schema_manager
+from query_generation.template_engine import SQLTemplateEngine
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(config, "sql_templates_enabled", True)
+    # No introspected catalog: the built-in star_dwh description is assumed
+    monkeypatch.setattr(schema_manager, "get_catalog", lambda schema_name, db_key=None: None)
+    return SQLTemplateEngine()
+
+
+@pytest.mark.parametrize("question", [
+    "revenue by month for the year 2023",
+    "revenue by month for year 2023",
+    "revenue by month for 2023",
+])
+def test_year_filter_hits_the_template(engine, question):
+    result = engine.match(question, "star_dwh")
+
+    assert result is not None
+    assert "dd.year = 2023" in result[0]